@@ -0,0 +1,79 @@
+# benchmarks/bench_fill.py
+"""Compare the NumPy fill engine with the scanline fill.
+
+Run from the project root:  python -m benchmarks.bench_fill
+"""
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from config.settings import CANVAS_SIZE, COLORS
+from core import fill
+
+WALL_COLOR = (0, 0, 0)
+FILL_COLOR = (255, 0, 0)
+CORRIDOR = 4  # Height of each maze corridor in pixels
+
+
+def empty_canvas():
+    surface = pygame.Surface(CANVAS_SIZE, pygame.SRCALPHA)
+    surface.fill(COLORS[0])
+    return surface
+
+
+def maze_canvas():
+    """Serpentine maze: one corridor per row band, joined at alternating ends"""
+    surface = empty_canvas()
+    width, height = CANVAS_SIZE
+    for i, y in enumerate(range(CORRIDOR, height, CORRIDOR + 1)):
+        gap_left = i % 2 == 0
+        start = 1 if gap_left else 0
+        end = width - 1 if gap_left else width - 2
+        pygame.draw.line(surface, WALL_COLOR, (start, y), (end, y))
+    return surface
+
+
+def run_scanline(surface):
+    spans = fill.scanline_spans(surface, (0, 0))
+    fill.paint_spans(surface, spans, FILL_COLOR)
+
+
+def run_numpy(surface, connectivity):
+    mask = fill.region_mask(surface, (0, 0), tolerance=0, connectivity=connectivity)
+    fill.paint_mask(surface, mask, FILL_COLOR)
+
+
+def timed(make_canvas, func, *args, repeats=3):
+    best = None
+    for _ in range(repeats):
+        surface = make_canvas()
+        start = time.perf_counter()
+        func(surface, *args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    pygame.init()
+    engines = [
+        ('scanline', run_scanline, ()),
+        ('numpy-4', run_numpy, (4,)),
+        ('numpy-8', run_numpy, (8,)),
+    ]
+    scenarios = [('empty canvas', empty_canvas), ('serpentine maze', maze_canvas)]
+
+    print(f"Canvas {CANVAS_SIZE[0]}x{CANVAS_SIZE[1]}, best of 3 (ms)")
+    for scenario, make_canvas in scenarios:
+        for name, func, args in engines:
+            if name != 'scanline' and fill.np is None:
+                continue
+            ms = timed(make_canvas, func, *args) * 1000
+            print(f"  {scenario:<16} {name:<9} {ms:10.1f}")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
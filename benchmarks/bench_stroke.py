@@ -0,0 +1,75 @@
+# benchmarks/bench_stroke.py
+"""Compare per-step circle stamping with the segment stroke rasterizer.
+
+Run from the project root:  python -m benchmarks.bench_stroke
+"""
+import math
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from config.settings import CANVAS_SIZE, COLORS, BRUSH_SIZES
+from core.stroke import draw_stroke
+
+STROKES = [
+    ('dense', 400),  # Slow drawing: a few pixels between mouse samples
+    ('fast', 40),    # Fast flicks: tens of pixels between samples
+]
+REPEATS = 5
+
+
+def long_stroke(samples):
+    """A wavy stroke across the whole canvas, sampled like mouse input"""
+    width, height = CANVAS_SIZE
+    points = []
+    for i in range(samples):
+        t = i / (samples - 1)
+        x = int(20 + t * (width - 40))
+        y = int(height / 2 + math.sin(t * math.pi * 6) * height * 0.4)
+        points.append((x, y))
+    return points
+
+
+def stamp_stroke(surface, color, points, radius):
+    """The previous approach: one circle per interpolation step"""
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        dx = x1 - x0
+        dy = y1 - y0
+        step = max(1, radius // 2)
+        steps = max(1, int(max(abs(dx), abs(dy)) / step))
+        for i in range(steps + 1):
+            t = i / steps
+            pygame.draw.circle(surface, color, (int(x0 + dx * t), int(y0 + dy * t)), radius)
+
+
+def timed(func, points, radius):
+    best = None
+    for _ in range(REPEATS):
+        surface = pygame.Surface(CANVAS_SIZE, pygame.SRCALPHA)
+        surface.fill(COLORS[0])
+        start = time.perf_counter()
+        func(surface, COLORS[13], points, radius)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    pygame.init()
+    print(f"Strokes across {CANVAS_SIZE[0]}x{CANVAS_SIZE[1]}, best of {REPEATS} (ms)")
+    print(f"  {'stroke':<12} {'brush':>5} {'stamped':>10} {'segments':>10} {'speedup':>8}")
+    for name, samples in STROKES:
+        points = long_stroke(samples)
+        label = f"{name} ({samples})"
+        for size in BRUSH_SIZES:
+            radius = size // 2
+            stamped = timed(stamp_stroke, points, radius) * 1000
+            segments = timed(draw_stroke, points, radius) * 1000
+            print(f"  {label:<12} {size:>5} {stamped:10.2f} {segments:10.2f} {stamped / segments:7.1f}x")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
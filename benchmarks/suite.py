@@ -0,0 +1,485 @@
+# benchmarks/suite.py
+"""Headless benchmarks for the canvas, input and render paths.
+
+Every scenario replays a seeded, synthetic workload through the same code
+main() uses and records the latency of each operation. Scenarios run in
+their own process so the reported peak memory belongs to one workload.
+
+Run from the project root:
+    python -m benchmarks.suite                    # print results as JSON
+    python -m benchmarks.suite --save-baseline    # store them for later runs
+    python -m benchmarks.suite --compare          # exit 1 on a regression
+
+The baseline holds this machine's timings, so it is not committed.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from pygame.locals import MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP
+from config.settings import INITIAL_WIDTH, INITIAL_HEIGHT, CANVAS_SIZE, COLORS
+from core.canvas import CanvasManager
+from core.cursor import draw_enhanced_cursor
+from core.event_handlers import handle_mouse_down, handle_motion_batch, handle_view_event
+from core.guess import GuessIndex
+from core.interface import draw_interface
+from core.latency import LatencyMonitor
+from core.render import Renderer
+from core.snapshot import KEYFRAME, SnapshotEncoder, decode_snapshot
+from core.state import ToolState
+from ui.layout import create_tools
+from utils.helpers import handle_resize, scale_background
+from utils.assets import load_icons
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+PERCENTILES = (50, 95, 99)
+NOISE_FLOOR_MS = 0.05  # Differences below this are never reported as regressions
+
+
+class Session:
+    """Screen, widgets and canvas wired up the way main() does it"""
+
+    def __init__(self, size=(INITIAL_WIDTH, INITIAL_HEIGHT)):
+        self.screen = pygame.display.set_mode(size)
+        self.icons = load_icons()
+        self.tools = create_tools(size, self.icons)
+        self.canvas_area = pygame.Rect(20, 20, size[0] - 240, size[1] - 140)
+        self.canvas_manager = CanvasManager()
+        self.tool_state = ToolState()
+        self.renderer = Renderer()
+        self.background = scale_background(None, size)
+        self.drawing = False
+        self.smooth = True
+
+    def handle(self, events):
+        """Apply one frame of events, coalescing motion as main() does"""
+        motion = []
+        for event in events:
+            if event.type == MOUSEMOTION:
+                motion.append(event.pos)
+                continue
+            if motion:
+                self._motion(motion)
+                motion = []
+            if handle_view_event(event, self.tool_state, self.canvas_manager, self.canvas_area):
+                continue
+            if event.type == MOUSEBUTTONDOWN:
+                self.drawing = handle_mouse_down(
+                    event, self.tools, self.tool_state, self.canvas_manager, self.canvas_area
+                )
+            elif event.type == MOUSEBUTTONUP:
+                self.drawing = False
+                self.canvas_manager.save_state()
+                self.tool_state.last_pos = None
+        if motion:
+            self._motion(motion)
+
+    def _motion(self, positions):
+        handle_motion_batch(positions, self.drawing, self.tools, self.tool_state,
+                            self.canvas_manager, self.canvas_area)
+
+    def draw(self):
+        dirty = draw_interface(
+            self.screen, self.canvas_manager, self.tools, self.tool_state,
+            self.canvas_area, self.icons, draw_enhanced_cursor,
+            background_image=self.background, renderer=self.renderer, smooth=self.smooth
+        )
+        if dirty:
+            pygame.display.update(dirty)
+
+    def frame(self, events):
+        self.handle(events)
+        self.draw()
+
+    def resize(self, size, image, settled):
+        """Follow a new window size as main() does while the window is dragged"""
+        if settled and self.screen.get_size() != size:
+            self.screen = pygame.display.set_mode(size)
+        self.tools, self.canvas_area = handle_resize(*size, self.tools, self.icons)
+        self.background = scale_background(image, size, settled)
+        self.renderer.invalidate()
+        self.smooth = settled
+
+
+# Synthetic input
+# ---------------
+
+def stroke_frames(session, rnd, frames=120, per_frame=4, speed=6):
+    """Event lists, one per frame, for a random-walk stroke across the canvas"""
+    area = session.canvas_area
+    x = rnd.uniform(area.left + 50, area.right - 50)
+    y = rnd.uniform(area.top + 50, area.bottom - 50)
+    heading = rnd.uniform(0, 2 * math.pi)
+    stream = [[pygame.event.Event(MOUSEBUTTONDOWN, pos=(int(x), int(y)), button=1)]]
+    for _ in range(frames):
+        events = []
+        for _ in range(per_frame):
+            heading += rnd.uniform(-0.4, 0.4)
+            x = min(area.right - 2, max(area.left + 1, x + speed * math.cos(heading)))
+            y = min(area.bottom - 2, max(area.top + 1, y + speed * math.sin(heading)))
+            events.append(pygame.event.Event(MOUSEMOTION, pos=(int(x), int(y)), rel=(0, 0), buttons=(1, 0, 0)))
+        stream.append(events)
+    stream.append([pygame.event.Event(MOUSEBUTTONUP, pos=(int(x), int(y)), button=1)])
+    return stream
+
+
+def scribble(session, rnd, strokes):
+    """Cover the canvas with random strokes in random colors"""
+    state = session.tool_state
+    for _ in range(strokes):
+        state.brush_color = COLORS[rnd.randrange(1, len(COLORS))]
+        state.brush_size = rnd.choice((2, 5, 10))
+        for events in stroke_frames(session, rnd, frames=20, speed=12):
+            session.handle(events)
+    state.brush_color = COLORS[13]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+# Scenarios: each returns a list of per-operation times in seconds
+# ----------------------------------------------------------------
+
+def bench_stroke_input(session, rnd):
+    """Event handling for long strokes (coordinate mapping and rasterizing)"""
+    samples = []
+    for _ in range(10):
+        samples += [timed(session.handle, events) for events in stroke_frames(session, rnd)]
+    return samples
+
+
+def bench_stroke_frame(session, rnd):
+    """Whole frames while drawing: input, display cache update and present"""
+    session.draw()
+    samples = []
+    for _ in range(10):
+        samples += [timed(session.frame, events) for events in stroke_frames(session, rnd)]
+    return samples
+
+
+def bench_stroke_layers(session, rnd):
+    """Whole frames while drawing on one layer of a stack of eight"""
+    canvas = session.canvas_manager
+    for _ in range(7):
+        canvas.add_layer()
+        scribble(session, rnd, 10)
+    canvas.set_layer(3, opacity=160, blend='multiply')
+    canvas.select_layer(4)
+    return bench_stroke_frame(session, rnd)
+
+
+def bench_stroke_poster(session, rnd):
+    """Whole frames while drawing on an 8K board (pixels in memory-mapped files)"""
+    session.canvas_manager = CanvasManager((7680, 4320))
+    return bench_stroke_frame(session, rnd)
+
+
+def bench_sketch_poster(session, rnd):
+    """Whole frames while drawing in one corner of an 8K board, zoomed in (memory follows that corner)"""
+    session.canvas_manager = CanvasManager((7680, 4320))
+    session.canvas_manager.viewport.zoom_at(session.canvas_area.topleft, session.canvas_area, 8)
+    return bench_stroke_frame(session, rnd)
+
+
+def bench_view_poster(session, rnd):
+    """Frames while zooming in and out of a drawn-on 8K board and panning around it"""
+    session.canvas_manager = CanvasManager((7680, 4320))
+    scribble(session, rnd, 30)
+    session.draw()
+    viewport, area = session.canvas_manager.viewport, session.canvas_area
+    samples = []
+    for _ in range(5):
+        for factor in (1.25,) * 12 + (0.8,) * 12:
+            pos = (rnd.randrange(area.left, area.right), rnd.randrange(area.top, area.bottom))
+            samples.append(timed(lambda: (viewport.zoom_at(pos, area, factor), session.draw())))
+        viewport.zoom_at(area.center, area, 4)
+        x, y = area.center
+        stream = [[pygame.event.Event(MOUSEBUTTONDOWN, pos=(x, y), button=2)]]
+        for _ in range(20):
+            x, y = x + rnd.randrange(-30, 31), y + rnd.randrange(-30, 31)
+            stream.append([pygame.event.Event(MOUSEMOTION, pos=(x, y), rel=(0, 0), buttons=(0, 1, 0))])
+        stream.append([pygame.event.Event(MOUSEBUTTONUP, pos=(x, y), button=2)])
+        samples += [timed(session.frame, events) for events in stream]
+        viewport.reset()
+    return samples
+
+
+def bench_idle_frame(session, rnd):
+    """Frames with only hover motion over the toolbar"""
+    session.draw()
+    width, height = session.screen.get_size()
+    samples = []
+    for _ in range(600):
+        pos = (rnd.randrange(width - 220, width), rnd.randrange(height))
+        event = pygame.event.Event(MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))
+        samples.append(timed(session.frame, [event]))
+    return samples
+
+
+def bench_window_drag(session, rnd):
+    """Frames while the window edge is dragged, then back to a recent size"""
+    image = pygame.image.load('assets/bg.png').convert()
+    width, height = session.screen.get_size()
+    sizes = [(width + i * 7, height + i * 3) for i in range(60)]
+    samples = []
+    for _ in range(3):
+        for size in sizes + sizes[::-1]:
+            samples.append(timed(lambda: (session.resize(size, image, False), session.draw())))
+        samples.append(timed(lambda: (session.resize((width, height), image, True), session.draw())))
+    return samples
+
+
+def bench_full_repaint(session, rnd):
+    """Frames after an expose or resize, when everything is redrawn"""
+    samples = []
+    for _ in range(60):
+        session.renderer.invalidate()
+        samples.append(timed(session.draw))
+    return samples
+
+
+def bench_canvas_rescale(session, rnd):
+    """Full smoothscale of the canvas to the display size"""
+    display = session.canvas_manager.display
+    size = session.canvas_area.size
+    samples = []
+    for _ in range(30):
+        display.invalidate()
+        samples.append(timed(display.get, size))
+    return samples
+
+
+def _fills(session, rnd, count):
+    canvas = session.canvas_manager
+    samples = []
+    for i in range(count):
+        pos = (rnd.randrange(canvas.size[0]), rnd.randrange(canvas.size[1]))
+        samples.append(timed(canvas.flood_fill, pos, COLORS[2 + i % 20]))
+    return samples
+
+
+def bench_fill_empty(session, rnd):
+    """flood_fill on a blank canvas (the whole canvas is one region)"""
+    return _fills(session, rnd, 20)
+
+
+def bench_fill_fragmented(session, rnd):
+    """flood_fill on a canvas cut into many regions by strokes"""
+    scribble(session, rnd, 150)
+    return _fills(session, rnd, 40)
+
+
+def bench_save_state(session, rnd):
+    """Committing one stroke to the undo history"""
+    canvas = session.canvas_manager
+    samples = []
+    for _ in range(40):
+        for events in stroke_frames(session, rnd, frames=30)[:-1]:
+            session.handle(events)
+        session.drawing = False
+        session.tool_state.last_pos = None
+        samples.append(timed(canvas.save_state))
+    return samples
+
+
+def bench_undo_storm(session, rnd):
+    """Undoing and redoing a full history, repeatedly"""
+    scribble(session, rnd, 20)
+    canvas = session.canvas_manager
+    samples = []
+    for _ in range(5):
+        samples += [timed(canvas.handle_undo) for _ in range(25)]
+        samples += [timed(canvas.handle_redo) for _ in range(25)]
+    return samples
+
+
+def bench_undo_deep(session, rnd):
+    """Undoing a long history, rebuilt from compressed checkpoints"""
+    scribble(session, rnd, 200)
+    history = session.canvas_manager.history
+    return [timed(session.canvas_manager.handle_undo) for _ in range(history.stats()['undo_edits'])]
+
+
+def bench_load_icons(session, rnd):
+    """Startup's icon loading, served from the baked atlas"""
+    return [timed(load_icons) for _ in range(30)]
+
+
+def bench_snapshot_join(session, rnd):
+    """Catching up late joiners on a busy canvas: snapshot copied, compressed and decoded"""
+    canvas = session.canvas_manager
+    scribble(session, rnd, 100)
+    encoder = SnapshotEncoder(canvas)
+    encoder.start()
+    keyframe = None
+    samples = []
+    for _ in range(40):
+        scribble(session, rnd, 2)
+        start = time.perf_counter()
+        snapshot = encoder.capture()
+        data = snapshot.encode()
+        if snapshot.kind == KEYFRAME:
+            keyframe, data = data, None
+        decode_snapshot(keyframe, data, canvas.size)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_guess_match(session, rnd):
+    """Chat guesses checked against a 30,000-phrase word bank"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(rnd.choice(letters) for _ in range(rnd.randint(2, 9))) for _ in range(5000)]
+    bank = [' '.join(rnd.choice(vocabulary) for _ in range(rnd.randint(1, 7))) for _ in range(30000)]
+    index = GuessIndex(bank)
+
+    guesses = []
+    for _ in range(5000):
+        phrase = list(rnd.choice(bank))
+        kind = rnd.random()
+        if kind < 0.3:  # Right, but typed differently
+            phrase = [c.upper() if rnd.random() < 0.2 else c for c in phrase] + ['!']
+        elif kind < 0.7:  # A typo or two
+            for _ in range(rnd.randint(1, 2)):
+                phrase[rnd.randrange(len(phrase))] = rnd.choice(letters)
+        else:  # Something else entirely
+            phrase = ' '.join(rnd.choice(vocabulary) for _ in range(rnd.randint(1, 5)))
+        guesses.append(''.join(phrase))
+    return [timed(index.match, guess) for guess in guesses]
+
+
+SCENARIOS = {
+    name[len('bench_'):]: func
+    for name, func in list(globals().items()) if name.startswith('bench_')
+}
+
+
+# Running and reporting
+# ---------------------
+
+def peak_memory_kb():
+    """Peak resident memory of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_scenario(name, seed):
+    """Run one scenario in this process and summarize it"""
+    pygame.init()
+    session = Session()
+    samples = SCENARIOS[name](session, random.Random(seed))
+    monitor = LatencyMonitor(window=len(samples))
+    monitor.samples.extend(samples)
+    summary = {f'p{p}_ms': round(ms, 3) for p, ms in monitor.percentiles(PERCENTILES).items()}
+    summary.update(
+        count=len(samples),
+        mean_ms=round(sum(samples) / len(samples) * 1000, 3),
+        max_ms=round(max(samples) * 1000, 3),
+        peak_rss_kb=peak_memory_kb(),
+    )
+    pygame.quit()
+    return summary
+
+
+def run_all(names, seed):
+    results = {}
+    for name in names:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.suite', '--child', name, '--seed', str(seed)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[name] = json.loads(output.splitlines()[-1])
+        print(f"{name:<16} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms",
+              file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'seed': seed,
+            'canvas': list(CANVAS_SIZE),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Scenario/metric pairs slower than baseline by more than tolerance"""
+    regressions = []
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            limit = old[metric] * (1 + tolerance)
+            if result[metric] > limit and result[metric] - old[metric] > NOISE_FLOOR_MS:
+                regressions.append(f"{name} {metric}: {old[metric]:.2f} -> {result[metric]:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', help=f"subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help="fail if slower than the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.seed)))
+        return
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    baseline = None
+    if args.compare and not args.save_baseline:
+        # Checked before the suite runs; timings only compare on one machine,
+        # so no baseline is committed
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            sys.exit(f"No baseline at {args.baseline}: baselines are per machine and not committed. "
+                     f"Run once with --save-baseline on this machine, then --compare.")
+    report = run_all(args.scenarios or list(SCENARIOS), args.seed)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(text + '\n')
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif args.compare:
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
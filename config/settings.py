@@ -5,12 +5,30 @@ INITIAL_WIDTH = 1280
 INITIAL_HEIGHT = 600
 ASPECT_RATIO = 16/9
 BG_COLOR = (240, 240, 240)
+FRAME_RATE = 60                    # Frames per second while anything is moving
+IDLE_TIMEOUT = 1.0                 # Longest sleep waiting for events when nothing needs drawing
 
 # Canvas Configuration
-CANVAS_SIZE = (1700, 900)          # Internal drawing resolution
+CANVAS_SIZE = (1700, 900)          # Internal drawing resolution (main.py --canvas overrides it)
+CANVAS_MAP_PIXELS = 4096 * 4096    # Canvases this large keep their pixels in memory-mapped files
+CANVAS_SWAP_DIR = 'swap'           # Where those files go (not tmpfs, which is memory)
+CANVAS_MAX_COORDINATE = 1 << 16    # Stroke points past this are refused from peers (pygame rects are 32-bit)
 CANVAS_MARGIN = 20                 # Space around canvas in window
 CANVAS_DISPLAY_COLOR = (255, 255, 255)  # Canvas background color
 
+# Fill Settings
+FILL_TOLERANCE = 32                # Max per-channel difference still filled
+FILL_CONNECTIVITY = 4              # 4 or 8 neighbour region growing
+
+# Display Cache Settings
+DISPLAY_REGION_MARGIN = 4          # Extra canvas pixels rescaled around damage
+DISPLAY_FULL_RESCALE_RATIO = 0.5   # Damaged fraction that triggers a full rescale
+DISPLAY_CACHE_SIZES = 3            # Scaled canvases kept for recent window sizes (LRU)
+
+# Window Resize
+RESIZE_DEBOUNCE = 0.15             # Seconds without resize events before the final smooth rescale
+BACKGROUND_CACHE_SIZES = 3         # Scaled backgrounds kept for recent window sizes (LRU)
+
 # Tool Configuration
 # -----------------
 # Brush Settings
@@ -64,6 +82,7 @@ BRUSH_SIZE_BUTTON_SIZE = 80     # Brush size selector button size
 PALETTE_TOOL_PADDING = 60       # Space between palette and first tool
 TOOL_BUTTON_RADIUS = 8          # Rounded corners radius
 BUTTON_HIGHLIGHT_COLOR = (180, 180, 255)
+HIT_GRID_CELL = 64              # Cell size of the toolbar hit-test grid
 
 # Tool Appearance
 TOOL_BUTTON_BG = (255, 255, 255)  # White background
@@ -75,6 +94,12 @@ HOVER_FLOAT_OFFSET = -5             # pixels (negative for upward float)
 HOVER_COLOR = (230, 230, 230)       # Light gray hover color
 HOVER_EASING = "ease_out_quad"      # or "linear" 
 
+# Button Rendering
+BUTTON_FONT = 'Arial'
+BUTTON_FONT_SIZE = 20
+BUTTON_HOVER_BUCKETS = 16           # Hover animation steps cached as sprites
+BUTTON_SPRITE_CACHE_SIZE = 256      # Pre-rendered button sprites kept (LRU)
+
 # Action Buttons
 ACTION_BUTTON_WIDTH = 80
 ACTION_BUTTON_HEIGHT = 80
@@ -91,4 +116,83 @@ ICON_PATHS = {
     'redo': 'assets/icons/redo.png',
     'clear': 'assets/icons/clear.png'
 }
-CURSOR_PREVIEW_ALPHA = 100  # Translucency (0-255)
\ No newline at end of file
+CURSOR_PREVIEW_ALPHA = 100  # Translucency (0-255)
+CURSOR_CACHE_SIZE = 32      # Composed cursor sprites kept (LRU)
+CURSOR_HARDWARE = False     # Install the cursor as the OS pointer over the canvas
+BACKGROUND_PATH = 'assets/bg.png'  # Loaded once the first frame is on screen
+ASSET_CACHE_DIR = '.cache'  # Icon atlas baked from ICON_PATHS, keyed by their contents
+
+# History Configuration
+# ---------------------
+HISTORY_TILE_SIZE = 64      # Edge length of undo tiles (canvas pixels)
+HISTORY_BUDGET = 64 * 1024 * 1024  # Bytes of compressed undo history kept; oldest edits go first
+HISTORY_COMPRESS_LEVEL = 1  # zlib level for checkpoint tiles (1 = fastest)
+HISTORY_CHECKPOINT_EDITS = 8  # Edits between raster checkpoints (bounds undo replay)
+
+# Layers
+# ------
+LAYER_BLEND_MODES = ('normal', 'multiply', 'add', 'subtract', 'lighten', 'darken')  # Network order
+LAYER_MAX = 16              # Layers a canvas may hold
+LAYER_NEW_KEY = 'n'         # With Ctrl: new layer above the current one
+LAYER_DELETE_KEY = 'delete' # With Ctrl: remove the current layer
+LAYER_UP_KEY = 'page up'    # Select the layer above
+LAYER_DOWN_KEY = 'page down'  # Select the layer below
+LAYER_VISIBILITY_KEY = 'h'  # With Ctrl: show / hide the current layer
+LAYER_BLEND_KEY = 'b'       # With Ctrl: cycle the current layer's blend mode
+LAYER_OPACITY_KEYS = ('[', ']')  # With Ctrl: make the current layer less / more opaque
+LAYER_OPACITY_STEP = 32
+
+# Viewport
+# --------
+VIEW_ZOOM_STEP = 1.25       # Zoom factor per mouse wheel notch
+VIEW_ZOOM_MAX = 32.0        # Furthest zoom in (canvas pixels per fitted pixel)
+VIEW_RESET_KEY = 'home'     # Show the whole canvas again; middle-drag pans
+
+# Instrumentation
+# ---------------
+LATENCY_WINDOW = 600        # Frames of input latency kept for percentiles
+LOG_LEVEL = 'INFO'          # Console messages: 'INFO' all, 'WARNING' only problems, 'CRITICAL' none
+LATENCY_REPORT = False      # Log latency percentiles on exit
+STARTUP_REPORT = True       # Log how long startup took, step by step
+PROFILE_WINDOW = 600        # Frames of phase timings kept for the HUD and exports
+PROFILE_DIR = 'profiles'    # Where exports and capture reports are written
+PROFILE_CAPTURE_FRAMES = 300  # Length of a cProfile / tracemalloc capture window
+PROFILE_HUD = False         # Show the performance overlay at startup
+PROFILE_HUD_KEY = 'f3'      # Toggle the overlay
+PROFILE_EXPORT_KEY = 'f4'   # Write the kept frames as CSV and JSON
+PROFILE_CPROFILE_KEY = 'f5' # Start a cProfile capture window
+PROFILE_TRACEMALLOC_KEY = 'f6'  # Start a tracemalloc capture window
+
+
+# Network Play
+# ------------
+NET_HOST = '127.0.0.1'      # Address the relay server binds / clients connect to
+NET_PORT = 5555
+NET_DEFAULT_ROOM = 'lobby'
+NET_MAX_PENDING = 256 * 1024  # Unsent bytes a slow client may fall behind before it is dropped
+NET_MAX_MESSAGE = 16 << 20  # Largest message accepted (a late joiner's snapshot can be big)
+SNAPSHOT_TILE_SIZE = 64     # Edge length of the tiles late joiners are sent (canvas pixels)
+NET_PATCH_PIXELS = 1 << 21  # Largest area one undo patch covers; bigger ones are sent in bands
+SNAPSHOT_COMPRESS_LEVEL = 3 # zlib level for snapshots and undo patches
+SNAPSHOT_REKEY_RATIO = 0.5  # New keyframe once the changes since the last reach this share of its size
+
+# Guessing
+# --------
+GUESS_CLOSE_EDITS = 2       # Most typos a guess may have and still be "close"
+GUESS_CHARS_PER_EDIT = 4    # ...allowing one per this many characters of the phrase
+
+# Session Journal
+# ---------------
+JOURNAL_ENABLED = True          # Log every operation so a crashed session can be restored
+JOURNAL_DIR = 'session'
+JOURNAL_CHECKPOINT_SECONDS = 30 # Minimum time between canvas checkpoints
+JOURNAL_CHECKPOINT_OPS = 2000   # ...or checkpoint sooner once this many operations were logged
+JOURNAL_COMPRESS_LEVEL = 1      # zlib level for checkpoints and undo patches
+JOURNAL_TILE_SIZE = 64          # Checkpoints copy the tiles of this size painted since the last one
+
+# Export
+# ------
+EXPORT_DIR = 'exports'
+EXPORT_KEY = 's'                 # Ctrl+key saves a PNG, Ctrl+Shift+key compressed raw RGBA
+EXPORT_THUMBNAIL_SIZE = (340, 180)  # Bounds of the thumbnail saved next to each export (None: skip)
+EXPORT_COMPRESS_LEVEL = 6        # zlib level for raw exports
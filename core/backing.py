@@ -0,0 +1,34 @@
+# core/backing.py
+import mmap
+import os
+import sys
+import tempfile
+import pygame
+from config.settings import CANVAS_MAP_PIXELS, CANVAS_SWAP_DIR
+
+# Byte order of a native SRCALPHA pixel (0xAARRGGBB as an integer)
+_NATIVE_ORDER = 'BGRA' if sys.byteorder == 'little' else 'ARGB'
+
+
+def canvas_surface(size, swap_dir=CANVAS_SWAP_DIR):
+    """Transparent SRCALPHA surface for a canvas-sized image.
+
+    From CANVAS_MAP_PIXELS up, the pixels live in a sparse memory-mapped
+    file in swap_dir rather than on the heap. A page only takes memory once
+    something reads or writes it, and the OS can write cold pages back to
+    disk and drop them. The compositor, display and fills keep to the
+    painted area, so memory follows it; a page holds 1024 pixels of one
+    row, so a long thin stroke still costs every row it crosses.
+    """
+    width, height = size
+    if width * height < CANVAS_MAP_PIXELS:
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+        return surface
+
+    os.makedirs(swap_dir, exist_ok=True)
+    with tempfile.TemporaryFile(dir=swap_dir) as f:
+        f.truncate(width * height * 4)  # A hole: no disk blocks until written
+        pixels = mmap.mmap(f.fileno(), width * height * 4)
+    # The surface keeps the mapping alive; the file is already unlinked
+    return pygame.image.frombuffer(pixels, size, _NATIVE_ORDER)
@@ -1,95 +1,301 @@
-from collections import deque
+from contextlib import contextmanager
 import pygame
-import hashlib
-from config.settings import CANVAS_SIZE, COLORS
+from config.settings import BRUSH_SIZES, CANVAS_MAX_COORDINATE, CANVAS_SIZE, COLORS, LAYER_BLEND_MODES, LAYER_MAX
+from core.layers import Layer, Compositor, TRANSPARENT
+from core import fill, stroke
+from core.display import DisplayCache
+from core.viewport import Viewport
+from utils.images import put_tile
 
 class CanvasManager:
-    def __init__(self):
-        self.surface = pygame.Surface(CANVAS_SIZE, pygame.SRCALPHA)
-        self.surface.fill(COLORS[0])
-        self.undo_stack = deque(maxlen=20)
-        self.redo_stack = deque(maxlen=20)
-        self.save_state()
+    def __init__(self, size=CANVAS_SIZE):
+        self.size = tuple(size)
+        self.layers = [Layer(self.size)]  # Bottom first, drawn over the paper
+        self.active = 0
+        self.compositor = Compositor(self.size, COLORS[0])
+        self.composite = self.compositor.surface  # All visible layers flattened (paper only under them)
+        self.compositor.update(self.layers)
+        self.version = 0        # Bumped by every operation that touches pixels
+        self.saved_version = 0  # Version last committed to history
+        self.damage_listeners = []  # Called with each rect of changed pixels
+        self.op_listeners = []      # Called with each operation, see apply_op
+        self.replaying = False      # True while apply_op runs a received operation
+        self.held = None            # Rects refresh() was asked for inside hold_refresh()
+        self.display = DisplayCache(self)
+        self.viewport = Viewport(self.size)
+
+    @property
+    def layer(self):
+        """The layer being drawn on"""
+        return self.layers[self.active]
+
+    @property
+    def surface(self):
+        return self.layers[self.active].surface
+
+    @property
+    def history(self):
+        return self.layers[self.active].history
+
+    def mark_dirty(self, rect):
+        """Record that pixels of the active layer inside rect changed"""
+        self.version += 1
+        self.layer.touch(rect)
+        self.refresh(rect)
+
+    def refresh(self, rect=None):
+        """Recompose rect (or everything) of the flattened image and report it"""
+        rect = self.composite.get_rect() if rect is None else rect
+        if self.held is not None:
+            self.held.append(pygame.Rect(rect))
+            return
+        self.compositor.update(self.layers, rect)
+        for listener in self.damage_listeners:
+            listener(rect)
+
+    @contextmanager
+    def hold_refresh(self):
+        """Recompose once, after the block, instead of after every operation in it"""
+        if self.held is not None:
+            yield  # Already held by an enclosing block
+            return
+        self.held = []
+        try:
+            yield
+        finally:
+            held, self.held = self.held, None
+            if held:
+                self.refresh(held[0].unionall(held))
+
+    def emit(self, op):
+        """Pass an operation tuple to the op listeners"""
+        for listener in self.op_listeners:
+            listener(op)
+
+    def apply_op(self, op):
+        """Replay an operation emitted by another CanvasManager.
+
+        Operations are tuples: ('stroke', points, color, radius),
+        ('fill', pos, color), ('clear',), ('undo',), ('redo',), ('commit',),
+        ('layer_add',), ('layer_remove',), ('layer_select', index),
+        ('layer_set', index, visible, opacity, blend) and ('patch', rect,
+        pixels), which puts RGBA pixels on the active layer (see
+        put_pixels).
+
+        Operations that do not fit this canvas (a fill seed off it, stroke
+        points past CANVAS_MAX_COORDINATE, an oversized brush, a layer it
+        does not have) are ignored, as they may come from a misbehaving
+        peer. Strokes may leave the canvas, as local ones can: only what
+        lands on it is drawn. Returns whether op was applied.
+        """
+        if not self._fits(op):
+            return False
+        kind = op[0]
+        self.replaying = True
+        try:
+            if kind == 'stroke':
+                self.draw_stroke(op[1], op[2], op[3])
+            elif kind == 'fill':
+                self.flood_fill(op[1], op[2])
+            elif kind == 'clear':
+                self.clear()
+            elif kind == 'undo':
+                self.handle_undo()
+            elif kind == 'redo':
+                self.handle_redo()
+            elif kind == 'commit':
+                self.save_state()
+            elif kind == 'layer_add':
+                self.add_layer()
+            elif kind == 'layer_remove':
+                self.remove_layer()
+            elif kind == 'layer_select':
+                # The sender logged its own commit first; committing here
+                # would cut short an edit in progress on this canvas
+                self.select_layer(op[1], commit=False)
+            elif kind == 'layer_set':
+                self.set_layer(op[1], op[2], op[3], op[4])
+            elif kind == 'patch':
+                self.put_pixels(op[1], op[2])
+        finally:
+            self.replaying = False
+        return True
+
+    def _fits(self, op):
+        """Whether apply_op can safely run op on this canvas"""
+        kind = op[0]
+        if kind == 'stroke':
+            return (len(op) == 4 and len(op[1]) > 0 and 0 <= op[3] <= max(BRUSH_SIZES)
+                    and all(abs(x) <= CANVAS_MAX_COORDINATE and abs(y) <= CANVAS_MAX_COORDINATE
+                            for x, y in op[1]))
+        if kind == 'fill':
+            return len(op) == 3 and self._on_canvas(op[1])
+        if kind == 'layer_select':
+            return len(op) == 2 and 0 <= op[1] < len(self.layers)
+        if kind == 'layer_set':
+            return len(op) == 5 and 0 <= op[1] < len(self.layers) and op[4] in LAYER_BLEND_MODES
+        if kind == 'patch':
+            if len(op) != 3:
+                return False
+            x, y, w, h = op[1]
+            return (0 <= x and 0 <= y and 0 < w <= self.size[0] - x and 0 < h <= self.size[1] - y
+                    and len(op[2]) == w * h * 4)
+        return kind in ('clear', 'undo', 'redo', 'commit', 'layer_add', 'layer_remove')
+
+    def _on_canvas(self, point):
+        # Compared here: Rect.collidepoint wraps integers past 32 bits
+        return 0 <= point[0] < self.size[0] and 0 <= point[1] < self.size[1]
+
+    def has_changes(self):
+        """Whether the canvas was drawn on since the last commit"""
+        return self.version != self.saved_version
 
     def save_state(self):
-        """Save current canvas state to undo stack if different from last"""
-        current_hash = self.get_surface_hash()
-        if not self.undo_stack or current_hash != self.undo_stack[-1][1]:
-            self.undo_stack.append((self.surface.copy(), current_hash))
-            self.redo_stack.clear()
+        """Commit pending edits to the undo history if the canvas changed"""
+        # A received commit may have marked the active layer's edit as saved
+        if not self.has_changes() and not self.history.pending:
+            return
+        self.history.commit()
+        self.saved_version = self.version
+        self.emit(('commit',))
 
     def handle_undo(self):
         """Revert to previous state"""
-        if len(self.undo_stack) > 1:
-            current_state = self.undo_stack.pop()
-            self.redo_stack.append(current_state)
-            self.surface.blit(self.undo_stack[-1][0], (0, 0))
+        self.save_state()
+        area = self.history.undo()
+        if area:
+            self.mark_dirty(area)
+            self.saved_version = self.version
+            self.emit(('undo',))
 
     def handle_redo(self):
         """Reapply next state"""
-        if self.redo_stack:
-            redo_state = self.redo_stack.pop()
-            self.undo_stack.append(redo_state)
-            self.surface.blit(redo_state[0], (0, 0))
+        area = self.history.redo()
+        if area:
+            self.mark_dirty(area)
+            self.saved_version = self.version
+            self.emit(('redo',))
 
-    def get_surface_hash(self):
-        """Create hash of surface pixels for comparison"""
-        return hashlib.md5(pygame.image.tostring(self.surface, "RGB")).hexdigest()
+    def put_pixels(self, rect, pixels):
+        """Overwrite rect of the active layer with RGBA pixels, e.g. those a peer's undo restored.
+
+        The layer's history cannot describe pixels that arrive this way, so
+        it starts over from them.
+        """
+        rect = pygame.Rect(rect)
+        put_tile(self.surface, pygame.image.fromstring(pixels, rect.size, 'RGBA'), rect.topleft)
+        self.mark_dirty(rect)
+        self.saved_version = self.version
+        self.layer.reset_history()
+        self.emit(('patch', rect, pixels))
+
+    def draw_stroke(self, points, color, radius):
+        """Draw a round-capped polyline, recording the touched tiles for undo"""
+        self.history.capture(stroke.stroke_bounds(points, radius))
+        rect = stroke.draw_stroke(self.surface, color, points, radius)
+        op = ('stroke', [tuple(p) for p in points], _op_color(color), radius)
+        self.history.record(op, rect)  # Before mark_dirty extends the layer's bounds
+        self.mark_dirty(rect)
+        self.emit(op)
+        return rect
+
+    def eraser_color(self):
+        """What the eraser paints: transparency, so lower layers or the paper show"""
+        return TRANSPARENT
 
     def clear(self):
-        """Clear canvas while preserving history"""
+        """Clear the active layer while preserving history"""
+        self.save_state()
+        self.emit(('clear',))
+        # Pixels outside the layer's bounds are transparent already
+        changed = self.layer.bounds
+        if changed.width:
+            self.history.capture(changed)
+            self.surface.fill(self.eraser_color(), changed)
+            self.history.record(('clear',), changed)
+            self.layer.bounds = pygame.Rect(0, 0, 0, 0)
+            self.version += 1
+            self.refresh(changed)
+        self.save_state()
+
+    # Layers
+    # ------
+
+    def add_layer(self):
+        """Insert an empty layer above the active one and make it active"""
+        if len(self.layers) >= LAYER_MAX:
+            return
+        self.save_state()
+        self.layers.insert(self.active + 1, Layer(self.size))
+        self.active += 1
+        self.emit(('layer_add',))
+
+    def remove_layer(self):
+        """Delete the active layer (and its history); the last layer stays"""
+        if len(self.layers) == 1:
+            return
         self.save_state()
-        self.surface.fill(COLORS[0])
+        removed = self.layers.pop(self.active)
+        self.active = min(self.active, len(self.layers) - 1)
+        self.emit(('layer_remove',))
+        if removed.bounds.width:
+            self.refresh(removed.bounds)
+
+    def select_layer(self, index, commit=True):
+        """Make another layer active, first committing the pending edit unless commit is False"""
+        if index == self.active or not 0 <= index < len(self.layers):
+            return
+        if commit:
+            self.save_state()  # Pending tiles belong to the layer being left
+        self.active = index
+        self.emit(('layer_select', index))
+
+    def set_layer(self, index, visible=None, opacity=None, blend=None):
+        """Change how a layer is composited; None keeps a property as it is"""
+        if not 0 <= index < len(self.layers):
+            return
+        layer = self.layers[index]
+        layer.visible = layer.visible if visible is None else bool(visible)
+        layer.opacity = layer.opacity if opacity is None else max(0, min(255, int(opacity)))
+        if blend is not None:
+            if blend not in LAYER_BLEND_MODES:
+                raise ValueError(f"unknown blend mode {blend!r}")
+            layer.blend = blend
+        self.emit(('layer_set', index, layer.visible, layer.opacity, layer.blend))
+        if layer.bounds.width:
+            self.refresh(layer.bounds)
 
-    def get_scaled(self, target_size):
-        """Return scaled version of canvas"""
-        return pygame.transform.smoothscale(self.surface, target_size)
+    def load_layers(self, layers, active=0):
+        """Replace the whole layer stack, e.g. with one restored from disk"""
+        self.layers = list(layers)
+        self.active = active
+        self.refresh()
+
+    def get_scaled(self, target_size, smooth=True):
+        """Return scaled version of the viewed part of the canvas (cached between calls)"""
+        return self.display.get(target_size, smooth, self.viewport.rect)
     
     def flood_fill(self, pos, color):
-        """Optimized flood fill using PixelArray and scanline algorithm"""
-        try:
-            old_color = self.surface.get_at(pos)
-        except IndexError:
-            return  # Clicked outside canvas
-        
-        if old_color == color:
+        """Fill the region connected to pos, using NumPy when available.
+
+        On the bottom layer, blank pixels count as the paper they show, so
+        paint in the paper's color joins the background region.
+        """
+        blank = self.compositor.background if self.active == 0 else None
+        # The region's tiles are captured for undo before they are painted
+        rects = fill.flood_fill(self.surface, pos, color, self.history.tile_size, self.history.capture,
+                                self.layer.bounds, blank)
+        if not rects:
             return
+        rect = rects[0].unionall(rects).clip(self.surface.get_rect())
+        self.mark_dirty(rect)
+        # The layer may not stay the bottom one, so its history keeps the blank color
+        self.history.record(('fill', tuple(pos), tuple(color), blank), rect)
+        self.emit(('fill', tuple(pos), tuple(color)[:3]))
+        self.save_state()
+
 
-        # Convert colors to mapped integer format for faster comparison
-        old_rgb = self.surface.map_rgb(old_color)
-        new_rgb = self.surface.map_rgb(color)
-        
-        q = deque()
-        q.append(pos)
-        width, height = CANVAS_SIZE
-
-        with pygame.PixelArray(self.surface) as pixels:
-            while q:
-                x, y = q.popleft()
-                
-                # Skip invalid coordinates
-                if x < 0 or x >= width or y < 0 or y >= height:
-                    continue
-                
-                # Skip non-matching colors
-                if pixels[x, y] != old_rgb:
-                    continue
-
-                # Find west and east boundaries
-                west = east = x
-                while west >= 0 and pixels[west, y] == old_rgb:
-                    west -= 1
-                while east < width and pixels[east, y] == old_rgb:
-                    east += 1
-
-                # Paint the scanline
-                pixels[west+1:east, y] = new_rgb
-
-                # Queue adjacent rows
-                for dx in range(west + 1, east):
-                    if y > 0 and pixels[dx, y-1] == old_rgb:
-                        q.append((dx, y-1))
-                    if y < height-1 and pixels[dx, y+1] == old_rgb:
-                        q.append((dx, y+1))
-
-        self.save_state()
\ No newline at end of file
+def _op_color(color):
+    """Color as carried by operations: RGB, or RGBA when not fully opaque"""
+    color = tuple(color)
+    return color if len(color) == 4 and color[3] != 255 else color[:3]
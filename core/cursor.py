@@ -1,44 +1,117 @@
 # core/cursor.py
+from collections import OrderedDict
 import pygame
-from config.settings import TOOL_ICON_SIZE, COLORS
+from config.settings import (
+    TOOL_ICON_SIZE,
+    CURSOR_PREVIEW_ALPHA,
+    CURSOR_CACHE_SIZE,
+    CURSOR_HARDWARE,
+)
+from core.profiler import count
 
-def draw_enhanced_cursor(screen, tool_state, mouse_pos, icons):
-    """Draw tool-specific cursor with consistent icon positioning"""
-    cursor_x_offset = -13
-    cursor_y_offset = -70
+CURSOR_X_OFFSET = -13
+CURSOR_Y_OFFSET = -70
+
+# (tool, brush size, color) -> (sprite, hotspot), least recently used first
+_sprite_cache = OrderedDict()
+_system_cursor = {'key': None, 'enabled': CURSOR_HARDWARE}
+
+def _cursor_key(tool_state):
+    if tool_state.active_tool == 'fill':
+        return ('fill', 0, None)
+    color = (255,0,0) if tool_state.active_tool == 'eraser' else tuple(tool_state.brush_color)
+    return (tool_state.active_tool, tool_state.brush_size, color)
+
+def _sprite_rect(key):
+    """Sprite area relative to the mouse position"""
+    icon_size = TOOL_ICON_SIZE[0]
+    area = pygame.Rect(CURSOR_X_OFFSET, CURSOR_Y_OFFSET, icon_size, icon_size)
+    # Crosshair for fill, brush preview circle otherwise
+    reach = 8 if key[0] == 'fill' else key[1] // 2 + 1
+    return area.union(pygame.Rect(-reach, -reach, reach * 2 + 1, reach * 2 + 1))
+
+def _compose(key, icons):
+    """Render the cursor for key onto a transparent sprite"""
+    tool, brush_size, color = key
+    area = _sprite_rect(key)
+    sprite = pygame.Surface(area.size, pygame.SRCALPHA)
+    count('surfaces')
+    hotspot = (-area.left, -area.top)
     icon_size = TOOL_ICON_SIZE[0]  # Assuming square icons
-    
+    icon_pos = (hotspot[0] + CURSOR_X_OFFSET, hotspot[1] + CURSOR_Y_OFFSET)
+    hx, hy = hotspot
+
     # For fill tool
-    if tool_state.active_tool == 'fill':
+    if tool == 'fill':
         # Draw bucket icon
-        bucket_icon = pygame.transform.scale(icons['fill'], (icon_size, icon_size))
-        icon_pos = (
-            mouse_pos[0] + cursor_x_offset,
-            mouse_pos[1] + cursor_y_offset
-        )
-        screen.blit(bucket_icon, icon_pos)
-        
+        sprite.blit(pygame.transform.scale(icons['fill'], (icon_size, icon_size)), icon_pos)
+
         # Add crosshair for precision
-        pygame.draw.line(screen, (0,0,0), (mouse_pos[0]-8, mouse_pos[1]), (mouse_pos[0]+8, mouse_pos[1]), 1)
-        pygame.draw.line(screen, (0,0,0), (mouse_pos[0], mouse_pos[1]-8), (mouse_pos[0], mouse_pos[1]+8), 1)
-        return
+        pygame.draw.line(sprite, (0,0,0), (hx-8, hy), (hx+8, hy), 1)
+        pygame.draw.line(sprite, (0,0,0), (hx, hy-8), (hx, hy+8), 1)
+        return sprite, hotspot
 
     # For brush/eraser
-    radius = tool_state.brush_size // 2
-    color = (255,0,0) if tool_state.active_tool == 'eraser' else tool_state.brush_color
-    
+    radius = brush_size // 2
+
     # Draw translucent preview
     preview_surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-    pygame.draw.circle(preview_surf, (*color, 100), (radius, radius), radius)
-    screen.blit(preview_surf, (mouse_pos[0]-radius, mouse_pos[1]-radius))
-    
+    pygame.draw.circle(preview_surf, (*color, CURSOR_PREVIEW_ALPHA), (radius, radius), radius)
+    sprite.blit(preview_surf, (hx-radius, hy-radius))
+
     # Draw outline
-    pygame.draw.circle(screen, color, mouse_pos, radius, 1)
-    
+    pygame.draw.circle(sprite, color, hotspot, radius, 1)
+
     # Draw tool icon (top-right of cursor)
-    tool_icon = icons['brush' if tool_state.active_tool == 'brush' else 'eraser']
-    scaled_icon = pygame.transform.scale(tool_icon, (icon_size, icon_size))
-    screen.blit(scaled_icon, (
-        mouse_pos[0] + cursor_x_offset,
-        mouse_pos[1] + cursor_y_offset
-    ))
\ No newline at end of file
+    tool_icon = icons['brush' if tool == 'brush' else 'eraser']
+    sprite.blit(pygame.transform.scale(tool_icon, (icon_size, icon_size)), icon_pos)
+    return sprite, hotspot
+
+def get_cursor_sprite(tool_state, icons):
+    """Cached (sprite, hotspot) for the current tool, size and color"""
+    key = _cursor_key(tool_state)
+    entry = _sprite_cache.get(key)
+    if entry is None:
+        entry = _compose(key, icons)
+        _sprite_cache[key] = entry
+        if len(_sprite_cache) > CURSOR_CACHE_SIZE:
+            _sprite_cache.popitem(last=False)
+    else:
+        _sprite_cache.move_to_end(key)
+    return entry
+
+def cursor_bounds(tool_state, mouse_pos):
+    """Screen rect painted by draw_enhanced_cursor at mouse_pos"""
+    return _sprite_rect(_cursor_key(tool_state)).move(mouse_pos)
+
+def draw_enhanced_cursor(screen, tool_state, mouse_pos, icons):
+    """Draw tool-specific cursor with consistent icon positioning"""
+    sprite, hotspot = get_cursor_sprite(tool_state, icons)
+    screen.blit(sprite, (mouse_pos[0] - hotspot[0], mouse_pos[1] - hotspot[1]))
+
+def update_system_cursor(tool_state, icons, over_canvas):
+    """Show the composed cursor as the OS pointer while over the canvas.
+
+    Returns False when hardware cursors are off or unsupported, in which case
+    the caller should keep drawing the cursor with draw_enhanced_cursor.
+    """
+    if not _system_cursor['enabled']:
+        return False
+
+    key = _cursor_key(tool_state) if over_canvas else None
+    if key == _system_cursor['key']:
+        return True
+
+    try:
+        if key is None:
+            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+        else:
+            sprite, hotspot = get_cursor_sprite(tool_state, icons)
+            pygame.mouse.set_cursor(pygame.cursors.Cursor(hotspot, sprite))
+    except pygame.error:
+        # Color cursors are not available on every platform/driver
+        _system_cursor['enabled'] = False
+        return False
+
+    _system_cursor['key'] = key
+    return True
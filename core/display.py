@@ -0,0 +1,243 @@
+# core/display.py
+from collections import OrderedDict
+import pygame
+from core.profiler import count
+from config.settings import DISPLAY_REGION_MARGIN, DISPLAY_FULL_RESCALE_RATIO, DISPLAY_CACHE_SIZES
+from utils.images import put_tile
+
+DAMAGE_LIMIT = 32  # Rects kept per inactive size before they are merged into one
+DOWNSAMPLE_ROWS = 128  # Rows of a mipmap level redone at a time
+
+
+def _merge(damage, rect):
+    damage.append(rect)
+    if len(damage) > DAMAGE_LIMIT:
+        damage[:] = [damage[0].unionall(damage)]
+
+
+def _shrink_rect(rect, scale):
+    """Pixels of a 1/scale image that rect (at full resolution) touches"""
+    left, top = rect.left // scale, rect.top // scale
+    return pygame.Rect(left, top, -(-rect.right // scale) - left, -(-rect.bottom // scale) - top)
+
+
+class MipmapPyramid:
+    """The canvas at 1/2, 1/4, 1/8... resolution, for drawing zoomed-out views.
+
+    Level 0 is the canvas itself; level k is level k-1 averaged 2:1. Levels
+    are made the first time a view needs them. Damage collects per level
+    and is redone, finest level first, only for the regions it covers when
+    a level is next asked for.
+
+    Level 0 is the compositor's image, transparent where nothing was
+    painted; the other levels are on the paper. Only its painted part is
+    ever read, so a memory-mapped board's untouched pages stay untouched.
+    """
+
+    def __init__(self, compositor):
+        self.compositor = compositor
+        self.levels = [compositor.surface]
+        self.damage = [[]]  # Canvas rects not yet applied, per level (level 0 is always current)
+
+    def invalidate(self, rect=None):
+        """Mark a canvas rect (or everything) as changed"""
+        if rect is None:
+            del self.levels[1:], self.damage[1:]
+            return
+        for damage in self.damage[1:]:
+            _merge(damage, pygame.Rect(rect))
+
+    def level_for(self, scale):
+        """Coarsest level still at least `scale` times the canvas resolution"""
+        width, height = self.levels[0].get_size()
+        level = 0
+        while scale * (2 << level) <= 1 and min(width >> (level + 1), height >> (level + 1)) >= 1:
+            level += 1
+        return level
+
+    def get(self, level):
+        """Surface for a level, brought up to date"""
+        for index in range(1, level + 1):
+            if index == len(self.levels):
+                self._build(index)
+            for rect in self.damage[index]:
+                self._downsample(index, rect)
+            self.damage[index] = []
+        return self.levels[level]
+
+    def _build(self, index):
+        parent = self.levels[index - 1]
+        width, height = parent.get_width() // 2, parent.get_height() // 2
+        self.damage.append([])
+        count('surfaces')
+        if index == 1:
+            # Paper, then the painted part of the canvas averaged onto it
+            level = pygame.Surface((width, height), pygame.SRCALPHA)
+            level.fill(self.compositor.background)
+            self.levels.append(level)
+            self._downsample(index, self.compositor.painted)
+            return
+        # Odd parents drop their last row/column, so every pixel averages a 2x2 block
+        self.levels.append(pygame.transform.smoothscale(parent.subsurface((0, 0, width * 2, height * 2)), (width, height)))
+
+    def _downsample(self, index, rect):
+        level = self.levels[index]
+        area = _shrink_rect(rect, 1 << index).clip(level.get_rect())
+        # In bands, so level 1 never needs a large copy of the canvas on the paper
+        for top in range(area.top, area.bottom, DOWNSAMPLE_ROWS):
+            band = pygame.Rect(area.left, top, area.width, min(DOWNSAMPLE_ROWS, area.bottom - top))
+            if band.width <= 0:
+                return
+            # A 2:1 smoothscale of an aligned block gives the same pixels as the full image's
+            parent = (band.left * 2, band.top * 2, band.width * 2, band.height * 2)
+            if index == 1:
+                parent = self.compositor.flattened(parent)
+            else:
+                parent = self.levels[index - 1].subsurface(parent)
+            block = pygame.transform.smoothscale(parent, band.size)
+            count('surfaces')
+            put_tile(level, block, band.topleft)
+
+
+class DisplayCache:
+    """Display-resolution copy of the visible part of the canvas, kept between frames.
+
+    The canvas reports every changed rect through its damage listeners; only
+    those regions are rescaled into the cached copy. A full smoothscale only
+    happens for a new target size or view, or when most of the view was
+    touched.
+
+    Zoomed-out views are scaled from the coarsest mipmap level that still
+    has at least the display's resolution, so their cost follows the size
+    of the viewport rather than of the canvas.
+
+    Copies for the last few sizes and views are kept (LRU) and collect
+    damage while unused, so switching back to a recent window size or view
+    only rescales what changed meanwhile. Quick unsmoothed previews, used
+    while the window is being resized, are never kept.
+    """
+
+    def __init__(self, canvas_manager, sizes=DISPLAY_CACHE_SIZES):
+        self.compositor = canvas_manager.compositor
+        self.source = canvas_manager.composite
+        self.pyramid = MipmapPyramid(self.compositor)
+        self.scaled = None
+        self.view = self.source.get_rect()  # Canvas rect shown in scaled
+        self.smooth = True  # Whether scaled was made with smoothscale
+        self.damage = []
+        self.updated = []  # Rects of the scaled copy changed since take_updates()
+        self.sizes = sizes
+        self.kept = OrderedDict()  # (size, view) -> (scaled, damage) for other recent ones
+        canvas_manager.damage_listeners.append(self.invalidate)
+
+    def invalidate(self, rect=None):
+        """Mark a canvas rect (or everything) as needing a rescale"""
+        self.pyramid.invalidate(rect)
+        if rect is None:
+            self.scaled = None
+            self.kept.clear()
+            return
+        rect = pygame.Rect(rect)
+        if self.scaled is not None:
+            self.damage.append(rect)
+        for _, damage in self.kept.values():
+            _merge(damage, rect)
+
+    def get(self, size, smooth=True, view=None):
+        """Scaled view of the canvas (all of it by default) at size, bringing damaged regions up to date"""
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        view = self.source.get_rect() if view is None else pygame.Rect(view)
+        if self.scaled is None or self.scaled.get_size() != size or self.view != view:
+            self._switch(size, view)
+        if self.scaled is None or (smooth and not self.smooth):
+            self._rescale_all(size, smooth)
+        elif self.damage:
+            if self.smooth:
+                self._rescale_damage()
+            else:
+                self._rescale_all(size, False)
+        return self.scaled
+
+    def _switch(self, size, view):
+        """Make size and view current, keeping the smooth copy being replaced"""
+        if self.scaled is not None and self.smooth and self.sizes > 1:
+            self.kept[(self.scaled.get_size(), tuple(self.view))] = (self.scaled, self.damage)
+            while len(self.kept) > self.sizes - 1:
+                self.kept.popitem(last=False)
+        self.scaled, self.damage = self.kept.pop((size, tuple(view)), (None, []))
+        self.view = view
+        self.smooth = True
+        if self.scaled is not None:
+            self.updated.append(self.scaled.get_rect())
+
+    def take_updates(self):
+        """Scaled-space rects refreshed since the last call"""
+        updated, self.updated = self.updated, []
+        return updated
+
+    def _level(self, size):
+        """Mipmap level to scale the view from at size, and the view's rect on it"""
+        view = self.view
+        level = self.pyramid.level_for(min(size[0] / view.width, size[1] / view.height))
+        surface = self.pyramid.get(level)
+        return level, surface, _shrink_rect(view, 1 << level).clip(surface.get_rect())
+
+    def _rescale_all(self, size, smooth=True):
+        transform = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        _, surface, source = self._level(size)
+        self.scaled = transform(self._region(surface, source), size)
+        self.smooth = smooth
+        count('surfaces')
+        self.damage = []
+        self.updated.append(self.scaled.get_rect())
+
+    def _rescale_damage(self):
+        view = self.view
+        area = self.damage[0].unionall(self.damage).clip(view)
+        if area.width * area.height >= view.width * view.height * DISPLAY_FULL_RESCALE_RATIO:
+            self._rescale_all(self.scaled.get_size())
+            return
+
+        # Many small rects from one frame are cheaper to redo as one block
+        regions = self.damage if len(self.damage) <= 8 else [area]
+        level, surface, source = self._level(self.scaled.get_size())
+        for rect in regions:
+            rect = rect.clip(view)
+            if rect.width > 0 and rect.height > 0:
+                self._rescale_region(surface, source, _shrink_rect(rect, 1 << level).clip(source))
+        self.damage = []
+
+    def _region(self, surface, rect):
+        """rect of a mipmap level, over the paper (level 0 is not)"""
+        if surface is self.source:
+            return self.compositor.flattened(rect)
+        return surface.subsurface(rect)
+
+    def _rescale_region(self, surface, source, rect):
+        """Rescale rect of surface, where source (a rect of surface) fills the scaled copy"""
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        dst_w, dst_h = self.scaled.get_size()
+        sx, sy = dst_w / source.width, dst_h / source.height
+        rect = rect.move(-source.left, -source.top)
+        bounds = pygame.Rect(0, 0, source.width, source.height)
+
+        # Scale a slightly larger block so the filter sees real neighbours,
+        # then keep only the part covering rect
+        padded = rect.inflate(DISPLAY_REGION_MARGIN * 2, DISPLAY_REGION_MARGIN * 2).clip(bounds)
+        left, top = round(padded.left * sx), round(padded.top * sy)
+        right, bottom = round(padded.right * sx), round(padded.bottom * sy)
+        if right <= left or bottom <= top:
+            return
+        block = pygame.transform.smoothscale(
+            self._region(surface, padded.move(source.topleft)), (right - left, bottom - top)
+        )
+        count('surfaces')
+
+        inner = pygame.Rect(
+            int(rect.left * sx), int(rect.top * sy),
+            int(rect.right * sx + 1) - int(rect.left * sx),
+            int(rect.bottom * sy + 1) - int(rect.top * sy)
+        ).clip(pygame.Rect(left, top, right - left, bottom - top))
+        put_tile(self.scaled, block.subsurface(inner.move(-left, -top)), inner.topleft)
+        self.updated.append(inner)
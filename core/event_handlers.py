@@ -1,24 +1,14 @@
 # core/event_handlers.py
 import pygame
-from config.settings import CANVAS_SIZE, COLORS, BRUSH_SIZES, CANVAS_MARGIN
+from config.settings import (
+    BRUSH_SIZES, LAYER_BLEND_MODES, LAYER_NEW_KEY,
+    LAYER_DELETE_KEY, LAYER_UP_KEY, LAYER_DOWN_KEY, LAYER_VISIBILITY_KEY,
+    LAYER_BLEND_KEY, LAYER_OPACITY_KEYS, LAYER_OPACITY_STEP, VIEW_ZOOM_STEP,
+    VIEW_RESET_KEY
+)
 
-def handle_resize_event(event, screen, current_size, tools, canvas_area, handle_resize):
-    screen, w, h = handle_resize(event, screen)
-    current_size = (w, h)
-    
-    # Calculate canvas area (uses 80% of vertical space)
-    canvas_height = int(h * 0.8) - CANVAS_MARGIN*2
-    canvas_area.update(
-        CANVAS_MARGIN,
-        CANVAS_MARGIN,
-        w - CANVAS_MARGIN*2,
-        canvas_height
-    )
-    
-    return current_size, tools, canvas_area
-    
 def handle_brush_size_click(item, mouse_pos, tool_state):
-    btn = item['button']
+    btn = item.button
     
     # Check if clicked on dropdown items
     if btn.dropdown_open:
@@ -44,28 +34,29 @@ def handle_mouse_down(event, tools, tool_state, canvas_manager, canvas_area):
     mouse_pos = event.pos
     clicked_ui = False
     
-    for item in tools:
-        btn = item['button']
-        if btn.rect.collidepoint(mouse_pos) or (hasattr(btn, 'dropdown_open') and btn.dropdown_open):
-            clicked_ui = True
-            if item['type'] == 'brush_size':
-                handle_brush_size_click(item, mouse_pos, tool_state)
-            else:
-                handle_ui_click(item, tool_state, tools, canvas_manager)
-            break
+    # An open dropdown takes clicks unless an earlier widget was hit
+    item = tools.hit(mouse_pos)
+    dropdown = tools.open_dropdown()
+    if dropdown is not None and (item is None or dropdown.index < item.index):
+        item = dropdown
 
-    if not clicked_ui and canvas_area.collidepoint(mouse_pos):
+    if item is not None:
+        clicked_ui = True
+        if item.type == 'brush_size':
+            handle_brush_size_click(item, mouse_pos, tool_state)
+        else:
+            handle_ui_click(item, tool_state, tools, canvas_manager)
+
+    if not clicked_ui and tool_state.can_draw and canvas_area.collidepoint(mouse_pos):
         handle_canvas_click(mouse_pos, tool_state, canvas_manager, canvas_area)
         
         # Only create initial dot for brush/eraser
         if tool_state.active_tool in ['brush', 'eraser']:
-            x = int((mouse_pos[0] - canvas_area.left) * CANVAS_SIZE[0] / canvas_area.width)
-            y = int((mouse_pos[1] - canvas_area.top) * CANVAS_SIZE[1] / canvas_area.height)
-            color = tool_state.brush_color if tool_state.active_tool == 'brush' else COLORS[0]
-            pygame.draw.circle(
-                canvas_manager.surface,
+            x, y = canvas_manager.viewport.to_canvas(mouse_pos, canvas_area)
+            color = tool_state.brush_color if tool_state.active_tool == 'brush' else canvas_manager.eraser_color()
+            canvas_manager.draw_stroke(
+                [(x, y)],
                 color,
-                (x, y),
                 tool_state.brush_size // 2
             )
             tool_state.last_pos = (x, y)
@@ -73,69 +64,125 @@ def handle_mouse_down(event, tools, tool_state, canvas_manager, canvas_area):
     return False
 
 def handle_ui_click(item, tool_state, tools, canvas_manager):
-    if item['type'] == 'tool':
+    if item.type == 'tool':
         # Update active tool
-        tool_state.active_tool = item['name']
+        tool_state.active_tool = item.name
         # Toggle button states
         for other in tools:
-            if other['type'] == 'tool':
-                other['button'].active = (other == item)
+            if other.type == 'tool':
+                other.button.active = (other == item)
                 
-    elif item['type'] == 'color':
+    elif item.type == 'color':
         # Update color for all tools
-        tool_state.brush_color = item['color']
+        tool_state.brush_color = item.color
             
-    elif item['type'] == 'action':
+    elif item.type == 'action' and tool_state.can_draw:
         action_handlers = {
             'undo': canvas_manager.handle_undo,
             'redo': canvas_manager.handle_redo,
             'clear': canvas_manager.clear
         }
-        action_handlers[item['name']]()
+        action_handlers[item.name]()
 
 def handle_canvas_click(mouse_pos, tool_state, canvas_manager, canvas_area):
-    x = int((mouse_pos[0] - canvas_area.left) * CANVAS_SIZE[0] / canvas_area.width)
-    y = int((mouse_pos[1] - canvas_area.top) * CANVAS_SIZE[1] / canvas_area.height)
+    x, y = canvas_manager.viewport.to_canvas(mouse_pos, canvas_area)
     
     if tool_state.active_tool == 'fill':
         canvas_manager.flood_fill((x, y), tool_state.brush_color)
     else:
         tool_state.last_pos = (x, y)
 
-def handle_mouse_motion(event, drawing, tool_state, canvas_manager, canvas_area):
+def handle_mouse_path(positions, drawing, tool_state, canvas_manager, canvas_area):
+    """Draw all mouse positions gathered in a frame as one stroke"""
     if not drawing or tool_state.active_tool not in ['brush', 'eraser']:
         return
     
-    mouse_pos = event.pos
-    if not canvas_area.collidepoint(mouse_pos):
+    # Convert to canvas coordinates, skipping positions outside the canvas
+    points = []
+    for mouse_pos in positions:
+        if canvas_area.collidepoint(mouse_pos):
+            x, y = canvas_manager.viewport.to_canvas(mouse_pos, canvas_area)
+            points.append((x, y))
+    if not points:
         return
     
-    # Convert to canvas coordinates
-    x = int((mouse_pos[0] - canvas_area.left) * CANVAS_SIZE[0] / canvas_area.width)
-    y = int((mouse_pos[1] - canvas_area.top) * CANVAS_SIZE[1] / canvas_area.height)
-    
     if tool_state.last_pos:
-        color = tool_state.brush_color if tool_state.active_tool == 'brush' else COLORS[0]
+        points.insert(0, tool_state.last_pos)
+    
+    if len(points) > 1:
+        color = tool_state.brush_color if tool_state.active_tool == 'brush' else canvas_manager.eraser_color()
         radius = tool_state.brush_size // 2
         
-        # Calculate distance between points
-        dx = x - tool_state.last_pos[0]
-        dy = y - tool_state.last_pos[1]
-        distance = max(abs(dx), abs(dy))
-        
-        # Interpolate points based on brush size
-        step = max(1, radius // 2)
-        steps = max(1, int(distance / step))
-        
-        for i in range(steps + 1):
-            t = i / steps
-            px = int(tool_state.last_pos[0] + dx * t)
-            py = int(tool_state.last_pos[1] + dy * t)
-            pygame.draw.circle(
-                canvas_manager.surface,
-                color,
-                (px, py),
-                radius
-            )
+        # One round-capped polyline from the previous point
+        canvas_manager.draw_stroke(
+            points,
+            color,
+            radius
+        )
     
-    tool_state.last_pos = (x, y)
\ No newline at end of file
+    tool_state.last_pos = points[-1]
+
+def handle_motion_batch(positions, drawing, tools, tool_state, canvas_manager, canvas_area):
+    """Apply a frame's worth of MOUSEMOTION positions in one pass"""
+    tools.update_hover(positions[-1])
+    if tool_state.pan_from is not None:
+        pos = positions[-1]
+        canvas_manager.viewport.pan(pos[0] - tool_state.pan_from[0], pos[1] - tool_state.pan_from[1], canvas_area)
+        tool_state.pan_from = pos
+    if drawing:
+        handle_mouse_path(positions, drawing, tool_state, canvas_manager, canvas_area)
+
+
+def handle_view_event(event, tool_state, canvas_manager, canvas_area):
+    """Wheel zooms at the cursor, middle-drag pans, VIEW_RESET_KEY shows the whole canvas.
+
+    Returns True if the event was one of these.
+    """
+    viewport = canvas_manager.viewport
+    if event.type == pygame.MOUSEWHEEL:
+        mouse_pos = pygame.mouse.get_pos()
+        if canvas_area.collidepoint(mouse_pos):
+            viewport.zoom_at(mouse_pos, canvas_area, VIEW_ZOOM_STEP ** event.y)
+    elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 2:
+        if not canvas_area.collidepoint(event.pos):
+            return False
+        tool_state.pan_from = event.pos
+    elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+        tool_state.pan_from = None
+    elif event.type == pygame.KEYDOWN and pygame.key.name(event.key) == VIEW_RESET_KEY:
+        viewport.reset()
+    else:
+        return False
+    return True
+
+
+def handle_layer_key(event, tool_state, canvas_manager):
+    """Layer shortcuts; returns True if the key was one of them"""
+    if not tool_state.can_draw:
+        return False
+    key = pygame.key.name(event.key)
+    ctrl = event.mod & pygame.KMOD_CTRL
+    layer = canvas_manager.layer
+    index = canvas_manager.active
+
+    if key == LAYER_UP_KEY:
+        canvas_manager.select_layer(index + 1)
+    elif key == LAYER_DOWN_KEY:
+        canvas_manager.select_layer(index - 1)
+    elif not ctrl:
+        return False  # The rest are typed characters, so they need Ctrl
+    elif key == LAYER_NEW_KEY:
+        canvas_manager.add_layer()
+    elif key == LAYER_DELETE_KEY:
+        canvas_manager.remove_layer()
+    elif key == LAYER_VISIBILITY_KEY:
+        canvas_manager.set_layer(index, visible=not layer.visible)
+    elif key in LAYER_OPACITY_KEYS:
+        step = LAYER_OPACITY_STEP if key == LAYER_OPACITY_KEYS[1] else -LAYER_OPACITY_STEP
+        canvas_manager.set_layer(index, opacity=layer.opacity + step)
+    elif key == LAYER_BLEND_KEY:
+        modes = LAYER_BLEND_MODES
+        canvas_manager.set_layer(index, blend=modes[(modes.index(layer.blend) + 1) % len(modes)])
+    else:
+        return False
+    return True
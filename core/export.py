@@ -0,0 +1,127 @@
+# core/export.py
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+import pygame
+from config.settings import EXPORT_DIR, EXPORT_THUMBNAIL_SIZE, EXPORT_COMPRESS_LEVEL
+from utils.images import encode_raw
+
+# Posted when an export finishes: path, thumbnail (path or None), seconds, error (str or None)
+EXPORT_DONE = pygame.event.custom_type()
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def encode_png(pixels, size, level=EXPORT_COMPRESS_LEVEL):
+    """PNG file contents for RGBA pixels (as from pygame.image.tostring).
+
+    Encoded here rather than with pygame.image.save, which can hold the GIL
+    for the whole save; zlib releases it while compressing.
+    """
+    width, height = size
+    stride = width * 4
+    # Filter type 0 on every row: a zero byte before each scanline
+    rows = b''.join(b'\x00' + pixels[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)  # 8-bit RGBA
+    return (PNG_SIGNATURE + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(rows, level)) + _png_chunk(b'IEND', b''))
+
+
+def thumbnail_size(size, bounds):
+    """Largest size within bounds with the aspect ratio of size"""
+    scale = min(bounds[0] / size[0], bounds[1] / size[1], 1)
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+class CanvasExporter:
+    """Saves canvas snapshots without stalling the frame loop.
+
+    export() only copies the surface's pixels; a worker thread encodes them
+    (PNG or zlib-compressed raw RGBA), writes an optional thumbnail and posts
+    EXPORT_DONE to the event queue.
+    """
+
+    def __init__(self, directory=EXPORT_DIR):
+        self.directory = directory
+        self.jobs = queue.Queue()
+        self.thread = None
+
+    def export(self, surface, fmt='png', thumbnail=EXPORT_THUMBNAIL_SIZE, path=None):
+        """Queue a snapshot of surface for saving, returning the file path it will get"""
+        if fmt not in ('png', 'raw'):
+            raise ValueError(f"unknown export format {fmt!r}")
+        if path is None:
+            path = self._new_path() + '.' + fmt
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.jobs.put((pygame.image.tostring(surface, 'RGBA'), surface.get_size(), fmt, thumbnail, path))
+        return path
+
+    def export_layers(self, surfaces, fmt='png'):
+        """Queue one file per layer surface (bottom first), returning their paths"""
+        base = self._new_path()
+        return [
+            self.export(surface, fmt, thumbnail=None, path=f"{base}-layer{index + 1}.{fmt}")
+            for index, surface in enumerate(surfaces)
+        ]
+
+    def _new_path(self):
+        """Timestamped path in the export directory, without an extension"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.directory, f"drawing-{stamp}-{int(time.time() * 1000) % 1000:03d}")
+
+    def wait(self):
+        """Block until every queued export has finished"""
+        self.jobs.join()
+
+    def close(self):
+        """Finish queued exports and stop the worker"""
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            try:
+                self._save(*job)
+            finally:
+                self.jobs.task_done()
+
+    def _save(self, pixels, size, fmt, thumbnail, path):
+        start = time.perf_counter()
+        thumb_path = error = None
+        try:
+            encode = encode_png if fmt == 'png' else encode_raw
+            with open(path, 'wb') as f:
+                f.write(encode(pixels, size))
+            if thumbnail:
+                thumb_path = os.path.splitext(path)[0] + '-thumb.png'
+                small_size = thumbnail_size(size, thumbnail)
+                small = pygame.transform.smoothscale(pygame.image.frombuffer(pixels, size, 'RGBA'), small_size)
+                with open(thumb_path, 'wb') as f:
+                    f.write(encode_png(pygame.image.tostring(small, 'RGBA'), small_size))
+        except (OSError, pygame.error) as e:
+            error = str(e)
+
+        try:
+            pygame.event.post(pygame.event.Event(
+                EXPORT_DONE, path=path, thumbnail=thumb_path,
+                seconds=time.perf_counter() - start, error=error
+            ))
+        except pygame.error:
+            pass  # Event system already shut down
@@ -0,0 +1,275 @@
+# core/fill.py
+from collections import deque
+import pygame
+from config.settings import FILL_TOLERANCE, FILL_CONNECTIVITY
+
+try:
+    import numpy as np
+except ImportError:  # surfarray needs numpy; fall back to the scanline fill
+    np = None
+
+
+def region_mask(surface, pos, tolerance=FILL_TOLERANCE, connectivity=FILL_CONNECTIVITY, blank=None):
+    """Boolean (width, height) mask of the region connected to pos.
+
+    Pixels belong to the region when every RGBA channel is within tolerance
+    of the seed pixel; with blank, fully transparent pixels count as that
+    color. Matching pixels are labelled as horizontal runs, runs on
+    neighbouring rows that touch are joined with a vectorized union-find,
+    and the runs sharing the seed's label form the region.
+    """
+    x, y = pos
+    # surfarray arrays are indexed [x, y]; the transpose is row-major
+    match = _match_mask(surface, seed_color(surface, pos, blank), tolerance, blank).T
+
+    # Number runs: a run starts wherever a match follows a non-match
+    starts = match.copy()
+    starts[:, 1:] &= ~match[:, :-1]
+    run_ids = np.cumsum(starts, axis=None, dtype=np.int32).reshape(match.shape)
+    run_ids[~match] = 0
+
+    # Pairs of touching runs on adjacent rows, one entry per pair
+    top, bottom = [], []
+    offsets = [(0, 0)] if connectivity == 4 else [(0, 0), (0, 1), (1, 0)]
+    for dt, db in offsets:
+        width = match.shape[1] - max(dt, db)
+        touch = match[:-1, dt:dt + width] & match[1:, db:db + width]
+        new_pair = touch.copy()
+        new_pair[:, 1:] &= ~touch[:, :-1] | starts[:-1, dt + 1:dt + width] | starts[1:, db + 1:db + width]
+        top.append(run_ids[:-1, dt:dt + width][new_pair])
+        bottom.append(run_ids[1:, db:db + width][new_pair])
+
+    labels = _union_runs(int(run_ids.max()) + 1, np.concatenate(top), np.concatenate(bottom))
+    in_region = labels == labels[run_ids[y, x]]
+    in_region[0] = False
+    return in_region[run_ids].T
+
+
+def _union_runs(count, a, b):
+    """Root label of every run after joining each pair (a[i], b[i])"""
+    labels = np.arange(count, dtype=np.int32)
+    while True:
+        la = labels[a]
+        lb = labels[b]
+        differ = la != lb
+        if not differ.any():
+            return labels
+        a, b = a[differ], b[differ]
+        la, lb = la[differ], lb[differ]
+
+        # Hook the larger root under the smaller one, then flatten the trees
+        np.minimum.at(labels, np.maximum(la, lb), np.minimum(la, lb))
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+
+
+def mask_tiles(mask, tile_size):
+    """Rects of the tile_size grid cells that contain part of mask"""
+    width, height = mask.shape
+    starts_x = np.arange(0, width, tile_size)
+    starts_y = np.arange(0, height, tile_size)
+    cells = np.add.reduceat(np.add.reduceat(mask.view(np.uint8), starts_x, axis=0, dtype=np.int32),
+                            starts_y, axis=1)
+    return [
+        pygame.Rect(tx * tile_size, ty * tile_size, tile_size, tile_size)
+        for tx, ty in zip(*np.nonzero(cells))
+    ]
+
+
+def paint_mask(surface, mask, color):
+    """Set every pixel under mask to color"""
+    pixels = pygame.surfarray.pixels2d(surface)
+    pixels[mask] = surface.map_rgb(color) & 0xFFFFFFFF
+    del pixels
+
+
+def seed_color(surface, pos, blank=None):
+    """Color of the pixel at pos, or blank if given and the pixel is fully transparent"""
+    color = surface.get_at(pos)
+    return pygame.Color(blank) if blank is not None and color.a == 0 else color
+
+
+def _match_mask(surface, old_color, tolerance, blank=None):
+    match = _raw_match(surface, old_color, tolerance)
+    if blank is None:
+        return match
+    transparent = pygame.surfarray.pixels_alpha(surface) == 0
+    if _within(pygame.Color(blank), old_color, tolerance):
+        return match | transparent
+    return match & ~transparent
+
+
+def _within(color, old_color, tolerance):
+    return all(abs(a - b) <= max(0, tolerance) for a, b in zip(color, old_color))
+
+
+def _raw_match(surface, old_color, tolerance):
+    if tolerance <= 0:
+        return pygame.surfarray.pixels2d(surface) == (surface.map_rgb(old_color) & 0xFFFFFFFF)
+
+    # Compare each channel against [old - tolerance, old + tolerance] in uint8
+    channels = [(pygame.surfarray.pixels3d(surface)[..., i], old_color[i]) for i in range(3)]
+    if surface.get_flags() & pygame.SRCALPHA:
+        channels.append((pygame.surfarray.pixels_alpha(surface), old_color.a))
+
+    match = None
+    for values, old in channels:
+        in_range = (values >= max(0, old - tolerance)) & (values <= min(255, old + tolerance))
+        match = in_range if match is None else match & in_range
+    return match
+
+
+def scanline_spans(surface, pos, blank=None):
+    """Spans (x_start, x_end, y) of the exact-color region connected to pos.
+
+    With blank, fully transparent pixels count as that color.
+    """
+    width, height = surface.get_size()
+
+    # map_rgb may return a signed value while PixelArray yields unsigned
+    old_color = seed_color(surface, pos, blank)
+    old_rgb = surface.map_rgb(old_color) & 0xFFFFFFFF
+    if blank is None:
+        matches = old_rgb.__eq__
+    else:
+        alpha = surface.get_masks()[3]
+        blank_matches = pygame.Color(blank) == old_color
+        matches = lambda value: value == old_rgb if value & alpha else blank_matches
+
+    q = deque()
+    q.append(pos)
+    visited = bytearray(width * height)
+    spans = []
+
+    with pygame.PixelArray(surface) as pixels:
+        while q:
+            x, y = q.popleft()
+
+            # Skip invalid coordinates
+            if x < 0 or x >= width or y < 0 or y >= height:
+                continue
+
+            # Skip visited and non-matching pixels
+            if visited[y*width + x] or not matches(pixels[x, y]):
+                continue
+
+            # Find west and east boundaries
+            west = east = x
+            while west >= 0 and matches(pixels[west, y]):
+                west -= 1
+            while east < width and matches(pixels[east, y]):
+                east += 1
+
+            # Mark the scanline
+            visited[y*width + west + 1:y*width + east] = b'\x01' * (east - west - 1)
+            spans.append((west + 1, east, y))
+
+            # Queue adjacent rows
+            for dx in range(west + 1, east):
+                if y > 0 and not visited[(y-1)*width + dx] and matches(pixels[dx, y-1]):
+                    q.append((dx, y-1))
+                if y < height-1 and not visited[(y+1)*width + dx] and matches(pixels[dx, y+1]):
+                    q.append((dx, y+1))
+
+    return spans
+
+
+def paint_spans(surface, spans, color):
+    """Paint spans returned by scanline_spans"""
+    new_rgb = surface.map_rgb(color) & 0xFFFFFFFF
+    with pygame.PixelArray(surface) as pixels:
+        for west, east, y in spans:
+            pixels[west:east, y] = new_rgb
+
+
+def flood_fill(surface, pos, color, tile_size, before=None, bounds=None, blank=None):
+    """Fill the region connected to pos, using NumPy when available.
+
+    Returns the rects painted: tile_size grid cells with NumPy, one span per
+    row without, and whole blank strips of the surface. before(rect) is
+    called for each of them before painting, so callers can keep what is
+    about to be covered.
+
+    blank, if given, is the color fully transparent pixels count as (the
+    paper, for the bottom layer). bounds, if given, covers every pixel that
+    is not transparent. The
+    region is then only traced inside it (plus a margin), and the blank
+    strips around it are filled whole when the region reaches them, so the
+    cost and the masks follow the painted area rather than the surface.
+    """
+    width, height = surface.get_size()
+    if not (0 <= pos[0] < width and 0 <= pos[1] < height):
+        return []  # Outside the surface (checked here: get_at overflows on huge coordinates)
+    old_color = seed_color(surface, pos, blank)
+    if old_color == color:
+        return []
+
+    window, strips = surface.get_rect(), []
+    if bounds is not None:
+        window, pos, strips = _window(surface, pos, old_color, tile_size, pygame.Rect(bounds), blank)
+    area = surface.subsurface(window)
+    seed = (pos[0] - window.left, pos[1] - window.top)
+    if np is not None:
+        mask = region_mask(area, seed, blank=blank)
+        rects = [rect.move(window.topleft) for rect in mask_tiles(mask, tile_size)]
+        inside = lambda x, y: mask[x - window.left, y - window.top]
+        paint = lambda: paint_mask(area, mask, color)
+    else:
+        spans = scanline_spans(area, seed, blank)
+        rects = [pygame.Rect(west + window.left, y + window.top, east - west, 1) for west, east, y in spans]
+        inside = lambda x, y: any(rect.collidepoint(x, y) for rect in rects)
+        paint = lambda: paint_spans(area, spans, color)
+    # A strip joins the region through the window's edge next to it, which is blank too
+    strips = [strip for strip, edge in strips if inside(*edge)]
+    rects += strips
+    if before is not None:
+        for rect in rects:
+            before(rect)
+    paint()
+    for strip in strips:
+        surface.fill(color, strip)
+    return rects
+
+
+def _window(surface, pos, old_color, tile_size, bounds, blank=None):
+    """Where to trace a fill when nothing outside bounds is painted.
+
+    Returns the window (tile-aligned, clipped to the surface), the seed moved
+    into it, and the (strip, edge pixel) pairs of the blank surface around it.
+    """
+    tolerance = FILL_TOLERANCE if np is not None else 0
+    full = surface.get_rect()
+    if not _within(pygame.Color(0, 0, 0, 0) if blank is None else pygame.Color(blank), old_color, tolerance):
+        # Blank pixels are not part of the region, so it lies inside bounds
+        window = _align(bounds, tile_size).clip(full)
+        return window, pos, []
+
+    # One blank pixel all around bounds keeps the strips connected through the window
+    window = _align(bounds.inflate(2, 2), tile_size).clip(full)
+    x, y = pos
+    if y < window.top:
+        pos = (min(max(x, window.left), window.right - 1), window.top)
+    elif y >= window.bottom:
+        pos = (min(max(x, window.left), window.right - 1), window.bottom - 1)
+    elif x < window.left:
+        pos = (window.left, y)
+    elif x >= window.right:
+        pos = (window.right - 1, y)
+
+    strips = [
+        ((0, 0, full.width, window.top), (window.left, window.top)),
+        ((0, window.bottom, full.width, full.height - window.bottom), (window.left, window.bottom - 1)),
+        ((0, window.top, window.left, window.height), (window.left, window.top)),
+        ((window.right, window.top, full.width - window.right, window.height), (window.right - 1, window.top)),
+    ]
+    return window, pos, [(pygame.Rect(strip), edge) for strip, edge in strips if strip[2] > 0 and strip[3] > 0]
+
+
+def _align(rect, tile_size):
+    """rect grown outwards to the tile_size grid"""
+    left, top = rect.left // tile_size * tile_size, rect.top // tile_size * tile_size
+    right, bottom = -(-rect.right // tile_size) * tile_size, -(-rect.bottom // tile_size) * tile_size
+    return pygame.Rect(left, top, right - left, bottom - top)
@@ -0,0 +1,148 @@
+# core/guess.py
+import re
+import unicodedata
+from collections import defaultdict
+from config.settings import GUESS_CLOSE_EDITS, GUESS_CHARS_PER_EDIT
+
+EXACT, CLOSE, MISS = 'exact', 'close', 'miss'
+
+_APOSTROPHES = re.compile(r"['’`]")  # Dropped, so "it's" and "its" match
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Casefolded, accent-free words of text, joined by single spaces"""
+    text = text.casefold()
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return ' '.join(_WORD.findall(_APOSTROPHES.sub('', text)))
+
+
+def close_edits(length):
+    """Edits a guess may be off by and still be close to a normalized phrase of length characters"""
+    return min(GUESS_CLOSE_EDITS, length // GUESS_CHARS_PER_EDIT)
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or None if it is over limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    # A typo leaves the rest of the phrase alone; only the middle needs the table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return len(a) + len(b)
+
+    # Only cells within limit of the diagonal can stay within limit
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = min(previous[j - 1] + (ca != b[j - 1]), previous[j] + 1, current[j - 1] + 1)
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def _pieces(text, count):
+    """text cut into count consecutive pieces of near-equal length, with their offsets"""
+    size, extra = divmod(len(text), count)
+    start = 0
+    for index in range(count):
+        end = start + size + (index < extra)
+        yield start, text[start:end]
+        start = end
+
+
+class GuessIndex:
+    """The word bank, normalized once, for telling how close chat guesses are.
+
+    match() checks a guess against every phrase: exact when the normalized
+    texts are equal, close when it is within close_edits() edits of one,
+    otherwise a miss. check() does the same for the one phrase a room is
+    drawing.
+
+    Close matches are found through an index of phrase pieces. A phrase
+    allowed k edits is cut into k + 1 pieces; k edits can spoil at most k
+    of them, so any guess close to the phrase contains a piece unchanged,
+    within k characters of where it sits in the phrase. A guess is
+    therefore only compared with the few phrases sharing such a piece and
+    of a length within k of its own.
+    """
+
+    def __init__(self, words):
+        self.phrases = {}     # Normalized phrase -> first phrase in the bank with that form
+        self.normalized = {}  # Phrase as given -> normalized form
+        self.pieces = defaultdict(list)  # Piece -> [(normalized phrase, offset)]
+        for word in words:
+            key = normalize(word)
+            self.normalized[word] = key
+            if not key or key in self.phrases:
+                continue  # Nothing to guess, or a duplicate
+            self.phrases[key] = word
+            limit = close_edits(len(key))
+            if limit:
+                for start, piece in _pieces(key, limit + 1):
+                    self.pieces[piece].append((key, start))
+        self.pieces = dict(self.pieces)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def check(self, guess, answer):
+        """EXACT, CLOSE or MISS for a guess at one phrase"""
+        target = self.normalized.get(answer)
+        if target is None:
+            target = normalize(answer)
+        guess = normalize(guess)
+        if guess == target:
+            return EXACT
+        return CLOSE if target and edit_distance(guess, target, close_edits(len(target))) is not None else MISS
+
+    def match(self, guess):
+        """(EXACT, CLOSE or MISS, phrase) for a guess at the whole bank.
+
+        phrase is the bank entry matched (the nearest one when close), or
+        None for a miss.
+        """
+        guess = normalize(guess)
+        phrase = self.phrases.get(guess)
+        if phrase is not None:
+            return EXACT, phrase
+
+        length = len(guess)
+        sizes = set()
+        for other in range(max(1, length - GUESS_CLOSE_EDITS), length + GUESS_CLOSE_EDITS + 1):
+            limit = close_edits(other)
+            if limit and abs(other - length) <= limit:
+                sizes.update(len(piece) for _, piece in _pieces('.' * other, limit + 1))
+
+        best, best_distance = None, None
+        tried = set()
+        for size in sorted(sizes):
+            for offset in range(length - size + 1):
+                for key, start in self.pieces.get(guess[offset:offset + size], ()):
+                    limit = close_edits(len(key))
+                    if abs(offset - start) > limit or abs(len(key) - length) > limit or key in tried:
+                        continue
+                    tried.add(key)
+                    distance = edit_distance(guess, key, limit)
+                    if distance is not None and (best is None or distance < best_distance):
+                        best, best_distance = key, distance
+        if best is None:
+            return MISS, None
+        return CLOSE, self.phrases[best]
@@ -0,0 +1,293 @@
+# core/history.py
+import math
+import zlib
+from collections import deque
+import pygame
+from config.settings import (
+    HISTORY_TILE_SIZE,
+    HISTORY_BUDGET,
+    HISTORY_COMPRESS_LEVEL,
+    HISTORY_CHECKPOINT_EDITS,
+)
+from core import fill, stroke
+from core.backing import canvas_surface
+from core.profiler import count
+from utils.images import put_tile
+
+
+def tile_keys(rect, tile_size, bounds):
+    """Keys (tx, ty) of the tile_size grid cells overlapping rect, within bounds"""
+    rect = pygame.Rect(rect).clip(bounds)
+    if rect.width <= 0 or rect.height <= 0:
+        return []
+    return [
+        (tx, ty)
+        for ty in range(rect.top // tile_size, (rect.bottom - 1) // tile_size + 1)
+        for tx in range(rect.left // tile_size, (rect.right - 1) // tile_size + 1)
+    ]
+
+
+def replay(surface, op, rect, scale=1.0):
+    """Apply a recorded operation to surface, with coordinates multiplied by scale.
+
+    rect is the area the operation changed when it was recorded; only
+    ('clear',) needs it.
+    """
+    kind = op[0]
+    if kind == 'stroke':
+        points = [(round(x * scale), round(y * scale)) for x, y in op[1]]
+        stroke.draw_stroke(surface, op[2], points, round(op[3] * scale))
+    elif kind == 'fill':
+        fill.flood_fill(surface, (int(op[1][0] * scale), int(op[1][1] * scale)), op[2], HISTORY_TILE_SIZE,
+                        blank=op[3])
+    elif kind == 'clear':
+        left, top = math.floor(rect.left * scale), math.floor(rect.top * scale)
+        surface.fill((0, 0, 0, 0), (left, top, math.ceil(rect.right * scale) - left,
+                                    math.ceil(rect.bottom * scale) - top))
+    else:
+        raise ValueError(f"can't replay {kind!r}")
+
+
+class _Checkpoint:
+    """Layer pixels after the first `index` edits of the undo stack.
+
+    Kept as zlib-compressed raw tiles, only where something is painted;
+    tiles unchanged since the previous checkpoint are the same bytes
+    objects as its own.
+    """
+    __slots__ = ('index', 'tiles')
+
+    def __init__(self, index, tiles):
+        self.index = index
+        self.tiles = tiles  # (tx, ty) -> compressed pixels
+
+
+class CommandHistory:
+    """Undo/redo history that records edits as operations rather than pixels.
+
+    Each edit is the list of operations the canvas applied (the
+    ('stroke', points, color, radius) and ('clear',) tuples it sends to the
+    journal and the room, and ('fill', pos, color, blank) with the color
+    blank pixels counted as), with the rect each changed. Raster checkpoints of the layer are taken every
+    `checkpoint_edits` edits and after each fill or clear; a checkpoint
+    only stores the tiles changed since the one before. Undo rebuilds the
+    previous state over the area of the edit undone, from the nearest
+    checkpoint and the strokes after it; redo replays the edit on the layer
+    itself.
+
+    Once the history passes `budget` bytes, the oldest checkpoint goes with
+    the edits before the next one. While the edits still reach back to a
+    blank layer, render() redraws the layer at any resolution.
+
+    Drawing code calls capture() with the area it is about to modify, then
+    record() with the operation once applied; capture() only takes the
+    first checkpoint. Undo rebuilds tiles on a scratch surface that only
+    covers them.
+    """
+
+    def __init__(self, surface, painted=None, checkpoint_edits=HISTORY_CHECKPOINT_EDITS,
+                 budget=HISTORY_BUDGET, tile_size=HISTORY_TILE_SIZE):
+        self.surface = surface
+        self.painted = painted  # Returns a rect outside which the surface is transparent
+        self.checkpoint_edits = checkpoint_edits
+        self.budget = budget
+        self.tile_size = tile_size
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        self.checkpoints = []  # Oldest first; the first is taken before the first edit
+        self.pending = []      # (op, rect) applied since the last commit
+        self.nbytes = 0
+        self.dropped = 0
+
+    def tile_rect(self, key):
+        """Canvas rect covered by a tile key, clipped to the canvas"""
+        ts = self.tile_size
+        return pygame.Rect(key[0] * ts, key[1] * ts, ts, ts).clip(self.surface.get_rect())
+
+    def tiles_for(self, rect):
+        """Keys of all tiles overlapping rect"""
+        return tile_keys(rect, self.tile_size, self.surface.get_rect())
+
+    def _tile_surface(self, pixels, size):
+        tile = pygame.Surface(size, self.surface.get_flags() & pygame.SRCALPHA, self.surface)
+        tile.get_buffer().write(pixels)
+        return tile
+
+    def capture(self, rect):
+        """Take the first checkpoint before the layer is first changed"""
+        if not self.checkpoints:
+            painted = self.surface.get_bounding_rect() if self.painted is None else self.painted()
+            self._checkpoint(self.tiles_for(painted))
+
+    def record(self, op, rect):
+        """Add an operation just applied to the layer to the pending edit.
+
+        Operations that changed no pixels are left out: those entirely off
+        the layer, and erasing where painted() (not yet extended by rect)
+        says nothing was painted.
+        """
+        rect = pygame.Rect(rect).clip(self.surface.get_rect())
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        if op[0] == 'stroke' and len(op[2]) == 4 and op[2][3] == 0 and self.painted is not None:
+            if not rect.colliderect(self.painted()):
+                return
+        self.capture(rect)
+        self.pending.append((op, rect))
+
+    def commit(self):
+        """Push the pending operations as one undoable edit"""
+        edit, self.pending = self.pending, []
+        if not edit:
+            return False
+
+        for old in self.redo_stack:
+            self.nbytes -= _edit_bytes(old)
+        self.redo_stack.clear()
+        # Checkpoints of undone states can no longer be reached
+        while self.checkpoints[-1].index > len(self.undo_stack):
+            self._drop_checkpoint(-1, self.checkpoints[-2])
+
+        self.undo_stack.append(edit)
+        self.nbytes += _edit_bytes(edit)
+        last = self.checkpoints[-1]
+        # Fills are slow to replay, so undo never has to
+        if (len(self.undo_stack) - last.index >= self.checkpoint_edits
+                or any(op[0] != 'stroke' for op, _ in edit)):
+            changed = set()
+            for since in list(self.undo_stack)[last.index:]:
+                for _, rect in since:
+                    changed.update(self.tiles_for(rect))
+            self._checkpoint(changed)
+        while self.nbytes > self.budget and len(self.checkpoints) > 1:
+            self._forget_oldest()
+        return True
+
+    def discard(self):
+        """Forget pending operations without recording an edit"""
+        self.pending = []
+
+    def undo(self):
+        """Rebuild the state before the last edit, returning the area changed"""
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        area = _edit_area(edit)
+        if area.width <= 0 or area.height <= 0:
+            return None
+        target = len(self.undo_stack)
+        checkpoint = next(cp for cp in reversed(self.checkpoints) if cp.index <= target)
+
+        # Only strokes follow a checkpoint, and they read no pixels, so just
+        # the tiles the edit touched are rebuilt, on a scratch covering only
+        # them, replaying only the strokes that cross them. pygame fills
+        # polygons crossing a surface's edge a little differently along that
+        # edge, so the scratch reaches a pixel further, up to the layer's own.
+        keys = {key for _, rect in edit for key in self.tiles_for(rect)}
+        reach = area.unionall([self.tile_rect(key) for key in keys])
+        ops = [entry for index in range(checkpoint.index, target) for entry in self.undo_stack[index]]
+        if all(op[0] == 'stroke' for op, _ in ops):
+            bounds = reach.inflate(2, 2).clip(self.surface.get_rect())
+            origin = bounds.topleft
+            scratch = canvas_surface(bounds.size)
+            self._restore(scratch, checkpoint, keys, origin)
+            for op, rect in ops:
+                if rect.colliderect(reach):
+                    points = [(x - origin[0], y - origin[1]) for x, y in op[1]]
+                    replay(scratch, ('stroke', points, op[2], op[3]), rect)
+        else:
+            origin = (0, 0)
+            scratch = canvas_surface(self.surface.get_size())
+            self._restore(scratch, checkpoint, checkpoint.tiles)
+            for op, rect in ops:
+                replay(scratch, op, rect)
+        for key in keys:
+            rect = self.tile_rect(key)
+            put_tile(self.surface, scratch.subsurface(rect.move(-origin[0], -origin[1])), rect.topleft)
+        count('surfaces', len(keys))
+        return area
+
+    def redo(self):
+        """Replay the last undone edit, returning the area changed"""
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        for op, rect in edit:
+            replay(self.surface, op, rect)
+        return _edit_area(edit)
+
+    def render(self, size):
+        """The layer as it is now, redrawn from its operations at size.
+
+        Returns None once old edits have been dropped, or if the layer had
+        paint before its first edit, as the history then starts from pixels.
+        """
+        if self.checkpoints and (self.checkpoints[0].index or self.checkpoints[0].tiles):
+            return None
+        surface = canvas_surface(size)
+        scale = min(size[0] / self.surface.get_width(), size[1] / self.surface.get_height())
+        for edit in self.undo_stack:
+            for op, rect in edit:
+                replay(surface, op, rect, scale)
+        return surface
+
+    def stats(self):
+        """Current memory use and depth of the history"""
+        return {
+            'undo_edits': len(self.undo_stack),
+            'redo_edits': len(self.redo_stack),
+            'operations': sum(len(edit) for edit in self.undo_stack) + sum(len(edit) for edit in self.redo_stack),
+            'checkpoints': len(self.checkpoints),
+            'bytes': self.nbytes,
+            'budget': self.budget,
+            'dropped_edits': self.dropped,
+        }
+
+    def _checkpoint(self, keys):
+        """Checkpoint the current state, copying the tiles in keys"""
+        tiles = dict(self.checkpoints[-1].tiles) if self.checkpoints else {}
+        for key in keys:
+            pixels = self.surface.subsurface(self.tile_rect(key)).copy().get_view('0').raw
+            count('surfaces')
+            if pixels == bytes(len(pixels)):
+                tiles.pop(key, None)  # Blank again
+            else:
+                tiles[key] = zlib.compress(pixels, HISTORY_COMPRESS_LEVEL)
+                self.nbytes += len(tiles[key])
+        self.checkpoints.append(_Checkpoint(len(self.undo_stack), tiles))
+
+    def _restore(self, surface, checkpoint, keys, origin=(0, 0)):
+        """Copy the checkpoint's tiles in keys onto a transparent surface whose top left is origin"""
+        for key in keys:
+            pixels = checkpoint.tiles.get(key)
+            if pixels is not None:
+                rect = self.tile_rect(key).move(-origin[0], -origin[1])
+                put_tile(surface, self._tile_surface(zlib.decompress(pixels), rect.size), rect.topleft)
+                count('surfaces')
+
+    def _drop_checkpoint(self, position, neighbour):
+        """Remove a checkpoint, freeing the tiles it does not share with neighbour"""
+        checkpoint = self.checkpoints.pop(position)
+        self.nbytes -= sum(len(pixels) for key, pixels in checkpoint.tiles.items()
+                           if neighbour.tiles.get(key) is not pixels)
+
+    def _forget_oldest(self):
+        """Drop the oldest checkpoint and the edits only it could rebuild"""
+        self._drop_checkpoint(0, self.checkpoints[1])
+        shift = self.checkpoints[0].index
+        for _ in range(shift):
+            self.nbytes -= _edit_bytes(self.undo_stack.popleft())
+            self.dropped += 1
+        for checkpoint in self.checkpoints:
+            checkpoint.index -= shift
+
+
+def _edit_area(edit):
+    return edit[0][1].unionall([rect for _, rect in edit])
+
+
+def _edit_bytes(edit):
+    """Rough size of an edit's operations"""
+    return sum(64 + 16 * len(op[1]) if op[0] == 'stroke' else 64 for op, _ in edit)
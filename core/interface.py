@@ -1,30 +1,68 @@
 # core/interface.py
 import pygame
 from config.settings import BG_COLOR
+from core.cursor import update_system_cursor
+from core.profiler import phase, count
 
 def draw_interface(screen, canvas_manager, tools, tool_state, canvas_area, icons, 
-                  draw_enhanced_cursor, background_image=None):
-    
-    # Draw canvas
-    scaled_canvas = pygame.transform.smoothscale(
-        canvas_manager.surface, 
-        (canvas_area.width, canvas_area.height)
-    )
-    screen.blit(scaled_canvas, canvas_area.topleft)
-    pygame.draw.rect(screen, (0, 0, 0), canvas_area, 2)
+                  draw_enhanced_cursor, background_image=None, renderer=None, smooth=True):
+    """Redraw the damaged parts of the window and return them for display.update.
+
+    smooth=False scales the canvas quickly and roughly (while resizing).
+    """
     
     # Update color button states
     for item in tools:
-        if item['type'] == 'color':
+        if item.type == 'color':
             current_color = tool_state.brush_color
-            item['button'].active = (item['color'] == current_color)
-            
-        item['button'].draw(screen)
-    
-    
-    # Draw cursor
+            item.button.active = (item.color == current_color)
+
+    with phase('scale'):
+        scaled_canvas = canvas_manager.get_scaled(
+            (canvas_area.width, canvas_area.height), smooth
+        )
     mouse_pos = pygame.mouse.get_pos()
-    if canvas_area.collidepoint(mouse_pos):
-        draw_enhanced_cursor(screen, tool_state, mouse_pos, icons)
+    cursor_pos = mouse_pos if canvas_area.collidepoint(mouse_pos) else None
     
-    pygame.display.flip()
\ No newline at end of file
+    # A hardware cursor follows the mouse on its own; nothing to redraw
+    if update_system_cursor(tool_state, icons, cursor_pos is not None):
+        cursor_pos = None
+
+    with phase('damage'):
+        if renderer is None:
+            dirty = [screen.get_rect()]
+        else:
+            dirty = renderer.collect(screen, canvas_manager, tools, tool_state, canvas_area, cursor_pos)
+
+    for rect in dirty:
+        screen.set_clip(rect)
+
+        with phase('background'):
+            # Draw background
+            if background_image:
+                screen.blit(background_image, rect, rect)
+            else:
+                screen.fill(BG_COLOR, rect)
+
+            # Draw canvas
+            screen.blit(scaled_canvas, canvas_area.topleft)
+            pygame.draw.rect(screen, (0, 0, 0), canvas_area, 2)
+        count('draw_calls', 6)
+
+        # Draw buttons
+        with phase('buttons'):
+            for item in tools:
+                btn = item.button
+                if btn.bounds().colliderect(rect):
+                    btn.draw(screen)
+                    count('draw_calls')
+
+        # Draw cursor
+        if cursor_pos is not None:
+            with phase('cursor'):
+                draw_enhanced_cursor(screen, tool_state, cursor_pos, icons)
+            count('draw_calls')
+
+    screen.set_clip(None)
+    return dirty
+
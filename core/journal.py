@@ -0,0 +1,370 @@
+# core/journal.py
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+import pygame
+from config.settings import (
+    JOURNAL_DIR,
+    JOURNAL_CHECKPOINT_SECONDS,
+    JOURNAL_CHECKPOINT_OPS,
+    JOURNAL_COMPRESS_LEVEL,
+    JOURNAL_TILE_SIZE,
+    LAYER_BLEND_MODES,
+)
+from core.history import tile_keys
+from core.layers import Layer
+from net.protocol import (
+    MSG_OPS, ProtocolError, decode_message, decode_ops, encode_message, encode_ops
+)
+from utils.images import decode_raw, encode_raw, put_tile
+
+REC_PATCH = 3  # Journal-only record: x, y, w, h then zlib RGBA pixels
+_PATCH_HEADER = struct.Struct('<HHHH')
+_CHECKPOINT_HEADER = struct.Struct('<4sBBII')  # magic, layer count, active layer, canvas width, height
+_CHECKPOINT_MAGIC = b'SCL2'
+_LAYER_HEADER = struct.Struct('<BBBIIIII')     # visible, opacity, blend mode, bounds x, y, w, h, image length
+_FILE_NAME = re.compile(r'^(checkpoint|journal)-(\d+)\.bin$')
+
+
+class Journal:
+    """Append-only log of canvas operations with periodic checkpoints.
+
+    Operations are collected as the canvas emits them, handed to a daemon
+    writer thread once per frame by tick(), and encoded with the network
+    protocol. Every so often, between edits, tick() snapshots the layers:
+    the writer compresses it to checkpoint-N, continues in journal-N and
+    then removes older files. Recovery loads the newest checkpoint and
+    replays the journal after it.
+
+    Undo and redo are logged with the pixels they restored, because the
+    history they relied on may predate the checkpoint being replayed.
+    Recovery applies only those pixels and starts the layer's history
+    over, so after recovery undo reaches back to the last checkpoint or
+    the last undo or redo on that layer, whichever came later.
+
+    A checkpoint copies only the tiles painted since the one before. The
+    writer keeps every layer's painted tiles (compressed) and puts the
+    layer images together from them, so the frame loop never copies a
+    whole layer.
+    """
+
+    def __init__(self, canvas_manager, directory=JOURNAL_DIR):
+        self.canvas_manager = canvas_manager
+        self.directory = directory
+        self.sequence = 0
+        self.outbox = []        # Operations of the current frame
+        self.queue = queue.Queue()
+        self.thread = None
+        self.last_damage = None
+        self.logged = 0         # Operations since the last checkpoint
+        self.last_checkpoint = time.monotonic()
+        self.tracked = {}       # Layer -> number the writer knows its tiles by
+        self.layers = 0         # Numbers handed out
+        self.changed = {}       # Layer -> keys of tiles painted since the last checkpoint
+        self.version = None     # Canvas version whose damage was tracked last
+        self.tiles = {}         # Writer thread: layer number -> {(tx, ty): compressed RGBA pixels}
+
+    def _path(self, kind, sequence):
+        return os.path.join(self.directory, f"{kind}-{sequence:06d}.bin")
+
+    def _files(self, kind):
+        """Sequence numbers of the files of kind on disk, oldest first"""
+        found = []
+        for name in os.listdir(self.directory):
+            match = _FILE_NAME.match(name)
+            if match and match.group(1) == kind:
+                found.append(int(match.group(2)))
+        return sorted(found)
+
+    def recover(self):
+        """Restore the canvas from disk, returning the number of operations replayed"""
+        os.makedirs(self.directory, exist_ok=True)
+        # Nothing shows the canvas yet, so it is composited once at the end
+        with self.canvas_manager.hold_refresh():
+            start = 0
+            for sequence in reversed(self._files('checkpoint')):
+                if self._load_checkpoint(self._path('checkpoint', sequence)):
+                    start = sequence
+                    break
+
+            replayed = 0
+            journals = [seq for seq in self._files('journal') if seq >= start]
+            for sequence in journals:
+                replayed += self._replay(self._path('journal', sequence))
+            self.sequence = journals[-1] if journals else start
+
+        # Commit an edit cut short by the crash so it can be undone
+        self.canvas_manager.save_state()
+        return replayed
+
+    def _load_checkpoint(self, path):
+        size = self.canvas_manager.composite.get_size()
+        try:
+            with open(path, 'rb') as f:
+                layers, active = decode_checkpoint(f.read(), size)
+        except (OSError, ValueError):
+            return False
+        self.canvas_manager.load_layers(layers, active)
+        return True
+
+    def _replay(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        count = offset = 0
+        while offset < len(data):
+            try:
+                kind, body, end = decode_message(data, offset)
+                if kind == MSG_OPS:
+                    for op in decode_ops(body):
+                        if op[0] in ('undo', 'redo'):
+                            count += 1  # Its patch follows
+                        else:
+                            count += self.canvas_manager.apply_op(op)
+                elif kind == REC_PATCH:
+                    self._apply_patch(body)
+            except (ProtocolError, struct.error, zlib.error):
+                break  # Torn write at the end of a crashed session
+            offset = end
+
+        if offset < len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return count
+
+    def _apply_patch(self, body):
+        x, y, w, h = _PATCH_HEADER.unpack_from(body)
+        pixels = zlib.decompress(body[_PATCH_HEADER.size:])
+        self.canvas_manager.apply_op(('patch', (x, y, w, h), pixels))
+
+    def start(self):
+        """Begin logging the canvas's operations"""
+        self.canvas_manager.op_listeners.append(self._record)
+        self.canvas_manager.damage_listeners.append(self._track_damage)
+        # From here on, every tile painted is tracked; the writer starts from the rest
+        for layer in self.canvas_manager.layers:
+            self.queue.put([('tiles', self._track(layer), self._copy_tiles(layer, self._tile_keys(layer.bounds)))])
+        self.thread = threading.Thread(target=self._run, args=(self.sequence,), daemon=True)
+        self.thread.start()
+
+    def _track_damage(self, rect):
+        self.last_damage = rect
+        # Pixels only change on the active layer, always with a new version
+        canvas = self.canvas_manager
+        if canvas.version != self.version:
+            self.version = canvas.version
+            self.changed.setdefault(canvas.layer, set()).update(self._tile_keys(rect))
+
+    def _record(self, op):
+        self.outbox.append(op)
+        self.logged += 1
+        if op[0] == 'layer_add':
+            self._track(self.canvas_manager.layer)  # Blank, so the writer has all its tiles
+        if op[0] in ('undo', 'redo'):
+            # Undo/redo emit after marking the restored area dirty
+            rect = pygame.Rect(self.last_damage)
+            pixels = pygame.image.tostring(self.canvas_manager.surface.subsurface(rect), 'RGBA')
+            self.outbox.append(('patch', rect, pixels))
+
+    def tick(self):
+        """Hand this frame's operations to the writer and checkpoint when due"""
+        if self.outbox:
+            self.queue.put(self.outbox)
+            self.outbox = []
+        if not self.logged or self.canvas_manager.has_changes():
+            return  # Nothing new, or an edit is still in progress
+        if (self.logged >= JOURNAL_CHECKPOINT_OPS
+                or time.monotonic() - self.last_checkpoint >= JOURNAL_CHECKPOINT_SECONDS):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Queue a snapshot of the canvas; later operations go to a new journal file"""
+        if self.outbox:
+            self.queue.put(self.outbox)  # They happened before the snapshot
+            self.outbox = []
+        self.sequence += 1
+        canvas = self.canvas_manager
+        tracked, layers = {}, []
+        for layer in canvas.layers:
+            number = self.tracked.get(layer)
+            if number is None:  # Loaded since, e.g. from a snapshot
+                number = self._track(layer)
+                tiles = self._copy_tiles(layer, self._tile_keys(layer.bounds))
+            else:
+                tiles = self._copy_tiles(layer, self.changed.get(layer, ()))
+            tracked[layer] = number
+            layers.append((number, tiles, tuple(layer.bounds), layer.visible, layer.opacity, layer.blend))
+        self.tracked, self.changed = tracked, {}
+        self.queue.put([('checkpoint', self.sequence, layers, canvas.active, canvas.size)])
+        self.logged = 0
+        self.last_checkpoint = time.monotonic()
+
+    def _tile_keys(self, rect):
+        return tile_keys(rect, JOURNAL_TILE_SIZE, self.canvas_manager.composite.get_rect())
+
+    def _track(self, layer):
+        self.layers += 1
+        self.tracked[layer] = self.layers
+        return self.layers
+
+    def _copy_tiles(self, layer, keys):
+        """{key: RGBA pixels, or None if blank} of the layer's tiles in keys"""
+        bounds = self.canvas_manager.composite.get_rect()
+        tiles = {}
+        for key in keys:
+            pixels = pygame.image.tostring(layer.surface.subsurface(_tile_rect(key, bounds)), 'RGBA')
+            tiles[key] = None if pixels == bytes(len(pixels)) else pixels
+        return tiles
+
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        if self.thread is None:
+            return
+        if self.outbox:
+            self.queue.put(self.outbox)
+            self.outbox = []
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self, sequence):
+        journal = open(self._path('journal', sequence), 'ab')
+        try:
+            while True:
+                batches = [self.queue.get()]
+                while True:
+                    try:
+                        batches.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                for batch in batches:
+                    if batch is None:
+                        return
+                    journal = self._write(journal, batch)
+                journal.flush()
+        finally:
+            journal.close()
+
+    def _write(self, journal, batch):
+        ops = []
+        for item in batch:
+            kind = item[0]
+            if kind in ('patch', 'checkpoint', 'tiles') and ops:
+                journal.write(encode_message(MSG_OPS, encode_ops(ops)))
+                ops = []
+            if kind == 'patch':
+                rect, pixels = item[1], item[2]
+                body = _PATCH_HEADER.pack(*rect) + zlib.compress(pixels, JOURNAL_COMPRESS_LEVEL)
+                journal.write(encode_message(REC_PATCH, body))
+            elif kind == 'tiles':
+                self._store_tiles(item[1], item[2])
+            elif kind == 'checkpoint':
+                journal.close()
+                self._write_checkpoint(*item[1:])
+                journal = open(self._path('journal', item[1]), 'ab')
+            else:
+                ops.append(item)
+        if ops:
+            journal.write(encode_message(MSG_OPS, encode_ops(ops)))
+        return journal
+
+    def _store_tiles(self, number, tiles):
+        """Update the writer's copy of a layer's painted tiles, returning it"""
+        known = self.tiles.setdefault(number, {})
+        for key, pixels in tiles.items():
+            if pixels is None:
+                known.pop(key, None)
+            else:
+                known[key] = zlib.compress(pixels, JOURNAL_COMPRESS_LEVEL)
+        return known
+
+    def _write_checkpoint(self, sequence, layers, active, size):
+        images = [(_assemble(self._store_tiles(number, tiles), bounds, size), bounds, *rest)
+                  for number, tiles, bounds, *rest in layers]
+        # Layers no longer on the canvas are forgotten
+        self.tiles = {number: self.tiles[number] for number, *_ in layers}
+        data = encode_checkpoint(images, active, size)
+
+        # Write then rename, so a crash never leaves a half-written checkpoint
+        path = self._path('checkpoint', sequence)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+        for kind in ('checkpoint', 'journal'):
+            for old in self._files(kind):
+                if old < sequence:
+                    os.remove(self._path(kind, old))
+
+
+def encode_checkpoint(layers, active, size):
+    """Checkpoint file contents: (RGBA pixels of bounds, bounds, visible, opacity, blend) per layer"""
+    parts = [_CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, len(layers), active, *size)]
+    for pixels, bounds, visible, opacity, blend in layers:
+        x, y, w, h = bounds
+        image = encode_raw(pixels, (w, h), JOURNAL_COMPRESS_LEVEL) if w and h else b''
+        parts.append(_LAYER_HEADER.pack(visible, opacity, LAYER_BLEND_MODES.index(blend),
+                                        x, y, w, h, len(image)))
+        parts.append(image)
+    return b''.join(parts)
+
+
+def decode_checkpoint(data, size):
+    """(layers, active index) from a checkpoint; raises ValueError if it is not valid"""
+    try:
+        magic, count, active, width, height = _CHECKPOINT_HEADER.unpack_from(data)
+        if magic != _CHECKPOINT_MAGIC or not count or active >= count:
+            raise ValueError("not a checkpoint")
+        if (width, height) != tuple(size):
+            raise ValueError("checkpoint is for a different canvas size")
+        offset = _CHECKPOINT_HEADER.size
+        canvas = pygame.Rect((0, 0), size)
+        layers = []
+        for _ in range(count):
+            visible, opacity, blend, x, y, w, h, length = _LAYER_HEADER.unpack_from(data, offset)
+            offset += _LAYER_HEADER.size
+            bounds = pygame.Rect(x, y, w, h)
+            layer = Layer(size)
+            if bounds.width:
+                image = decode_raw(data[offset:offset + length])
+                if not canvas.contains(bounds) or image.get_size() != bounds.size:
+                    raise ValueError("not a checkpoint: layer image does not match its bounds")
+                put_tile(layer.surface, image, bounds.topleft)
+                layer.bounds = bounds
+            offset += length
+            layer.visible, layer.opacity, layer.blend = bool(visible), opacity, LAYER_BLEND_MODES[blend]
+            layers.append(layer)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"not a checkpoint: {e}")
+    return layers, active
+
+
+def _tile_rect(key, bounds):
+    size = JOURNAL_TILE_SIZE
+    return pygame.Rect(key[0] * size, key[1] * size, size, size).clip(bounds)
+
+
+def _assemble(tiles, bounds, size):
+    """RGBA pixels of the bounds rect of a layer, from its compressed painted tiles"""
+    x, y, w, h = bounds
+    image = bytearray(w * h * 4)
+    area = pygame.Rect(bounds)
+    canvas = pygame.Rect((0, 0), size)
+    for key, pixels in tiles.items():
+        rect = _tile_rect(key, canvas)
+        part = rect.clip(area)
+        if part.width <= 0 or part.height <= 0:
+            continue
+        length = part.width * 4
+        pixels = zlib.decompress(pixels)
+        for row in range(part.top, part.bottom):
+            start = ((row - rect.top) * rect.width + part.left - rect.left) * 4
+            end = ((row - y) * w + part.left - x) * 4
+            image[end:end + length] = pixels[start:start + length]
+    return bytes(image)
@@ -0,0 +1,44 @@
+# core/latency.py
+import time
+from collections import deque
+from config.settings import LATENCY_WINDOW
+
+
+class LatencyMonitor:
+    """Input-to-present latency over a sliding window of frames.
+
+    pygame events carry no timestamps, so input() should be called as soon
+    as events are drained; the sample then covers coalescing, drawing and
+    presenting. Only the oldest unpresented input of a frame is timed.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.pending = None
+
+    def input(self, timestamp=None):
+        """Note that an input arrived (at timestamp, from time.perf_counter)"""
+        if self.pending is None:
+            self.pending = time.perf_counter() if timestamp is None else timestamp
+
+    def presented(self):
+        """Close the sample for inputs handled before this present"""
+        if self.pending is not None:
+            self.samples.append(time.perf_counter() - self.pending)
+            self.pending = None
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Latency in milliseconds at each percentile, or {} without samples"""
+        if not self.samples:
+            return {}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {p: ordered[min(last, round(last * p / 100))] * 1000 for p in points}
+
+    def report(self):
+        """One-line summary for logs"""
+        values = self.percentiles()
+        if not values:
+            return "input latency: no samples"
+        parts = ", ".join(f"p{p} {ms:.1f} ms" for p, ms in values.items())
+        return f"input latency ({len(self.samples)} frames): {parts}"
@@ -0,0 +1,138 @@
+# core/layers.py
+import pygame
+from config.settings import LAYER_BLEND_MODES
+from core.backing import canvas_surface
+from core.history import CommandHistory
+from core.profiler import count
+
+# pygame blit flags for each blend mode; normal is plain alpha blending
+BLEND_FLAGS = {
+    'normal': 0,
+    'multiply': pygame.BLEND_RGB_MULT,
+    'add': pygame.BLEND_RGB_ADD,
+    'subtract': pygame.BLEND_RGB_SUB,
+    'lighten': pygame.BLEND_RGB_MAX,
+    'darken': pygame.BLEND_RGB_MIN,
+}
+assert set(BLEND_FLAGS) == set(LAYER_BLEND_MODES)
+
+TRANSPARENT = (0, 0, 0, 0)
+
+
+class Layer:
+    """One drawing surface of the canvas with its own undo history.
+
+    `bounds` covers every pixel that may be non-transparent, so compositing
+    can skip layers that have nothing under a damaged rect.
+    """
+
+    def __init__(self, size, color=TRANSPARENT):
+        self.surface = canvas_surface(size)
+        if color != TRANSPARENT:
+            self.surface.fill(color)
+        self.history = CommandHistory(self.surface, lambda: self.bounds)
+        self.visible = True
+        self.opacity = 255
+        self.blend = 'normal'
+        self.bounds = self.surface.get_rect() if len(color) == 3 or color[3] else pygame.Rect(0, 0, 0, 0)
+
+    def touch(self, rect):
+        """Extend bounds by a rect whose pixels changed"""
+        rect = pygame.Rect(rect).clip(self.surface.get_rect())
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        self.bounds = self.bounds.union(rect) if self.bounds.width else rect
+
+    def reset_history(self):
+        """Start an empty undo history from the pixels as they are now"""
+        self.history = CommandHistory(self.surface, lambda: self.bounds)
+
+    def shrink_bounds(self):
+        """Recompute bounds from the pixels (after loading or clearing)"""
+        self.bounds = self.surface.get_bounding_rect()
+
+
+class Compositor:
+    """Flattened image of a layer stack, kept up to date region by region.
+
+    update() recomposes one rect from the layers that have content there;
+    the rest of the cached image is left alone, so editing one layer costs
+    a blit per layer overlapping the edit rather than a full redraw. The
+    layers are blended over `background` (the paper), but only where they
+    have content: elsewhere the image stays transparent and flattened()
+    adds the paper. Pixels never painted are thus never written, and on a
+    memory-mapped board never take memory.
+    """
+
+    def __init__(self, size, background=TRANSPARENT):
+        self.surface = canvas_surface(size)
+        self.background = background
+        self.painted = pygame.Rect(0, 0, 0, 0)  # Covers every pixel that is not transparent
+
+    def update(self, layers, rect=None):
+        bounds = self.surface.get_rect()
+        rect = bounds if rect is None else pygame.Rect(rect).clip(bounds)
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        areas = []
+        for layer in layers:
+            if layer.visible and layer.opacity:
+                area = rect.clip(layer.bounds)
+                if area.width > 0 and area.height > 0:
+                    areas.append((layer, area))
+        content = areas[0][1].unionall([area for _, area in areas]) if areas else pygame.Rect(0, 0, 0, 0)
+        stale = rect.clip(self.painted)
+        if stale.width > 0 and stale.height > 0 and not content.contains(stale):
+            self.surface.fill(TRANSPARENT, stale)
+        if rect.contains(self.painted):
+            self.painted = pygame.Rect(0, 0, 0, 0)
+        if not areas:
+            return
+        self.surface.fill(self.background, content)
+        self.painted = self.painted.union(content) if self.painted.width else content
+
+        empty = self.background == TRANSPARENT
+        for layer, area in areas:
+            if empty and layer.blend == 'normal' and layer.opacity == 255:
+                # Nothing below yet, so copy instead of blending
+                self.surface.blit(layer.surface, area, area, special_flags=pygame.BLEND_RGBA_MAX)
+            else:
+                blend_layer(self.surface, layer, area)
+            empty = False
+            count('draw_calls')
+
+    def flattened(self, rect=None):
+        """Copy of rect (or all) of the image, over the paper"""
+        rect = self.surface.get_rect() if rect is None else pygame.Rect(rect)
+        count('surfaces')
+        if self.background == TRANSPARENT:
+            return self.surface.subsurface(rect).copy()
+        image = pygame.Surface(rect.size, pygame.SRCALPHA)
+        image.fill(self.background)
+        image.blit(self.surface, (0, 0), rect)
+        return image
+
+
+def blend_layer(target, layer, area):
+    """Blend area of layer onto the same area of target"""
+    source = layer.surface.subsurface(area)
+    flags = BLEND_FLAGS[layer.blend]
+    if not flags:
+        if layer.opacity < 255:
+            source = source.copy()
+            source.set_alpha(layer.opacity)
+            count('surfaces')
+        target.blit(source, area)
+        return
+
+    # blend(target, source) mixed back into target by the layer's per-pixel
+    # alpha and opacity; pygame's blend flags ignore alpha on their own
+    mixed = target.subsurface(area).copy()
+    mixed.blit(source, (0, 0), special_flags=flags)
+    alpha = source.copy()
+    alpha.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MULT)
+    mixed.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    mixed.blit(alpha, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+    mixed.set_alpha(layer.opacity)
+    target.blit(mixed, area)
+    count('surfaces', 2)
@@ -0,0 +1,193 @@
+# core/profiler.py
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from config.settings import PROFILE_WINDOW, PROFILE_DIR, PROFILE_CAPTURE_FRAMES
+
+
+class FrameProfiler:
+    """Per-phase timings and counters for each frame of the main loop.
+
+    The main loop splits the frame with lap(); code anywhere in the frame
+    adds to the current record through phase() (time spent, summed if a
+    phase is entered several times) and count() (events such as surfaces
+    allocated). gauge() stores a value sampled once per frame. The last
+    `window` records are kept for the HUD and exports.
+    """
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.frames = deque(maxlen=window)
+        self.current = {}
+        self.frame_start = None
+        self.lap_start = None
+        self.frame_index = 0
+        self.capture = None  # (kind, frames left, state) while a capture window is open
+        self.reports = []    # Paths written by captures and exports, newest last
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = self.lap_start = time.perf_counter()
+        if self.capture and self.capture[0] == 'cprofile':
+            self.capture[2].enable()
+
+    def end_frame(self):
+        """Close the current record"""
+        if self.frame_start is None:
+            return
+        record = {'frame': self.frame_index, 'total_ms': (time.perf_counter() - self.frame_start) * 1000}
+        record.update(self.current)
+        self.frames.append(record)
+        self.frame_index += 1
+        self.frame_start = None
+        if self.capture:
+            self._advance_capture()
+
+    def lap(self, name):
+        """Charge the time since the previous lap (or frame start) to `name`"""
+        now = time.perf_counter()
+        key = name + '_ms'
+        self.current[key] = self.current.get(key, 0.0) + (now - self.lap_start) * 1000
+        self.lap_start = now
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as part of phase `name` (milliseconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = name + '_ms'
+            self.current[key] = self.current.get(key, 0.0) + (time.perf_counter() - start) * 1000
+
+    def count(self, name, amount=1):
+        self.current[name] = self.current.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        self.current[name] = value
+
+    def summary(self, frames=60):
+        """Mean of every field over the last `frames` records, plus the worst frame time"""
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return {}
+        totals = {}
+        for record in recent:
+            for key, value in record.items():
+                if key != 'frame':
+                    totals[key] = totals.get(key, 0) + value
+        means = {key: value / len(recent) for key, value in totals.items()}
+        means['max_total_ms'] = max(record['total_ms'] for record in recent)
+        return means
+
+    # Exports
+    # -------
+
+    def columns(self):
+        names = []
+        for record in self.frames:
+            for key in record:
+                if key not in names:
+                    names.append(key)
+        return names
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns(), restval=0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+        self.reports.append(path)
+        return path
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'frames': list(self.frames), 'summary': self.summary(len(self.frames))}, f, indent=1)
+        self.reports.append(path)
+        return path
+
+    def export(self, directory=PROFILE_DIR):
+        """Write the kept frames as CSV and JSON, returning both paths"""
+        base = _report_path(directory, 'frames')
+        return self.export_csv(base + '.csv'), self.export_json(base + '.json')
+
+    # Capture windows
+    # ---------------
+
+    def start_cprofile(self, frames=PROFILE_CAPTURE_FRAMES):
+        """Run cProfile over the next `frames` frames"""
+        if not self.capture:
+            self.capture = ('cprofile', frames, cProfile.Profile())
+
+    def start_tracemalloc(self, frames=PROFILE_CAPTURE_FRAMES):
+        """Trace Python allocations over the next `frames` frames"""
+        if not self.capture and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.capture = ('tracemalloc', frames, tracemalloc.take_snapshot())
+
+    def _advance_capture(self):
+        kind, left, state = self.capture
+        if kind == 'cprofile':
+            state.disable()
+        if left > 1:
+            self.capture = (kind, left - 1, state)
+            return
+
+        self.capture = None
+        path = _report_path(PROFILE_DIR, kind) + '.txt'
+        out = io.StringIO()
+        if kind == 'cprofile':
+            state.dump_stats(path[:-4] + '.prof')
+            pstats.Stats(state, stream=out).sort_stats('cumulative').print_stats(40)
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            out.write(f"traced {traced / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+            out.write("Top allocations grown during the window:\n")
+            for stat in snapshot.compare_to(state, 'lineno')[:40]:
+                out.write(f"{stat}\n")
+        with open(path, 'w') as f:
+            f.write(out.getvalue())
+        self.reports.append(path)
+
+
+class StartupTimer:
+    """Wall-clock breakdown of startup: mark() closes each step"""
+
+    def __init__(self, start=None):
+        self.start = self.last = time.perf_counter() if start is None else start
+        self.steps = []  # (name, milliseconds)
+
+    def mark(self, name):
+        """Charge the time since the previous mark (or start) to step `name`"""
+        now = time.perf_counter()
+        self.steps.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self, goal):
+        """One line: time until step `goal` finished, its steps, then any later ones"""
+        names = [name for name, _ in self.steps]
+        end = names.index(goal) + 1 if goal in names else len(names)
+        total = sum(ms for _, ms in self.steps[:end])
+        line = f"Startup: {goal} after {total:.0f} ms (" + ", ".join(
+            f"{name} {ms:.0f}" for name, ms in self.steps[:end]) + ")"
+        if self.steps[end:]:
+            line += "; then " + ", ".join(f"{name} {ms:.0f}" for name, ms in self.steps[end:]) + " ms"
+        return line
+
+
+def _report_path(directory, kind):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+
+# Shared instance used by the main loop and the drawing code
+profiler = FrameProfiler()
+phase = profiler.phase
+count = profiler.count
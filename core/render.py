@@ -0,0 +1,82 @@
+# core/render.py
+import pygame
+from core.cursor import cursor_bounds
+
+
+class Renderer:
+    """Works out which screen regions changed since the last presented frame.
+
+    Damage comes from the canvas display cache (new strokes, fills, undo),
+    buttons whose visual state changed, and the cursor's old and new bounds.
+    invalidate() with no rect forces a full repaint (resize, expose).
+    """
+
+    def __init__(self):
+        self.full = True
+        self.pending = []
+        self.buttons = {}   # id(button) -> (visual state, bounds) last drawn
+        self.cursor = None  # (cursor key, bounds) last drawn
+
+    def invalidate(self, rect=None):
+        """Schedule rect, or the whole window, for repainting"""
+        if rect is None:
+            self.full = True
+        else:
+            self.pending.append(pygame.Rect(rect))
+
+    def has_damage(self):
+        """Whether anything was invalidated since the last collect()"""
+        return self.full or bool(self.pending)
+
+    def collect(self, screen, canvas_manager, tools, tool_state, canvas_area, cursor_pos):
+        """Screen rects that must be redrawn this frame"""
+        damage, self.pending = self.pending, []
+
+        # Canvas regions rescaled by the display cache
+        for rect in canvas_manager.display.take_updates():
+            damage.append(rect.move(canvas_area.topleft).clip(canvas_area))
+
+        # Buttons whose appearance changed
+        buttons = {}
+        for item in tools:
+            btn = item.button
+            state = btn.visual_state()
+            bounds = btn.bounds()
+            previous = self.buttons.get(id(btn))
+            if previous is None or previous[0] != state or btn.dropdown_open:
+                damage.append(bounds)
+                if previous is not None:
+                    damage.append(previous[1])
+            buttons[id(btn)] = (state, bounds)
+        self.buttons = buttons
+
+        # Cursor moved or changed shape
+        cursor = None
+        if cursor_pos is not None:
+            key = (cursor_pos, tool_state.active_tool, tool_state.brush_size, tool_state.brush_color)
+            cursor = (key, cursor_bounds(tool_state, cursor_pos))
+        if cursor != self.cursor:
+            for previous in (self.cursor, cursor):
+                if previous is not None:
+                    damage.append(previous[1])
+        self.cursor = cursor
+
+        if self.full:
+            self.full = False
+            return [screen.get_rect()]
+        return _merge(damage, screen.get_rect())
+
+
+def _merge(rects, bounds):
+    """Clip rects to bounds and join any that overlap"""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width <= 0 or rect.height <= 0:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,180 @@
+# core/snapshot.py
+import struct
+import zlib
+import pygame
+from config.settings import (
+    LAYER_BLEND_MODES,
+    SNAPSHOT_TILE_SIZE,
+    SNAPSHOT_COMPRESS_LEVEL,
+    SNAPSHOT_REKEY_RATIO,
+)
+from core.history import tile_keys
+from core.layers import Layer
+from utils.images import put_tile
+
+KEYFRAME = 0
+DELTA = 1
+_MAGIC = b'SNP1'
+_HEADER = struct.Struct('<4sBIIIHBB')  # magic, kind, keyframe number, canvas width, height, tile size, layer count, active layer
+_LAYER_HEADER = struct.Struct('<BBBI')  # visible, opacity, blend mode, tile count
+_TILE = struct.Struct('<I')             # tile index * 2, plus 1 if the tile is blank (no pixels follow)
+_ORDER = 'BGRA'  # Pixel byte order; the layers' own on little-endian machines, so tiles copy without conversion
+
+
+class Snapshot:
+    """Tiles copied from the canvas by SnapshotEncoder.capture().
+
+    encode() compresses them into the bytes sent to a joiner. zlib does
+    not hold the GIL, so it can run on another thread while drawing goes on.
+    """
+
+    def __init__(self, kind, header, parts, size):
+        self.kind = kind
+        self.header = header
+        self.parts = parts
+        self.size = size  # Bytes of tile pixels
+
+    def encode(self):
+        return self.header + zlib.compress(b''.join(self.parts), SNAPSHOT_COMPRESS_LEVEL)
+
+
+class SnapshotEncoder:
+    """The canvas, encoded for players who join a room mid-round.
+
+    A keyframe holds every layer's properties and its non-blank tiles.
+    Tiles equal to a new canvas are left out, so a keyframe costs what has
+    been drawn rather than the size of the board. After it, the tiles
+    damaged on each layer are tracked; later joiners get the same keyframe
+    (the relay keeps it) plus a delta of just those tiles. A new keyframe is
+    taken once the delta would carry more than SNAPSHOT_REKEY_RATIO of the
+    keyframe's pixels, or the layer stack has changed.
+    """
+
+    def __init__(self, canvas_manager, tile_size=SNAPSHOT_TILE_SIZE):
+        self.canvas_manager = canvas_manager
+        self.tile_size = tile_size
+        self.number = 0          # Of the current keyframe; deltas name the one they apply to
+        self.keyframe_size = None
+        self.layers = []         # Layer stack the keyframe was taken from
+        self.changed = {}        # Layer -> keys of tiles damaged since the keyframe
+        self.version = None      # Canvas version whose damage was tracked last
+
+    def start(self):
+        """Begin tracking damage (before the first capture)"""
+        self.canvas_manager.damage_listeners.append(self._track_damage)
+
+    def _track_damage(self, rect):
+        # Pixels only ever change on the active layer, and always with a new
+        # version; other damage recomposites after layer changes, which
+        # every snapshot carries anyway
+        canvas = self.canvas_manager
+        if self.keyframe_size is not None and canvas.version != self.version:
+            self.version = canvas.version
+            self.changed.setdefault(canvas.layer, set()).update(self._tiles_for(rect))
+
+    def capture(self, rekey=False):
+        """Snapshot of the canvas as it is now: a delta, or a new keyframe when due (or asked for)"""
+        canvas = self.canvas_manager
+        if not rekey and self.keyframe_size is not None and self.layers == canvas.layers:
+            delta = self._capture(DELTA, {layer: self.changed.get(layer, ()) for layer in canvas.layers})
+            if delta.size <= self.keyframe_size * SNAPSHOT_REKEY_RATIO:
+                return delta
+
+        self.number += 1
+        self.layers = list(canvas.layers)
+        self.changed = {}
+        keyframe = self._capture(KEYFRAME, {layer: self._tiles_for(layer.bounds) for layer in canvas.layers})
+        self.keyframe_size = keyframe.size
+        return keyframe
+
+    def _tiles_for(self, rect):
+        return tile_keys(rect, self.tile_size, self.canvas_manager.composite.get_rect())
+
+    def _capture(self, kind, tiles):
+        canvas = self.canvas_manager
+        columns = -(-canvas.size[0] // self.tile_size)
+        parts = []
+        size = 0
+        for layer in canvas.layers:
+            indices, pixels = [], []
+            for key in sorted(tiles[layer], key=lambda key: (key[1], key[0])):
+                rect = _tile_rect(key, self.tile_size, canvas.size)
+                data = pygame.image.tostring(layer.surface.subsurface(rect), _ORDER)
+                blank = data == bytes(len(data))
+                if blank and kind == KEYFRAME:
+                    continue  # Blank already on a new canvas
+                indices.append(_TILE.pack((key[1] * columns + key[0]) * 2 + blank))
+                if not blank:
+                    pixels.append(data)
+                    size += len(data)
+            parts.append(_LAYER_HEADER.pack(layer.visible, layer.opacity, LAYER_BLEND_MODES.index(layer.blend),
+                                            len(indices)))
+            parts += indices
+            parts += pixels
+        header = _HEADER.pack(_MAGIC, kind, self.number, *canvas.size, self.tile_size,
+                              len(canvas.layers), canvas.active)
+        return Snapshot(kind, header, parts, size)
+
+
+def decode_snapshot(keyframe, delta, size):
+    """(layers, active index) from an encoded keyframe and the delta sent with it (or None).
+
+    Raises ValueError if either is malformed, is for another canvas size,
+    or the delta belongs to a different keyframe.
+    """
+    layers, active, number = _decode(keyframe, KEYFRAME, size)
+    if delta:
+        layers, active, _ = _decode(delta, DELTA, size, layers, number)
+    return layers, active
+
+
+def _decode(data, kind, size, layers=None, number=None):
+    try:
+        magic, found, key, width, height, tile_size, count, active = _HEADER.unpack_from(data)
+        if magic != _MAGIC or found != kind or not tile_size or not count or active >= count:
+            raise ValueError("not a snapshot")
+        if (width, height) != tuple(size):
+            raise ValueError("snapshot is for a different canvas size")
+        if layers is not None and (key != number or count != len(layers)):
+            raise ValueError("delta is for a different keyframe")
+
+        columns = -(-width // tile_size)
+        last = columns * -(-height // tile_size)
+        # Inflated no further than the header allows: every tile of every layer once
+        limit = count * (_LAYER_HEADER.size + last * _TILE.size + width * height * 4)
+        inflater = zlib.decompressobj()
+        body = inflater.decompress(data[_HEADER.size:], limit + 1)
+        if len(body) > limit or not inflater.eof:
+            raise ValueError("snapshot is larger than its canvas")
+        layers = layers or [Layer(size) for _ in range(count)]
+        offset = 0
+        for layer in layers:
+            visible, opacity, blend, tiles = _LAYER_HEADER.unpack_from(body, offset)
+            offset += _LAYER_HEADER.size
+            indices = [value for value, in _TILE.iter_unpack(body[offset:offset + tiles * _TILE.size])]
+            offset += tiles * _TILE.size
+            if len(indices) != tiles:
+                raise ValueError("truncated snapshot")
+            for value in indices:
+                index, blank = divmod(value, 2)
+                if index >= last:
+                    raise ValueError(f"tile {index} is outside the canvas")
+                rect = _tile_rect((index % columns, index // columns), tile_size, size)
+                if blank:
+                    layer.surface.fill((0, 0, 0, 0), rect)
+                    continue
+                length = rect.width * rect.height * 4
+                if offset + length > len(body):
+                    raise ValueError("truncated snapshot")
+                put_tile(layer.surface, pygame.image.fromstring(body[offset:offset + length], rect.size, _ORDER),
+                         rect.topleft)
+                layer.touch(rect)
+                offset += length
+            layer.visible, layer.opacity, layer.blend = bool(visible), opacity, LAYER_BLEND_MODES[blend]
+    except (struct.error, zlib.error, IndexError) as e:
+        raise ValueError(f"not a snapshot: {e}")
+    return layers, active, key
+
+
+def _tile_rect(key, tile_size, size):
+    return pygame.Rect(key[0] * tile_size, key[1] * tile_size, tile_size, tile_size).clip(pygame.Rect((0, 0), size))
@@ -7,6 +7,8 @@ class ToolState:
         self.brush_color = COLORS[13]  # init color black
         self.brush_size = BRUSH_SIZES[DEFAULT_BRUSH_INDEX]
         self.last_pos = None
+        self.pan_from = None  # Mouse position while dragging the view with the middle button
+        self.can_draw = True  # False for players watching someone else draw
 
     def update_tool(self, tool):
         self.active_tool = tool
\ No newline at end of file
@@ -0,0 +1,72 @@
+# core/viewport.py
+import pygame
+from config.settings import VIEW_ZOOM_MAX
+
+
+class Viewport:
+    """Part of the canvas shown in the canvas area, zoomed and panned.
+
+    This is the one place that maps between screen and canvas coordinates.
+    At zoom 1 the whole canvas is stretched over the area; zooming in shows
+    a smaller canvas rect of the same proportions, always kept inside the
+    canvas. The view is local: it is not journaled or sent to the room.
+    """
+
+    def __init__(self, canvas_size, max_zoom=VIEW_ZOOM_MAX):
+        self.canvas = pygame.Rect((0, 0), canvas_size)
+        self.max_zoom = max_zoom
+        self.reset()
+
+    def reset(self):
+        """Show the whole canvas again"""
+        self.zoom = 1.0
+        self.x = self.y = 0.0  # Top-left of the view in canvas pixels
+
+    @property
+    def rect(self):
+        """Canvas pixels currently visible"""
+        width = max(1, round(self.canvas.width / self.zoom))
+        height = max(1, round(self.canvas.height / self.zoom))
+        return pygame.Rect(round(self.x), round(self.y), width, height).clamp(self.canvas)
+
+    def to_canvas(self, pos, area):
+        """Canvas pixel under screen position pos, for a view drawn over area"""
+        view = self.rect
+        return (int(view.x + (pos[0] - area.left) * view.width / area.width),
+                int(view.y + (pos[1] - area.top) * view.height / area.height))
+
+    def to_screen(self, pos, area):
+        """Screen position of canvas point pos, for a view drawn over area"""
+        view = self.rect
+        return (area.left + (pos[0] - view.x) * area.width / view.width,
+                area.top + (pos[1] - view.y) * area.height / view.height)
+
+    def zoom_at(self, pos, area, factor):
+        """Multiply the zoom, keeping the canvas point under pos in place.
+
+        Returns whether the view changed.
+        """
+        zoom = min(max(self.zoom * factor, 1.0), self.max_zoom)
+        if zoom == self.zoom:
+            return False
+        fx, fy = (pos[0] - area.left) / area.width, (pos[1] - area.top) / area.height
+        view = self.rect
+        anchor = (view.x + fx * view.width, view.y + fy * view.height)
+        self.zoom = zoom
+        self.x = anchor[0] - fx * self.canvas.width / zoom
+        self.y = anchor[1] - fy * self.canvas.height / zoom
+        self._clamp()
+        return True
+
+    def pan(self, dx, dy, area):
+        """Drag the canvas by (dx, dy) screen pixels; returns whether the view moved"""
+        before = self.rect
+        view_w, view_h = self.canvas.width / self.zoom, self.canvas.height / self.zoom
+        self.x -= dx * view_w / area.width
+        self.y -= dy * view_h / area.height
+        self._clamp()
+        return self.rect != before
+
+    def _clamp(self):
+        self.x = min(max(self.x, 0.0), self.canvas.width - self.canvas.width / self.zoom)
+        self.y = min(max(self.y, 0.0), self.canvas.height - self.canvas.height / self.zoom)
@@ -1,102 +1,228 @@
+import time
+STARTED = time.perf_counter()  # Before the imports, which dominate startup
+
 import pygame
+import argparse
+import logging
 import traceback
-import time
 from pygame.locals import *
 from config.settings import *
 from core.canvas import CanvasManager
 from core.state import ToolState
 from ui.layout import create_tools
-from utils.helpers import load_icons, handle_resize
+from utils.helpers import handle_resize, scale_background
+from utils.assets import load_icons, load_background
 from core.cursor import draw_enhanced_cursor
 from core.event_handlers import (
-    handle_resize_event,
     handle_mouse_down,
-    handle_mouse_motion
+    handle_motion_batch,
+    handle_layer_key,
+    handle_view_event
 )
 from core.interface import draw_interface
+from core.render import Renderer
+from core.latency import LatencyMonitor
+from core.journal import Journal
+from core.profiler import profiler, StartupTimer
+from core.export import CanvasExporter, EXPORT_DONE
+from ui.hud import PerformanceHUD
+from net.protocol import ROLE_DRAW, ROLE_WATCH
+
+log = logging.getLogger('scrible')
+
+# Posted by the network thread so a sleeping frame loop replays the room's operations
+NET_RECEIVED = pygame.event.custom_type()
+
+def canvas_size(text):
+    """WIDTHxHEIGHT argument as a size tuple"""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("canvas size must be positive")
+    return width, height
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scribbl.io drawing board")
+    parser.add_argument('--canvas', metavar='WIDTHxHEIGHT', type=canvas_size, default=CANVAS_SIZE,
+                        help="drawing resolution, e.g. 7680x4320 for a poster")
+    parser.add_argument('--serve', action='store_true', help="host a relay server and join it")
+    parser.add_argument('--connect', metavar='HOST[:PORT]', help="join a relay server")
+    parser.add_argument('--room', default=NET_DEFAULT_ROOM)
+    parser.add_argument('--watch', action='store_true', help="guess instead of draw")
+    return parser.parse_args(argv)
+
+def wake_for_network():
+    try:
+        pygame.event.post(pygame.event.Event(NET_RECEIVED))
+    except pygame.error:
+        pass  # Event system already shut down
+
+def start_network(args, canvas_manager, tool_state, on_snapshot=None):
+    """Connect to a room if requested, returning the NetClient or None"""
+    if not (args.serve or args.connect):
+        return None
+    # Imported here so offline starts skip loading asyncio
+    from net.client import NetClient
+    from net.server import serve_in_thread
 
-def main():
+    host, port = NET_HOST, NET_PORT
+    if args.connect:
+        host, _, port_text = args.connect.partition(':')
+        port = int(port_text) if port_text else NET_PORT
+    try:
+        if args.serve:
+            serve_in_thread(host, port)
+        role = ROLE_WATCH if args.watch else ROLE_DRAW
+        client = NetClient(canvas_manager, args.room, role, host, port,
+                           on_receive=wake_for_network, on_snapshot=on_snapshot)
+        client.start()
+    except OSError as e:
+        log.warning(f"Couldn't start network play: {e}")
+        return None
+    tool_state.can_draw = not args.watch
+    return client
+
+def handle_profiler_key(event, hud, renderer):
+    """Overlay, export and capture shortcuts for diagnosing slow frames"""
+    key = pygame.key.name(event.key)
+    if key == PROFILE_HUD_KEY:
+        hud.toggle(renderer)
+    elif key == PROFILE_EXPORT_KEY:
+        for path in profiler.export():
+            log.info(f"Wrote {path}")
+    elif key == PROFILE_CPROFILE_KEY:
+        profiler.start_cprofile()
+    elif key == PROFILE_TRACEMALLOC_KEY:
+        profiler.start_tracemalloc()
+
+def layer_caption(canvas_manager):
+    """Window title naming the current layer once there is more than one"""
+    layers = canvas_manager.layers
+    if len(layers) == 1:
+        return "Group 6 Scribbl.io"
+    layer = canvas_manager.layer
+    hidden = ", hidden" if not layer.visible else ""
+    return (f"Group 6 Scribbl.io - layer {canvas_manager.active + 1}/{len(layers)} "
+            f"({layer.blend}, {layer.opacity * 100 // 255}%{hidden})")
+
+def main(argv=None):
+    logging.basicConfig(format='%(message)s', level=LOG_LEVEL)
+    startup = StartupTimer(STARTED)
+    startup.mark('imports')
+    args = parse_args(argv)
+    client = journal = exporter = None
     try:
         pygame.init()
         screen = pygame.display.set_mode((INITIAL_WIDTH, INITIAL_HEIGHT), RESIZABLE)
-        pygame.display.set_caption("Group 6 Scribbl.io")
+        caption = "Group 6 Scribbl.io"
+        pygame.display.set_caption(caption)
+        startup.mark('display')
         
         # Initialize components
         tool_state = ToolState()
         icons = load_icons()
+        startup.mark('icons')
         current_size = (INITIAL_WIDTH, INITIAL_HEIGHT)
         tools = create_tools(current_size, icons)
         canvas_area = pygame.Rect(20, 20, current_size[0]-240, current_size[1]-140)
-        canvas_manager = CanvasManager()
+        canvas_manager = CanvasManager(args.canvas)
+        renderer = Renderer()
+        latency = LatencyMonitor()
+        hud = PerformanceHUD(profiler)
+        exporter = CanvasExporter()
+        startup.mark('canvas')
+
+        # Restore the previous session before anything else sees the canvas
+        if JOURNAL_ENABLED:
+            journal = Journal(canvas_manager)
+            started = time.perf_counter()
+            replayed = journal.recover()
+            if replayed:
+                log.info(f"Restored session ({replayed} operations, {(time.perf_counter() - started) * 1000:.0f} ms)")
+            journal.start()
+            startup.mark('journal')
 
-        # Background handling variables
+        # A snapshot of the room replaces the canvas, so the journal starts over from it
+        client = start_network(args, canvas_manager, tool_state, journal.checkpoint if journal else None)
+        if client:
+            startup.mark('network')
+
+        # The first frame has a solid background; the image follows it
         background_image = None
-        scaled_background = None
-        
-        # Load background image
-        try:
-            background_image = pygame.image.load("assets/bg.png").convert()
-            # Initial scale to window size
-            scaled_background = pygame.transform.smoothscale(background_image, current_size)
-        except Exception as e:
-            print(f"Couldn't load background image: {e}")
-            # Fallback: create solid background surface
-            scaled_background = pygame.Surface(current_size)
-            scaled_background.fill(BG_COLOR)
+        scaled_background = scale_background(background_image, current_size)
 
         clock = pygame.time.Clock()
         running = True
         drawing = False
         last_time = time.time()
+        resize_to = None    # Latest size from VIDEORESIZE events not yet applied
+        resize_until = 0    # When resizing counts as finished (no events since)
+        woken = None        # Event that ended an idle sleep, handled with the next frame's
 
         while running:
             # Calculate delta time
             current_time = time.time()
             dt = current_time - last_time
             last_time = current_time
+            profiler.begin_frame()
+
+            # Update hover transitions still in progress
+            tools.animate(dt)
+            profiler.lap('animate')
+
+            # Handle events, coalescing this frame's mouse motion into one path
+            motion = []
+            events = pygame.event.get()
+            if woken is not None:
+                events.insert(0, woken)
+                woken = None
+            for event in events:
+                if event.type in (MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP, KEYDOWN):
+                    latency.input()
+
+                if event.type == MOUSEMOTION:
+                    motion.append(event.pos)
+                    continue
 
-            # Update animations
-            for item in tools:
-                btn = item['button']
-                if item['type'] in ['tool', 'brush_size', 'action']:
-                    btn.update(dt)
+                # Other events must see the stroke drawn up to this point
+                if motion:
+                    handle_motion_batch(motion, drawing, tools, tool_state, canvas_manager, canvas_area)
+                    motion = []
 
-            # Handle events
-            for event in pygame.event.get():
                 if event.type == QUIT:
                     running = False
                     continue
                 
-                if event.type == VIDEORESIZE:
-                    current_size = (event.w, event.h)
-                    screen = pygame.display.set_mode(current_size, RESIZABLE)
-                    
-                    # Handle background scaling (aspect fill)
-                    if background_image:
-                        # Calculate aspect-preserving scale to fill screen
-                        screen_w, screen_h = current_size
-                        img_w, img_h = background_image.get_size()
-                        
-                        width_ratio = screen_w / img_w
-                        height_ratio = screen_h / img_h
-                        scale = max(width_ratio, height_ratio)
-                        
-                        scaled_size = (int(img_w * scale), (int(img_h * scale)))
-                        scaled_background = pygame.transform.smoothscale(background_image, scaled_size)
-                        
-                        # Crop to center
-                        scaled_background = scaled_background.subsurface(
-                            (scaled_size[0] - screen_w) // 2,
-                            (scaled_size[1] - screen_h) // 2,
-                            screen_w,
-                            screen_h
-                        )
+                if event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                    renderer.invalidate()
+
+                if handle_view_event(event, tool_state, canvas_manager, canvas_area):
+                    continue
+
+                if event.type == KEYDOWN:
+                    handle_profiler_key(event, hud, renderer)
+                    if event.key == pygame.key.key_code(EXPORT_KEY) and event.mod & KMOD_CTRL:
+                        fmt = 'raw' if event.mod & KMOD_SHIFT else 'png'
+                        if event.mod & KMOD_ALT:
+                            exporter.export_layers([layer.surface for layer in canvas_manager.layers], fmt)
+                        else:
+                            exporter.export(canvas_manager.compositor.flattened(), fmt)
                     else:
-                        scaled_background = pygame.Surface(current_size)
-                        scaled_background.fill(BG_COLOR)
-                    
-                    # Update UI elements
-                    tools, canvas_area = handle_resize(event.w, event.h, tools, icons)
+                        handle_layer_key(event, tool_state, canvas_manager)
+
+                if event.type == EXPORT_DONE:
+                    if event.error:
+                        log.warning(f"Export failed: {event.error}")
+                    else:
+                        log.info(f"Saved {event.path} ({event.seconds * 1000:.0f} ms)")
+
+                if event.type == VIDEORESIZE:
+                    # A window drag sends many of these; only the last one matters
+                    resize_to = (event.w, event.h)
+                    resize_until = time.perf_counter() + RESIZE_DEBOUNCE
+                    continue
                 
                 if event.type == MOUSEBUTTONDOWN and event.button == 1:
                     drawing = handle_mouse_down(event, tools, tool_state, canvas_manager, canvas_area)
@@ -107,36 +233,100 @@ def main():
                     canvas_manager.save_state()
                     tool_state.last_pos = None
                     continue
-                
-                if event.type == MOUSEMOTION:
-                    # Update hover states for all interactive elements
-                    mouse_pos = event.pos
-                    for item in tools:
-                        btn = item['button']
-                        if item['type'] in ['tool', 'brush_size', 'action']:  
-                            btn.is_hovered = btn.original_rect.collidepoint(mouse_pos)
-                    
-                    if drawing:
-                        handle_mouse_motion(event, drawing, tool_state, canvas_manager, canvas_area)
-
-           # Draw everything
-            screen.blit(scaled_background, (0, 0))  # Draw background first
-            draw_interface(
+
+            if motion:
+                handle_motion_batch(motion, drawing, tools, tool_state, canvas_manager, canvas_area)
+
+            # Follow the window while it is dragged with quick previews, then
+            # scale properly once the size has stopped changing
+            resizing = resize_to is not None
+            if resizing:
+                settled = time.perf_counter() >= resize_until
+                if resize_to != current_size or settled:
+                    current_size = resize_to
+                    screen = pygame.display.get_surface()
+                    if settled and screen.get_size() != current_size:
+                        screen = pygame.display.set_mode(current_size, RESIZABLE)
+                    tools, canvas_area = handle_resize(*current_size, tools, icons)
+                    scaled_background = scale_background(background_image, current_size, settled)
+                    renderer.invalidate()
+                if settled:
+                    resize_to = None
+                    resizing = False
+            profiler.lap('events')
+
+            # Exchange this frame's operations with the room
+            if client:
+                client.flush()
+                client.apply()
+            if journal:
+                journal.tick()
+            if layer_caption(canvas_manager) != caption:
+                caption = layer_caption(canvas_manager)
+                pygame.display.set_caption(caption)
+            profiler.lap('sync')
+
+            # Draw and present only what changed
+            hud.prepare(renderer)
+            dirty = draw_interface(
                 screen, 
                 canvas_manager, 
                 tools, 
                 tool_state, 
                 canvas_area, 
                 icons, 
-                draw_enhanced_cursor
+                draw_enhanced_cursor,
+                background_image=scaled_background,
+                renderer=renderer,
+                smooth=not resizing
             )
+            dirty = hud.draw(screen, dirty)
+            profiler.lap('draw')
             
-            pygame.display.flip()
-            clock.tick(60)
+            if dirty:
+                pygame.display.update(dirty)
+            latency.presented()
+            profiler.lap('present')
+
+            profiler.gauge('fps', clock.get_fps())
+            profiler.gauge('undo_bytes', canvas_manager.history.nbytes)
+            profiler.gauge('undo_edits', len(canvas_manager.history.undo_stack))
+            profiler.end_frame()
+
+            if startup:
+                startup.mark('first frame')
+                background_image = load_background()
+                scaled_background = scale_background(background_image, current_size, resize_to is None)
+                renderer.invalidate()
+                startup.mark('background')
+                if STARTUP_REPORT:
+                    log.info(startup.report('first frame'))
+                startup = None
+
+            # Keep the frame rate while something moves or waits to be drawn,
+            # otherwise sleep until the next event (or IDLE_TIMEOUT, so the
+            # journal still checkpoints)
+            if (tools.animating or resize_to is not None or renderer.has_damage()
+                    or hud.visible or profiler.capture):
+                clock.tick(FRAME_RATE)
+            elif running:
+                event = pygame.event.wait(int(IDLE_TIMEOUT * 1000))
+                if event.type != NOEVENT:
+                    woken = event
+                clock.tick()
+
+        if LATENCY_REPORT:
+            log.info(latency.report())
 
     except Exception as e:
         traceback.print_exc()
     finally:
+        if client:
+            client.close()
+        if journal:
+            journal.close()
+        if exporter:
+            exporter.close()
         pygame.quit()
 
 if __name__ == "__main__":
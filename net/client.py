@@ -0,0 +1,285 @@
+# net/client.py
+import asyncio
+import queue
+import threading
+import pygame
+from config.settings import NET_HOST, NET_PORT, NET_DEFAULT_ROOM, NET_MAX_MESSAGE, NET_PATCH_PIXELS
+from core.snapshot import KEYFRAME, SnapshotEncoder, decode_snapshot
+from net.protocol import (
+    MSG_OPS, MSG_SNAPSHOT_REQUEST, MSG_KEYFRAME, MSG_DELTA, ROLE_DRAW, ProtocolError,
+    coalesce, decode_ops, encode_join, encode_message, encode_ops, framed_size, read_message
+)
+
+
+class Connection:
+    """asyncio connection to a RelayServer room"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.keyframe = None  # Of a snapshot whose delta has not arrived yet
+
+    @classmethod
+    async def open(cls, room=NET_DEFAULT_ROOM, role=ROLE_DRAW, host=NET_HOST, port=NET_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        await connection._write(encode_join(room, role))
+        return connection
+
+    async def send(self, ops):
+        """Send a batch of operations as one message (waits while the socket is backed up)"""
+        if ops:
+            await self._write(encode_message(MSG_OPS, encode_ops(ops)))
+
+    async def send_snapshot(self, snapshot):
+        """Compress and send a snapshot (core.snapshot) the server asked for"""
+        data = snapshot.encode()
+        if snapshot.kind == KEYFRAME:
+            await self._write(encode_message(MSG_KEYFRAME, data))
+            data = b''
+        await self._write(encode_message(MSG_DELTA, data))
+
+    async def receive(self):
+        """Next batch of operations, or None once the server hangs up.
+
+        Snapshot traffic comes as batches of one pseudo-operation:
+        ('snapshot_request', rekey), or ('snapshot', keyframe, delta) with
+        the encoded keyframe and delta (None if empty).
+        """
+        while True:
+            message = await read_message(self.reader, NET_MAX_MESSAGE)
+            if message is None:
+                return None
+            kind, body = message
+            self.bytes_received += framed_size(body)
+            if kind == MSG_OPS:
+                return decode_ops(body)
+            if kind == MSG_SNAPSHOT_REQUEST:
+                return [('snapshot_request', body == b'\x01')]
+            if kind == MSG_KEYFRAME:
+                self.keyframe = body
+            elif kind == MSG_DELTA and self.keyframe is not None:
+                keyframe, self.keyframe = self.keyframe, None
+                return [('snapshot', keyframe, body or None)]
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _write(self, data):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+        await self.writer.drain()
+
+
+class NetClient:
+    """Connects a CanvasManager to a room from the (synchronous) pygame loop.
+
+    The connection runs on a background thread. As a drawer, operations the
+    canvas emits are collected during the frame and handed over by flush();
+    when the socket cannot keep up, frames waiting to be sent are coalesced
+    into one message rather than queued separately. Received batches wait in
+    a queue until apply() replays them on the main thread; on_receive, if
+    given, is called from the network thread after each batch arrives so a
+    sleeping frame loop can wake up.
+
+    The room's operations go to the layer its drawers last selected, so the
+    local layer selection is set aside while they are replayed. Undo and
+    redo are sent as the pixels they restored: peers that joined later do
+    not have the edit in their history.
+
+    Joining a room that is already drawing, the canvas is first replaced by
+    a snapshot of it (on_snapshot, if given, is called after that). As a
+    drawer, the client answers the server's snapshot requests: the tiles
+    are copied between frames and compressed on the network thread, in
+    line with the operations sent before them.
+    """
+
+    def __init__(self, canvas_manager, room=NET_DEFAULT_ROOM, role=ROLE_DRAW,
+                 host=NET_HOST, port=NET_PORT, on_receive=None, on_snapshot=None):
+        self.canvas_manager = canvas_manager
+        self.room = room
+        self.role = role
+        self.address = (host, port)
+        self.connection = None
+        self.outbox = []            # Ops emitted this frame (main thread)
+        self.received = queue.Queue()
+        self.on_receive = on_receive
+        self.on_snapshot = on_snapshot
+        self.snapshots = SnapshotEncoder(canvas_manager) if role == ROLE_DRAW else None
+        self.remote_layer = 0       # Layer the room is drawing on
+        self.last_damage = None
+        self.connected = False
+        self._loop = None
+        self._frames = []           # Ops handed over but not yet sent (network thread)
+        self._wake = None
+
+    def _record(self, op):
+        # Replayed operations came from the room and must not be echoed back
+        if self.canvas_manager.replaying:
+            return
+        if op[0] in ('undo', 'redo'):
+            # Undo/redo emit after marking the restored area dirty
+            self.outbox.extend(self._patches(pygame.Rect(self.last_damage)))
+        else:
+            self.outbox.append(op)
+
+    def _track_damage(self, rect):
+        self.last_damage = rect
+
+    def _patches(self, rect):
+        """('patch', rect, pixels) operations restoring rect of the active layer, in bands"""
+        surface = self.canvas_manager.surface
+        rows = max(1, NET_PATCH_PIXELS // rect.width)
+        for y in range(rect.top, rect.bottom, rows):
+            band = pygame.Rect(rect.x, y, rect.width, min(rows, rect.bottom - y))
+            yield ('patch', tuple(band), pygame.image.tostring(surface.subsurface(band), 'RGBA'))
+
+    def start(self, timeout=5.0):
+        """Connect on a background thread; raises OSError if that fails"""
+        started = threading.Event()
+        result = {}
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self.connection = self._loop.run_until_complete(
+                    asyncio.wait_for(Connection.open(self.room, self.role, *self.address), timeout)
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                result['error'] = e
+                started.set()
+                return
+            self._wake = asyncio.Event()
+            self.connected = True
+            started.set()
+            self._loop.run_until_complete(self._run())
+            self.connected = False
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        if 'error' in result:
+            error = result['error']
+            raise error if isinstance(error, OSError) else OSError(f"connection timed out: {error}")
+        if self.role == ROLE_DRAW:
+            self.canvas_manager.op_listeners.append(self._record)
+            self.canvas_manager.damage_listeners.append(self._track_damage)
+            self.snapshots.start()
+
+    def flush(self):
+        """Send everything the canvas emitted since the last call (once per frame)"""
+        if not self.outbox:
+            return
+        ops, self.outbox = self.outbox, []
+        if self.connected:
+            self._loop.call_soon_threadsafe(self._queue_frame, ops)
+
+    def apply(self):
+        """Replay received operations into the canvas, returning how many ran"""
+        batches = []
+        while True:
+            try:
+                batches.append(self.received.get_nowait())
+            except queue.Empty:
+                break
+        if not batches:
+            return 0
+
+        # Selections go through apply_op so the journal records them too;
+        # they leave the local edit in progress uncommitted
+        canvas = self.canvas_manager
+        local = canvas.layer
+        canvas.apply_op(('layer_select', min(self.remote_layer, len(canvas.layers) - 1)))
+        rekey = None
+        for ops in batches:
+            for op in ops:
+                if op[0] == 'snapshot':
+                    canvas.load_layers(op[1], op[2])
+                    if self.on_snapshot:
+                        self.on_snapshot()
+                elif op[0] == 'snapshot_request':
+                    rekey = rekey or op[1]
+                else:
+                    canvas.apply_op(op)
+        self.remote_layer = canvas.active
+        if local in canvas.layers:
+            canvas.apply_op(('layer_select', canvas.layers.index(local)))
+        if rekey is not None:
+            # With this client's own layer selected: its next operations go there
+            self._send_snapshot(rekey)
+        return sum(len(ops) for ops in batches)
+
+    def close(self):
+        if self.connected:
+            self._loop.call_soon_threadsafe(self._shutdown)
+            self._thread.join(timeout=2.0)
+
+    def _send_snapshot(self, rekey):
+        # Everything emitted up to now was handed over by flush() already,
+        # so the snapshot follows the operations it includes
+        if self.snapshots and self.connected:
+            self._loop.call_soon_threadsafe(self._queue_frame, [('snapshot', self.snapshots.capture(rekey))])
+
+    def _queue_frame(self, ops):
+        self._frames.extend(ops)
+        self._wake.set()
+
+    def _shutdown(self):
+        self._frames.append(None)
+        self._wake.set()
+
+    async def _run(self):
+        receiver = asyncio.ensure_future(self._receive())
+        try:
+            await self._send()
+        except ConnectionError:
+            pass
+        finally:
+            receiver.cancel()
+            await self.connection.close()
+
+    async def _send(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            items, self._frames = self._frames, []
+            ops = []
+            for item in items:
+                if item is not None and item[0] not in ('snapshot', 'patch'):
+                    ops.append(item)
+                    continue
+                await self.connection.send(coalesce(ops))
+                ops = []
+                if item is None:
+                    return
+                if item[0] == 'patch':
+                    await self.connection.send([item])  # On its own, as the server relays it in bulk
+                else:
+                    await self.connection.send_snapshot(item[1])
+            await self.connection.send(coalesce(ops))
+
+    async def _receive(self):
+        try:
+            while True:
+                ops = await self.connection.receive()
+                if ops is None:
+                    break
+                if ops and ops[0][0] == 'snapshot':
+                    # Decoded here, so the frame loop only swaps the layers in
+                    try:
+                        ops = [('snapshot',) + decode_snapshot(ops[0][1], ops[0][2], self.canvas_manager.size)]
+                    except ValueError as e:
+                        raise ProtocolError(str(e))
+                self.received.put(ops)
+                if self.on_receive:
+                    self.on_receive()
+        except (ProtocolError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        self._frames.append(None)  # Server went away; stop the sender too
+        self._wake.set()
@@ -0,0 +1,332 @@
+# net/protocol.py
+"""Binary encoding of canvas operations for network play.
+
+A message is a varint length followed by a one-byte kind and its body.
+MSG_OPS bodies hold the operations of one frame. Strokes send their first
+point in full and every following point as a delta, all as zigzag varints,
+so a typical mouse step costs two bytes. Palette colors are sent as an index.
+Undo and redo are sent as the pixels they restored, zlib-compressed, since
+peers that joined later do not have the edits in their history.
+
+Someone joining a room that is already drawing first gets the canvas as
+a keyframe and a delta (see core.snapshot), which the server asks one of
+the room's drawers for.
+"""
+import struct
+import zlib
+from config.settings import (
+    BRUSH_SIZES, CANVAS_MAX_COORDINATE, COLORS, LAYER_BLEND_MODES, LAYER_MAX, NET_PATCH_PIXELS,
+    SNAPSHOT_COMPRESS_LEVEL,
+)
+
+MSG_JOIN = 1  # body: role byte + room name (utf-8)
+MSG_OPS = 2   # body: encoded operations
+MSG_SNAPSHOT_REQUEST = 3  # server to drawer; body: 1 if a new keyframe is needed, else 0
+MSG_KEYFRAME = 4          # body: an encoded keyframe
+MSG_DELTA = 5             # body: an encoded delta against the last keyframe (empty: none); ends a snapshot
+
+ROLE_DRAW = 0
+ROLE_WATCH = 1
+
+OP_STROKE = 1
+OP_FILL = 2
+OP_CLEAR = 3
+OP_UNDO = 4
+OP_REDO = 5
+OP_COMMIT = 6
+OP_LAYER_ADD = 7
+OP_LAYER_REMOVE = 8
+OP_LAYER_SELECT = 9
+OP_LAYER_SET = 10
+OP_PATCH = 11  # x, y, w, h, then the length of the zlib RGBA pixels that follow
+
+_SIMPLE_OPS = {
+    'clear': OP_CLEAR, 'undo': OP_UNDO, 'redo': OP_REDO, 'commit': OP_COMMIT,
+    'layer_add': OP_LAYER_ADD, 'layer_remove': OP_LAYER_REMOVE,
+}
+_SIMPLE_NAMES = {code: name for name, code in _SIMPLE_OPS.items()}
+_PALETTE = {tuple(color): index for index, color in enumerate(COLORS)}
+_RGB = 0xFF   # Color byte announcing three raw RGB bytes
+_RGBA = 0xFE  # ... or four RGBA bytes, for colors that are not opaque
+
+MAX_COORDINATE = CANVAS_MAX_COORDINATE
+MAX_RADIUS = max(BRUSH_SIZES)
+
+
+class ProtocolError(ValueError):
+    """Raised for malformed or truncated messages"""
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, offset):
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ProtocolError("truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _put_color(out, color):
+    if len(color) == 4 and color[3] != 255:
+        out.append(_RGBA)
+        out.extend(color)
+        return
+    color = tuple(color[:3])
+    index = _PALETTE.get(color)
+    if index is None:
+        out.append(_RGB)
+        out.extend(color)
+    else:
+        out.append(index)
+
+
+def _get_color(data, offset):
+    if offset >= len(data):
+        raise ProtocolError("truncated color")
+    index = data[offset]
+    if index == _RGBA:
+        if offset + 5 > len(data):
+            raise ProtocolError("truncated color")
+        return tuple(data[offset + 1:offset + 5]), offset + 5
+    if index != _RGB:
+        if index >= len(COLORS):
+            raise ProtocolError(f"unknown palette index {index}")
+        return COLORS[index], offset + 1
+    if offset + 4 > len(data):
+        raise ProtocolError("truncated color")
+    return tuple(data[offset + 1:offset + 4]), offset + 4
+
+
+def encode_ops(ops):
+    """Pack a list of operation tuples (see CanvasManager.apply_op)"""
+    out = bytearray()
+    for op in ops:
+        kind = op[0]
+        if kind == 'stroke':
+            points, color, radius = op[1], op[2], op[3]
+            out.append(OP_STROKE)
+            _put_color(out, color)
+            _put_varint(out, radius)
+            _put_varint(out, len(points))
+            x, y = points[0]
+            _put_varint(out, _zigzag(x))
+            _put_varint(out, _zigzag(y))
+            for px, py in points[1:]:
+                _put_varint(out, _zigzag(px - x))
+                _put_varint(out, _zigzag(py - y))
+                x, y = px, py
+        elif kind == 'fill':
+            out.append(OP_FILL)
+            _put_color(out, op[2])
+            _put_varint(out, _zigzag(op[1][0]))
+            _put_varint(out, _zigzag(op[1][1]))
+        elif kind in _SIMPLE_OPS:
+            out.append(_SIMPLE_OPS[kind])
+        elif kind == 'layer_select':
+            out.append(OP_LAYER_SELECT)
+            _put_varint(out, op[1])
+        elif kind == 'layer_set':
+            out.append(OP_LAYER_SET)
+            _put_varint(out, op[1])
+            out.append(1 if op[2] else 0)
+            out.append(op[3])
+            out.append(LAYER_BLEND_MODES.index(op[4]))
+        elif kind == 'patch':
+            out.append(OP_PATCH)
+            for value in op[1]:
+                _put_varint(out, value)
+            pixels = zlib.compress(op[2], SNAPSHOT_COMPRESS_LEVEL)
+            _put_varint(out, len(pixels))
+            out.extend(pixels)
+        else:
+            raise ProtocolError(f"unknown operation {kind!r}")
+    return bytes(out)
+
+
+def _get_point(data, offset, x=0, y=0):
+    """Zigzag varint coordinates (relative to x, y), checked against MAX_COORDINATE"""
+    dx, offset = _get_varint(data, offset)
+    dy, offset = _get_varint(data, offset)
+    x, y = x + _unzigzag(dx), y + _unzigzag(dy)
+    if abs(x) > MAX_COORDINATE or abs(y) > MAX_COORDINATE:
+        raise ProtocolError(f"coordinates ({x}, {y}) out of range")
+    return x, y, offset
+
+
+def _get_layer(data, offset):
+    index, offset = _get_varint(data, offset)
+    if index >= LAYER_MAX:
+        raise ProtocolError(f"layer index {index} out of range")
+    return index, offset
+
+
+def _get_patch(data, offset):
+    rect = []
+    for _ in range(4):
+        value, offset = _get_varint(data, offset)
+        rect.append(value)
+    x, y, w, h = rect
+    if max(x, y, w, h) > MAX_COORDINATE or w * h > NET_PATCH_PIXELS:
+        raise ProtocolError(f"patch {rect} out of range")
+    length, offset = _get_varint(data, offset)
+    end = offset + length
+    if end > len(data):
+        raise ProtocolError("truncated patch")
+    # Bounded, so a small message cannot expand into gigabytes
+    size = w * h * 4
+    inflater = zlib.decompressobj()
+    try:
+        pixels = inflater.decompress(data[offset:end], size + 1)
+    except zlib.error as e:
+        raise ProtocolError(f"bad patch pixels: {e}")
+    if len(pixels) != size or not inflater.eof:
+        raise ProtocolError("patch pixels do not match its size")
+    return ('patch', (x, y, w, h), pixels), end
+
+
+def decode_ops(data):
+    """Unpack bytes produced by encode_ops.
+
+    Raises ProtocolError for malformed data, and for values no canvas
+    could use: coordinates past MAX_COORDINATE, radii past MAX_RADIUS,
+    layer indices past LAYER_MAX, unknown blend modes or patches larger
+    than NET_PATCH_PIXELS.
+    """
+    ops = []
+    offset = 0
+    while offset < len(data):
+        code = data[offset]
+        offset += 1
+        if code == OP_STROKE:
+            color, offset = _get_color(data, offset)
+            radius, offset = _get_varint(data, offset)
+            if radius > MAX_RADIUS:
+                raise ProtocolError(f"brush radius {radius} out of range")
+            count, offset = _get_varint(data, offset)
+            if count == 0:
+                raise ProtocolError("empty stroke")
+            x, y, offset = _get_point(data, offset)
+            points = [(x, y)]
+            for _ in range(count - 1):
+                x, y, offset = _get_point(data, offset, x, y)
+                points.append((x, y))
+            ops.append(('stroke', points, color, radius))
+        elif code == OP_FILL:
+            color, offset = _get_color(data, offset)
+            x, y, offset = _get_point(data, offset)
+            ops.append(('fill', (x, y), color))
+        elif code in _SIMPLE_NAMES:
+            ops.append((_SIMPLE_NAMES[code],))
+        elif code == OP_LAYER_SELECT:
+            index, offset = _get_layer(data, offset)
+            ops.append(('layer_select', index))
+        elif code == OP_LAYER_SET:
+            index, offset = _get_layer(data, offset)
+            if offset + 3 > len(data):
+                raise ProtocolError("truncated layer properties")
+            visible, opacity, blend = data[offset:offset + 3]
+            offset += 3
+            if blend >= len(LAYER_BLEND_MODES):
+                raise ProtocolError(f"unknown blend mode {blend}")
+            ops.append(('layer_set', index, bool(visible), opacity, LAYER_BLEND_MODES[blend]))
+        elif code == OP_PATCH:
+            op, offset = _get_patch(data, offset)
+            ops.append(op)
+        else:
+            raise ProtocolError(f"unknown operation code {code}")
+    return ops
+
+
+def coalesce(ops):
+    """Merge strokes that continue the previous one into a single polyline.
+
+    Per-frame strokes start at the last point of the frame before, so a
+    backlog of frames collapses into one stroke with one header.
+    """
+    merged = []
+    for op in ops:
+        if op[0] == 'stroke' and merged:
+            last = merged[-1]
+            if (last[0] == 'stroke' and last[2] == op[2] and last[3] == op[3]
+                    and last[1][-1] == op[1][0]):
+                merged[-1] = ('stroke', last[1] + list(op[1][1:]), last[2], last[3])
+                continue
+        merged.append(op)
+    return merged
+
+
+def encode_message(kind, body=b''):
+    """Frame a message for the stream"""
+    out = bytearray()
+    _put_varint(out, len(body) + 1)
+    out.append(kind)
+    out.extend(body)
+    return bytes(out)
+
+
+def decode_message(data, offset=0):
+    """(kind, body, next offset) of the message framed at data[offset:]"""
+    length, start = _get_varint(data, offset)
+    end = start + length
+    if length == 0 or end > len(data):
+        raise ProtocolError("truncated message")
+    return data[start], data[start + 1:end], end
+
+
+def framed_size(body):
+    """Bytes a message with this body occupies on the wire"""
+    length = len(body) + 1
+    size = 1
+    while length >= 0x80:
+        length >>= 7
+        size += 1
+    return size + len(body) + 1
+
+
+def encode_join(room, role=ROLE_DRAW):
+    return encode_message(MSG_JOIN, struct.pack('B', role) + room.encode('utf-8'))
+
+
+def decode_join(body):
+    """(room, role) from a MSG_JOIN body"""
+    if not body:
+        raise ProtocolError("empty join")
+    return body[1:].decode('utf-8'), body[0]
+
+
+async def read_message(reader, limit=1 << 20):
+    """Next (kind, body) from an asyncio StreamReader, or None at end of stream"""
+    length = shift = 0
+    while True:
+        byte = await reader.read(1)
+        if not byte:
+            if shift:
+                raise ProtocolError("truncated message header")
+            return None
+        length |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            break
+        shift += 7
+    if length == 0 or length > limit:
+        raise ProtocolError(f"bad message length {length}")
+    payload = await reader.readexactly(length)
+    return payload[0], payload[1:]
@@ -0,0 +1,249 @@
+# net/server.py
+import argparse
+import asyncio
+import threading
+from config.settings import NET_HOST, NET_PORT, NET_MAX_PENDING, NET_MAX_MESSAGE
+from net.protocol import (
+    MSG_JOIN, MSG_OPS, MSG_SNAPSHOT_REQUEST, MSG_KEYFRAME, MSG_DELTA, ROLE_DRAW, ProtocolError,
+    decode_join, decode_ops, encode_message, read_message
+)
+
+
+class _Peer:
+    """Outgoing side of one connected client.
+
+    Messages queued between two wake-ups are written in one call, so a
+    burst from the drawer costs the receiver a single send. A client whose
+    unsent data grows past max_pending is disconnected instead of letting
+    the server buffer without bound; a snapshot sent to catch up, or the
+    pixels of an undo, do not count against it.
+    """
+
+    def __init__(self, writer, role, max_pending):
+        self.writer = writer
+        self.role = role
+        self.max_pending = max_pending
+        self.outbox = []
+        self.pending = 0  # Bytes queued or written but not yet drained
+        self.bulk = 0     # ...of which snapshot bytes
+        self.queued_bulk = 0  # Snapshot bytes in the outbox
+        self.live = True  # Gets the room's operations (False until caught up)
+        self.wake = asyncio.Event()
+        self.closed = False
+
+    def send(self, data, bulk=False):
+        if self.closed:
+            return
+        if not bulk and self.pending - self.bulk + len(data) > self.max_pending:
+            self.close()  # Too far behind to catch up
+            return
+        self.outbox.append(data)
+        self.pending += len(data)
+        if bulk:
+            self.bulk += len(data)
+            self.queued_bulk += len(data)
+        self.wake.set()
+
+    async def run(self):
+        while not self.closed:
+            await self.wake.wait()
+            self.wake.clear()
+            if not self.outbox:
+                continue
+            data = b''.join(self.outbox)
+            bulk = self.queued_bulk
+            self.outbox = []
+            self.queued_bulk = 0
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+            except ConnectionError:
+                self.close()
+                return
+            self.pending -= len(data)
+            self.bulk -= bulk
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.wake.set()
+            # abort() rather than close(): a stalled client would never let
+            # close() flush the remaining buffer
+            self.writer.transport.abort()
+
+
+class _Room:
+    """Clients of one room, and the snapshot that catches up late joiners"""
+
+    def __init__(self):
+        self.peers = set()
+        self.waiting = []      # Joiners held back until a snapshot arrives
+        self.source = None     # Drawer asked for snapshots
+        self.requested = False
+        self.keyframe = None   # Last keyframe from source, framed for sending
+
+
+class RelayServer:
+    """Forwards each drawer's operation messages to the other clients in its room.
+
+    The server never touches pixels: it checks that a batch decodes, then
+    passes the bytes on unchanged.
+
+    Someone who joins once a drawer is in the room is held back while one
+    of the drawers (the source) is asked for a snapshot. It arrives on the
+    drawer's stream after every operation it covers, so the joiner is sent
+    the snapshot and then only operations that came later. The source's
+    keyframe is kept and sent to every joiner until it sends a new one;
+    otherwise it only has to send the delta since, which bounds both its
+    upload and the bytes each joiner needs.
+    """
+
+    def __init__(self, max_pending=NET_MAX_PENDING):
+        self.max_pending = max_pending
+        self.rooms = {}  # room name -> _Room
+        self.handlers = set()
+        self.server = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def start(self, host=NET_HOST, port=NET_PORT):
+        """Begin accepting clients, returning the bound port (useful with port 0)"""
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for room in list(self.rooms.values()):
+            for peer in list(room.peers):
+                peer.close()
+        # Closed peers read end-of-stream, letting their handlers finish
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        peer = room = sender = None
+        self.handlers.add(asyncio.current_task())
+        try:
+            message = await read_message(reader)
+            if message is None or message[0] != MSG_JOIN:
+                return
+            name, role = decode_join(message[1])
+            peer = _Peer(writer, role, self.max_pending)
+            room = self.rooms.setdefault(name, _Room())
+            if any(other.role == ROLE_DRAW for other in room.peers):
+                peer.live = False
+                room.waiting.append(peer)
+            room.peers.add(peer)
+            sender = asyncio.ensure_future(peer.run())
+            self._request_snapshot(room)
+
+            while not peer.closed:
+                message = await read_message(reader, NET_MAX_MESSAGE)
+                if message is None:
+                    break
+                kind, body = message
+                if role != ROLE_DRAW:
+                    continue
+                data = encode_message(kind, body)
+                self.bytes_in += len(data)
+                if kind == MSG_OPS:
+                    # Reject garbage before it reaches other clients
+                    bulk = any(op[0] == 'patch' for op in decode_ops(body))
+                    for other in list(room.peers):
+                        if other is not peer and other.live:
+                            other.send(data, bulk)
+                            self.bytes_out += len(data)
+                elif kind == MSG_KEYFRAME and peer is room.source:
+                    room.keyframe = data
+                elif kind == MSG_DELTA and peer is room.source:
+                    self._release(room, data)
+        except (ProtocolError, UnicodeDecodeError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if peer is not None:
+                room.peers.discard(peer)
+                if peer in room.waiting:
+                    room.waiting.remove(peer)
+                if peer is room.source:
+                    room.source = room.keyframe = None
+                    room.requested = False
+                if room.peers:
+                    self._request_snapshot(room)
+                else:
+                    self.rooms.pop(name, None)
+                peer.close()
+            if sender is not None:
+                sender.cancel()
+            writer.close()
+            self.handlers.discard(asyncio.current_task())
+
+    def _request_snapshot(self, room):
+        """Ask the source for a snapshot if joiners wait for one (or let them in if nobody draws)"""
+        if not room.waiting or room.requested:
+            return
+        if room.source is None:
+            room.source = next((peer for peer in room.peers if peer.role == ROLE_DRAW and peer.live), None)
+            if room.source is None:
+                self._release(room, None)  # Nothing drawn that anyone could send
+                return
+        room.requested = True
+        fresh = b'\x01' if room.keyframe is None else b'\x00'
+        room.source.send(encode_message(MSG_SNAPSHOT_REQUEST, fresh))
+
+    def _release(self, room, delta):
+        """Send the waiting joiners the keyframe and delta message (None: nothing to send) and let them in"""
+        for peer in room.waiting:
+            if delta is not None and room.keyframe is not None:
+                for data in (room.keyframe, delta):
+                    peer.send(data, bulk=True)
+                    self.bytes_out += len(data)
+            peer.live = True
+        room.waiting = []
+        room.requested = False
+
+
+def serve_in_thread(host=NET_HOST, port=NET_PORT):
+    """Run a RelayServer on a daemon thread, returning (server, port) once it listens"""
+    started = threading.Event()
+    result = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = RelayServer()
+        try:
+            result['port'] = loop.run_until_complete(server.start(host, port))
+        except OSError as e:
+            result['error'] = e
+            started.set()
+            return
+        result['server'] = server
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    if 'error' in result:
+        raise result['error']
+    return result['server'], result['port']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scribble relay server")
+    parser.add_argument('--host', default=NET_HOST)
+    parser.add_argument('--port', type=int, default=NET_PORT)
+    args = parser.parse_args()
+
+    async def run():
+        server = RelayServer()
+        port = await server.start(args.host, args.port)
+        print(f"Relay server listening on {args.host}:{port}")
+        await server.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import sys
+
+# Headless: nothing here opens a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,124 @@
+# tests/test_fill.py
+import random
+import pygame
+import pytest
+from core import fill
+from core.canvas import CanvasManager
+from core.stroke import draw_stroke
+
+SIZE = (160, 120)
+RED = (255, 0, 0, 255)
+BLUE = (0, 0, 255, 255)
+CLEAR = (0, 0, 0, 0)
+
+
+@pytest.fixture(params=['numpy', 'scanline'])
+def path(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(fill, 'np', None)
+    return request.param
+
+
+def ring():
+    """Transparent surface with a closed ring around (80, 60)"""
+    surface = pygame.Surface(SIZE, pygame.SRCALPHA)
+    surface.fill(CLEAR)
+    pygame.draw.circle(surface, RED, (80, 60), 40, 3)
+    return surface
+
+
+def test_fills_inside_only(path):
+    surface = ring()
+    before = surface.copy()
+    rects = fill.flood_fill(surface, (80, 60), BLUE, 32)
+    assert rects
+    for x in range(SIZE[0]):
+        for y in range(SIZE[1]):
+            distance = (x - 80) ** 2 + (y - 60) ** 2
+            if before.get_at((x, y)) != CLEAR or distance > 41 ** 2:  # The ring, or outside it
+                assert surface.get_at((x, y)) == before.get_at((x, y))
+            elif distance < 36 ** 2:
+                assert surface.get_at((x, y)) == BLUE
+
+
+def test_rects_cover_changes_and_come_first(path):
+    surface = ring()
+    before = surface.copy()
+    seen = []
+    rects = fill.flood_fill(surface, (0, 0), BLUE, 32, lambda rect: seen.append((rect, surface.get_at(rect.topleft))))
+    assert [rect for rect, _ in seen] == rects
+    assert all(color != BLUE for _, color in seen)  # Called before painting
+    changed = [(x, y) for x in range(SIZE[0]) for y in range(SIZE[1])
+               if surface.get_at((x, y)) != before.get_at((x, y))]
+    assert changed
+    assert all(any(rect.collidepoint(point) for rect in rects) for point in changed)
+
+
+def test_paths_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    surface = pygame.Surface(SIZE, pygame.SRCALPHA)
+    surface.fill(CLEAR)
+    for points in ([(0, 30), (159, 90)], [(20, 0), (60, 119), (140, 5)], [(100, 100), (150, 20)]):
+        draw_stroke(surface, RED, points, 2)
+
+    def filled():
+        copy = surface.copy()
+        fill.flood_fill(copy, (5, 100), BLUE, 32)
+        return pygame.image.tostring(copy, 'RGBA')
+
+    vectorized = filled()
+    monkeypatch.setattr(fill, 'np', None)
+    assert filled() == vectorized
+
+
+def test_same_color_and_outside_do_nothing(path):
+    surface = ring()
+    before = pygame.image.tostring(surface, 'RGBA')
+    assert fill.flood_fill(surface, (80, 60), CLEAR, 32) == []
+    assert fill.flood_fill(surface, (-1, 5), BLUE, 32) == []
+    assert fill.flood_fill(surface, (SIZE[0], 5), BLUE, 32) == []
+    assert fill.flood_fill(surface, (2 ** 40, 3), BLUE, 32) == []
+    assert pygame.image.tostring(surface, 'RGBA') == before
+
+
+@pytest.mark.parametrize('area', [(40, 30, 50, 40), (0, 40, SIZE[0], 30), (60, 0, 30, SIZE[1]), (3, 2, 150, 110)])
+def test_bounds_only_narrow_the_search(path, area):
+    rnd = random.Random(area[0])
+    surface = pygame.Surface(SIZE, pygame.SRCALPHA)
+    surface.fill(CLEAR)
+    area = pygame.Rect(area)
+    surface.set_clip(area)
+    for _ in range(6):
+        points = [(rnd.randrange(area.left, area.right), rnd.randrange(area.top, area.bottom)) for _ in range(3)]
+        draw_stroke(surface, rnd.choice([RED, (0, 0, 0, 20), (255, 255, 255, 255)]), points, 2)
+    surface.set_clip(None)
+    before = pygame.image.tostring(surface, 'RGBA')
+
+    for _ in range(8):
+        pos = (rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1]))
+        whole, narrow = surface.copy(), surface.copy()
+        fill.flood_fill(whole, pos, BLUE, 32)
+        rects = fill.flood_fill(narrow, pos, BLUE, 32, bounds=surface.get_bounding_rect())
+        after = pygame.image.tostring(narrow, 'RGBA')
+        assert after == pygame.image.tostring(whole, 'RGBA')
+        changed = [i // 4 for i in range(0, len(after), 4) if after[i:i + 4] != before[i:i + 4]]
+        assert all(any(rect.collidepoint(i % SIZE[0], i // SIZE[0]) for rect in rects) for i in changed[::97])
+
+
+def test_paper_colored_paint_joins_the_background(path):
+    canvas = CanvasManager(SIZE)
+    paper = canvas.compositor.background
+    canvas.draw_stroke([(80, 0), (80, SIZE[1] - 1)], paper, 4)  # Splits the canvas in two
+    canvas.flood_fill((5, 5), BLUE)
+    assert canvas.surface.get_at((80, 60)) == BLUE
+    assert canvas.surface.get_at((150, 60)) == BLUE
+
+    # Above the bottom layer, blank pixels are not paper
+    canvas.add_layer()
+    canvas.draw_stroke([(80, 0), (80, SIZE[1] - 1)], paper, 4)
+    canvas.flood_fill((5, 5), RED)
+    assert canvas.surface.get_at((5, 60)) == RED
+    assert canvas.surface.get_at((80, 60)) == paper
+    assert canvas.surface.get_at((150, 60)) == CLEAR
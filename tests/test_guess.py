@@ -0,0 +1,92 @@
+# tests/test_guess.py
+import random
+import pytest
+from core.guess import CLOSE, EXACT, MISS, GuessIndex, close_edits, edit_distance, normalize
+
+BANK = ['Apple', 'apple pie', 'Crème brûlée', "Rock 'n' roll", 'elephant', 'cat', 'Ice cream', 'ice-cream']
+
+
+@pytest.fixture(scope='module')
+def index():
+    return GuessIndex(BANK)
+
+
+def test_normalize():
+    assert normalize("  Crème   BRÛLÉE!! ") == 'creme brulee'
+    assert normalize("It's") == normalize('its') == 'its'
+    assert normalize('ice-cream') == normalize('Ice cream') == 'ice cream'
+    assert normalize('?!') == ''
+
+
+def test_close_edits_grow_with_length():
+    assert [close_edits(n) for n in (1, 3, 4, 7, 8, 20)] == [0, 0, 1, 1, 2, 2]
+
+
+@pytest.mark.parametrize('a, b, limit, expected', [
+    ('kitten', 'sitting', 3, 3),
+    ('kitten', 'sitting', 2, None),
+    ('abc', 'abc', 0, 0),
+    ('abc', 'abcd', 1, 1),
+    ('abc', 'abcdef', 2, None),
+    ('', 'ab', 2, 2),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+
+
+@pytest.mark.parametrize('guess, expected', [
+    ('APPLE', (EXACT, 'Apple')),
+    ('creme brulee', (EXACT, 'Crème brûlée')),
+    ('rock n roll!', (EXACT, "Rock 'n' roll")),
+    ('ice cream', (EXACT, 'Ice cream')),   # The first of the bank's equal forms
+    ('elephnat', (CLOSE, 'elephant')),     # Two edits, allowed at eight letters
+    ('aple', (CLOSE, 'Apple')),
+    ('apple pi', (CLOSE, 'apple pie')),
+    ('cta', (MISS, None)),                 # Too short for a typo
+    ('banana', (MISS, None)),
+    ('', (MISS, None)),
+])
+def test_match(index, guess, expected):
+    assert index.match(guess) == expected
+
+
+def test_check(index):
+    assert index.check('Apple!', 'Apple') == EXACT
+    assert index.check('appl', 'Apple') == CLOSE
+    assert index.check('appel', 'Apple') == MISS  # A swap is two edits
+    assert index.check('apple', 'apple pie') == MISS
+    assert index.check('anything', '?!') == MISS
+    assert len(index) == len(BANK) - 1
+
+
+def test_match_agrees_with_brute_force():
+    rnd = random.Random(7)
+    letters = 'abcdefgh'  # Few letters, so near misses are common
+    vocabulary = [''.join(rnd.choice(letters) for _ in range(rnd.randint(2, 8))) for _ in range(200)]
+    bank = [' '.join(rnd.choice(vocabulary) for _ in range(rnd.randint(1, 3))) for _ in range(800)]
+    index = GuessIndex(bank)
+    phrases = {normalize(phrase) for phrase in bank}
+
+    for _ in range(400):
+        guess = list(rnd.choice(bank))
+        for _ in range(rnd.randint(0, 3)):
+            position = rnd.randrange(len(guess) + 1)
+            change = rnd.random()
+            if change < 0.4 and position < len(guess):
+                guess[position] = rnd.choice(letters)
+            elif change < 0.7:
+                guess.insert(position, rnd.choice(letters))
+            elif position < len(guess):
+                del guess[position]
+        guess = normalize(''.join(guess))
+
+        distances = [d for d in (edit_distance(guess, phrase, close_edits(len(phrase))) for phrase in phrases)
+                     if d is not None]
+        kind, phrase = index.match(guess)
+        if guess in phrases:
+            assert kind == EXACT and normalize(phrase) == guess
+        elif distances:
+            assert kind == CLOSE
+            assert edit_distance(guess, normalize(phrase), 2) == min(distances)
+        else:
+            assert (kind, phrase) == (MISS, None)
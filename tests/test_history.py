@@ -0,0 +1,118 @@
+# tests/test_history.py
+import random
+import pygame
+import pytest
+from config.settings import COLORS
+from core.canvas import CanvasManager
+
+SIZE = (300, 200)
+
+
+def pixels(canvas):
+    return pygame.image.tostring(canvas.surface, 'RGBA')
+
+
+def edit(canvas, rnd):
+    """One random committed edit: mostly strokes, some erasing, fills and clears"""
+    kind = rnd.random()
+    if kind < 0.75:
+        x, y = rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])
+        points = [(x, y)] + [(x + rnd.randrange(-80, 80), y + rnd.randrange(-80, 80))
+                             for _ in range(rnd.randrange(1, 4))]
+        color = canvas.eraser_color() if kind < 0.15 else rnd.choice(COLORS)
+        canvas.draw_stroke(points, color, rnd.randrange(1, 20))
+        canvas.save_state()
+    elif kind < 0.95:
+        canvas.flood_fill((rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])), rnd.choice(COLORS))
+    else:
+        canvas.clear()
+
+
+def record(canvas, rnd, count):
+    """States after each edit that reached the history, the starting one first"""
+    history = canvas.history
+    states = [pixels(canvas)]
+    for _ in range(count):
+        before = len(history.undo_stack) + history.dropped
+        edit(canvas, rnd)
+        if len(history.undo_stack) + history.dropped > before:
+            states.append(pixels(canvas))
+    return states
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_undo_and_redo_walk_every_state(seed):
+    canvas = CanvasManager(SIZE)
+    states = record(canvas, random.Random(seed), 60)
+    for state in reversed(states[:-1]):
+        canvas.handle_undo()
+        assert pixels(canvas) == state
+    assert canvas.history.undo() is None
+    for state in states[1:]:
+        canvas.handle_redo()
+        assert pixels(canvas) == state
+
+
+def test_new_edit_drops_redo():
+    canvas = CanvasManager(SIZE)
+    rnd = random.Random(4)
+    states = record(canvas, rnd, 20)
+    for _ in range(5):
+        canvas.handle_undo()
+    states = states[:-5] + record(canvas, rnd, 10)[1:]
+    assert not canvas.history.redo_stack
+    for state in reversed(states[:-1]):
+        canvas.handle_undo()
+        assert pixels(canvas) == state
+
+
+def test_budget_forgets_oldest_edits():
+    canvas = CanvasManager(SIZE)
+    canvas.history.budget = 40000
+    states = record(canvas, random.Random(5), 80)
+    history = canvas.history
+    assert history.dropped and history.nbytes <= history.budget
+    for state in reversed(states[history.dropped:-1]):
+        canvas.handle_undo()
+        assert pixels(canvas) == state
+    assert history.undo() is None
+
+
+def test_render_matches_layer():
+    canvas = CanvasManager(SIZE)
+    rnd = random.Random(6)
+    for _ in range(15):
+        x, y = rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])
+        canvas.draw_stroke([(x, y), (x + 40, y - 30)], rnd.choice(COLORS), rnd.randrange(1, 12))
+        canvas.save_state()
+    assert pygame.image.tostring(canvas.history.render(SIZE), 'RGBA') == pixels(canvas)
+
+
+def test_edits_that_change_nothing_are_skipped():
+    canvas = CanvasManager(SIZE)
+    canvas.draw_stroke([(10, 10), (60, 40)], COLORS[1], 5)
+    canvas.save_state()
+    canvas.draw_stroke([(-80, -80), (-40, -50)], COLORS[1], 5)  # Off the canvas
+    canvas.save_state()
+    canvas.draw_stroke([(200, 150), (260, 180)], canvas.eraser_color(), 8)  # Nothing painted there
+    canvas.save_state()
+    assert len(canvas.history.undo_stack) == 1
+    canvas.draw_stroke([(10, 10), (60, 10)], canvas.eraser_color(), 8)
+    canvas.save_state()
+    assert len(canvas.history.undo_stack) == 2
+
+
+def test_layers_keep_their_own_history():
+    canvas = CanvasManager(SIZE)
+    canvas.draw_stroke([(20, 20), (120, 90)], COLORS[2], 6)
+    canvas.save_state()
+    bottom = pixels(canvas)
+    canvas.add_layer()
+    canvas.draw_stroke([(20, 90), (120, 20)], COLORS[4], 6)
+    canvas.save_state()
+    canvas.handle_undo()
+    assert pixels(canvas) == bytes(len(bottom))  # The new layer, blank again
+    canvas.select_layer(0)
+    assert pixels(canvas) == bottom
+    canvas.handle_undo()
+    assert pixels(canvas) == bytes(len(bottom))
@@ -0,0 +1,121 @@
+# tests/test_journal.py
+import os
+import random
+import pygame
+from config.settings import COLORS
+from core.canvas import CanvasManager
+from core.journal import Journal
+
+SIZE = (300, 200)
+
+
+def state(canvas):
+    return canvas.active, [(pygame.image.tostring(layer.surface, 'RGBA'), layer.visible, layer.opacity, layer.blend)
+                           for layer in canvas.layers]
+
+
+def scribble(canvas, journal, rnd, strokes):
+    for _ in range(strokes):
+        x, y = rnd.randrange(SIZE[0]), rnd.randrange(SIZE[1])
+        for _ in range(5):
+            end = (x + rnd.randrange(-30, 30), y + rnd.randrange(-30, 30))
+            canvas.draw_stroke([(x, y), end], rnd.choice(COLORS), rnd.randrange(1, 10))
+            x, y = end
+            journal.tick()
+        canvas.save_state()
+        journal.tick()
+
+
+def recovered(directory):
+    canvas = CanvasManager(SIZE)
+    Journal(canvas, directory).recover()
+    return canvas
+
+
+def session(directory):
+    canvas = CanvasManager(SIZE)
+    journal = Journal(canvas, directory)
+    journal.recover()
+    journal.start()
+    return canvas, journal
+
+
+def test_round_trip(tmp_path):
+    canvas, journal = session(tmp_path)
+    rnd = random.Random(1)
+    scribble(canvas, journal, rnd, 6)
+    canvas.flood_fill((1, 1), COLORS[5])
+    journal.tick()
+    journal.checkpoint()
+    canvas.add_layer()
+    canvas.set_layer(1, opacity=128, blend='multiply')
+    scribble(canvas, journal, rnd, 4)
+    canvas.handle_undo()
+    journal.tick()
+    canvas.add_layer()
+    canvas.set_layer(2, visible=False)
+    scribble(canvas, journal, rnd, 2)
+    journal.checkpoint()
+    canvas.select_layer(0)
+    canvas.clear()
+    scribble(canvas, journal, rnd, 3)
+    canvas.handle_undo()
+    canvas.handle_undo()
+    canvas.handle_redo()
+    canvas.draw_stroke([(10, 10), (200, 150)], COLORS[2], 8)  # Not yet committed
+    journal.close()
+    assert state(recovered(tmp_path)) == state(canvas)
+
+
+def test_recovery_continues(tmp_path):
+    canvas, journal = session(tmp_path)
+    scribble(canvas, journal, random.Random(2), 5)
+    journal.close()
+
+    canvas, journal = session(tmp_path)
+    scribble(canvas, journal, random.Random(3), 5)
+    canvas.remove_layer()  # The last layer stays
+    canvas.add_layer()
+    scribble(canvas, journal, random.Random(4), 2)
+    journal.close()
+    assert state(recovered(tmp_path)) == state(canvas)
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    canvas, journal = session(tmp_path)
+    scribble(canvas, journal, random.Random(5), 5)
+    journal.close()
+    last = max(name for name in os.listdir(tmp_path) if name.startswith('journal'))
+    with open(tmp_path / last, 'ab') as f:
+        f.write(b'\x85\x01\x02\x01')  # A record cut short by a crash
+    assert state(recovered(tmp_path)) == state(canvas)
+
+
+def test_empty_directory_recovers_nothing(tmp_path):
+    canvas = CanvasManager(SIZE)
+    blank = state(canvas)
+    assert not Journal(canvas, tmp_path / 'missing').recover()
+    assert state(canvas) == blank
+
+
+def test_undo_across_checkpoint_then_redo(tmp_path):
+    canvas, journal = session(tmp_path)
+    canvas.draw_stroke([(200, 140), (250, 160)], (0, 0, 255), 10)
+    canvas.save_state()
+    journal.tick()
+    journal.checkpoint()
+    canvas.draw_stroke([(20, 20), (80, 60)], (255, 0, 0), 10)
+    canvas.save_state()
+    canvas.handle_undo()
+    canvas.handle_undo()  # Back past the checkpoint
+    canvas.handle_redo()
+    journal.close()
+    restored = recovered(tmp_path)
+    assert restored.surface.get_at((50, 40)) == (0, 0, 0, 0)
+    assert restored.surface.get_at((225, 150)) == (0, 0, 255, 255)
+    assert state(restored) == state(canvas)
+
+    # Recovered edits can still be undone, back to the last redo
+    restored.draw_stroke([(100, 100), (140, 120)], (0, 255, 0), 6)
+    restored.handle_undo()
+    assert state(restored) == state(canvas)
@@ -0,0 +1,203 @@
+# tests/test_net.py
+import socket
+import time
+import zlib
+import pygame
+import pytest
+from config.settings import COLORS, LAYER_MAX
+from core.canvas import CanvasManager
+from net.client import NetClient
+from net.protocol import (
+    MSG_OPS, OP_LAYER_SET, OP_PATCH, ROLE_WATCH, MAX_COORDINATE, MAX_RADIUS, ProtocolError,
+    decode_ops, encode_join, encode_message, encode_ops
+)
+from net.server import serve_in_thread
+
+SIZE = (320, 200)
+
+
+def pixels(canvas):
+    return [pygame.image.tostring(layer.surface, 'RGBA') for layer in canvas.layers]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def synced(watcher, drawer, *clients):
+    """Run each client's frame step once; True when the watcher matches the drawer"""
+    for client in clients:
+        client.apply()
+    return pixels(watcher) == pixels(drawer)
+
+
+@pytest.fixture(scope='module')
+def port():
+    _, port = serve_in_thread(port=0)
+    return port
+
+
+def join(port, room, role):
+    canvas = CanvasManager(SIZE)
+    client = NetClient(canvas, room, role, port=port)
+    client.start()
+    return canvas, client
+
+
+@pytest.mark.parametrize('op', [
+    ('fill', (2 ** 40, 3), COLORS[2]),
+    ('fill', (3, -MAX_COORDINATE - 1), COLORS[2]),
+    ('stroke', [(0, 0), (MAX_COORDINATE + 1, 0)], COLORS[2], 3),
+    ('stroke', [(0, 0)], COLORS[2], MAX_RADIUS + 1),
+    ('layer_select', LAYER_MAX),
+])
+def test_decode_rejects_out_of_range(op):
+    with pytest.raises(ProtocolError):
+        decode_ops(encode_ops([op]))
+
+
+def test_decode_rejects_unknown_blend_mode():
+    with pytest.raises(ProtocolError):
+        decode_ops(bytes([OP_LAYER_SET, 0, 1, 255, 200]))
+
+
+def test_patch_round_trip():
+    op = ('patch', (3, 4, 5, 2), bytes(range(40)))
+    assert decode_ops(encode_ops([op])) == [op]
+
+
+@pytest.mark.parametrize('size, pixels', [
+    ((4, 4), bytes(63)),       # Short
+    ((4, 4), bytes(65)),       # Long
+    ((1 << 12, 1 << 12), b''), # Past NET_PATCH_PIXELS
+])
+def test_decode_rejects_bad_patches(size, pixels):
+    with pytest.raises(ProtocolError):
+        decode_ops(encode_ops([('patch', (0, 0) + size, pixels)]))
+
+
+def test_decode_stops_inflating_at_the_patch_size():
+    bomb = zlib.compress(bytes(1 << 26))  # 64 MiB from about 64 KiB
+    length = bytes([len(bomb) & 0x7F | 0x80, len(bomb) >> 7 & 0x7F | 0x80, len(bomb) >> 14])
+    with pytest.raises(ProtocolError, match='size'):
+        decode_ops(bytes([OP_PATCH, 0, 0, 4, 4]) + length + bomb)
+
+
+def test_apply_op_ignores_ops_off_the_canvas():
+    canvas = CanvasManager(SIZE)
+    before = pixels(canvas)
+    assert not canvas.apply_op(('fill', (2 ** 40, 3), COLORS[2]))
+    assert not canvas.apply_op(('fill', (SIZE[0], 3), COLORS[2]))
+    assert not canvas.apply_op(('stroke', [(5, 5), (MAX_COORDINATE + 1, 5)], COLORS[2], 3))
+    assert not canvas.apply_op(('stroke', [(5, 5), (6, 5)], COLORS[2], MAX_RADIUS + 1))
+    assert not canvas.apply_op(('layer_set', 1, True, 255, 'normal'))
+    assert not canvas.apply_op(('patch', (SIZE[0] - 1, 0, 2, 1), bytes(8)))
+    assert not canvas.apply_op(('patch', (0, 0, 2, 1), bytes(4)))
+    assert pixels(canvas) == before
+    assert canvas.apply_op(('fill', (3, 3), COLORS[2]))
+
+
+def test_apply_op_draws_strokes_leaving_the_canvas():
+    local, replayed = CanvasManager(SIZE), CanvasManager(SIZE)
+    points = [(-40, 30), (SIZE[0] + 40, SIZE[1] // 2), (SIZE[0] // 2, MAX_COORDINATE)]
+    local.draw_stroke(points, COLORS[2], 6)
+    assert replayed.apply_op(('stroke', points, COLORS[2], 6))
+    assert pixels(replayed) == pixels(local)
+
+
+def test_received_ops_leave_the_local_edit_open():
+    canvas = CanvasManager(SIZE)
+    canvas.add_layer()
+    canvas.select_layer(0)
+    remote = [('layer_select', 1), ('stroke', [(100, 100), (140, 120)], COLORS[3], 4), ('commit',),
+              ('layer_select', 0)]
+    canvas.draw_stroke([(10, 10), (60, 40)], COLORS[2], 5)  # Mouse still down
+    assert all(canvas.apply_op(op) for op in remote)
+    assert canvas.history.pending and not canvas.history.undo_stack
+    canvas.draw_stroke([(60, 40), (90, 60)], COLORS[2], 5)
+    assert all(canvas.apply_op(op) for op in remote)
+    canvas.save_state()  # Mouse up: the whole stroke is one edit
+    assert len(canvas.history.undo_stack) == 1 and len(canvas.history.undo_stack[0]) == 2
+    assert len(canvas.layers[1].history.undo_stack) == 2
+
+
+def test_watcher_replays_the_drawing(port):
+    drawer, drawer_client = join(port, 'replay', 0)
+    watcher, watcher_client = join(port, 'replay', ROLE_WATCH)
+    try:
+        drawer.draw_stroke([(10, 10), (200, 150), (300, 20)], COLORS[13], 5)
+        drawer.save_state()
+        drawer.flood_fill((1, 190), COLORS[4])
+        drawer.add_layer()
+        drawer.draw_stroke([(50, 100), (60, 120)], COLORS[2], 10)
+        drawer.handle_undo()
+        drawer.set_layer(0, opacity=128, blend='multiply')
+        drawer_client.flush()
+
+        wait_for(lambda: synced(watcher, drawer, drawer_client, watcher_client))
+        assert pixels(watcher) == pixels(drawer)
+        assert [(layer.opacity, layer.blend) for layer in watcher.layers] == [(128, 'multiply'), (255, 'normal')]
+    finally:
+        drawer_client.close()
+        watcher_client.close()
+
+
+def test_late_joiner_gets_a_snapshot(port):
+    drawer, drawer_client = join(port, 'late', 0)
+    try:
+        drawer.draw_stroke([(10, 10), (300, 190)], COLORS[8], 7)
+        drawer.save_state()
+        drawer_client.flush()
+        watcher, watcher_client = join(port, 'late', ROLE_WATCH)
+        try:
+            # The drawer answers the server's snapshot request between frames
+            wait_for(lambda: synced(watcher, drawer, drawer_client, watcher_client))
+        finally:
+            watcher_client.close()
+    finally:
+        drawer_client.close()
+
+
+def test_late_joiner_follows_undo_and_redo(port):
+    drawer, drawer_client = join(port, 'late-undo', 0)
+    try:
+        drawer.draw_stroke([(10, 10), (300, 190)], COLORS[8], 7)
+        drawer.save_state()
+        drawer.flood_fill((300, 10), COLORS[4])
+        drawer_client.flush()
+        watcher, watcher_client = join(port, 'late-undo', ROLE_WATCH)
+        try:
+            wait_for(lambda: synced(watcher, drawer, drawer_client, watcher_client))
+            drawer.handle_undo()  # Edits from before the watcher joined
+            drawer.handle_undo()
+            drawer.handle_redo()
+            drawer_client.flush()
+            wait_for(lambda: synced(watcher, drawer, drawer_client, watcher_client))
+        finally:
+            watcher_client.close()
+    finally:
+        drawer_client.close()
+
+
+def test_server_drops_out_of_range_ops(port):
+    watcher, watcher_client = join(port, 'hostile', ROLE_WATCH)
+    try:
+        with socket.create_connection(('127.0.0.1', port)) as hostile:
+            hostile.sendall(encode_join('hostile'))
+            hostile.sendall(encode_message(MSG_OPS, encode_ops([('fill', (2 ** 40, 3), COLORS[2])])))
+            hostile.settimeout(5.0)
+            assert hostile.recv(1) == b''  # Disconnected rather than relayed
+
+        drawer, drawer_client = join(port, 'hostile', 0)
+        try:
+            drawer.flood_fill((3, 3), COLORS[2])
+            drawer_client.flush()
+            wait_for(lambda: synced(watcher, drawer, drawer_client, watcher_client))
+        finally:
+            drawer_client.close()
+    finally:
+        watcher_client.close()
@@ -0,0 +1,110 @@
+# tests/test_protocol.py
+import pytest
+from config.settings import COLORS
+from net.protocol import (
+    MSG_OPS, ProtocolError, _get_varint, _put_varint, _unzigzag, _zigzag, coalesce,
+    decode_join, decode_message, decode_ops, encode_join, encode_message, encode_ops, framed_size
+)
+
+VARINTS = [0, 1, 127, 128, 255, 300, 16383, 16384, 2 ** 21, 2 ** 32 - 1, 2 ** 63]
+
+
+@pytest.mark.parametrize('value', VARINTS)
+def test_varint_round_trip(value):
+    out = bytearray(b'\x07')  # Decoding starts at an offset
+    _put_varint(out, value)
+    assert _get_varint(bytes(out), 1) == (value, len(out))
+
+
+def test_varint_length():
+    sizes = []
+    for value in (0, 127, 128, 16383, 16384):
+        out = bytearray()
+        _put_varint(out, value)
+        sizes.append(len(out))
+    assert sizes == [1, 1, 2, 2, 3]
+
+
+def test_truncated_varint():
+    with pytest.raises(ProtocolError):
+        _get_varint(b'\x80\x80', 0)
+
+
+def test_zigzag_interleaves_signs():
+    assert [_zigzag(v) for v in (0, -1, 1, -2, 2, -64, 63)] == [0, 1, 2, 3, 4, 127, 126]
+
+
+@pytest.mark.parametrize('value', [0, 1, -1, 63, -64, 64, -65, 1 << 16, -(1 << 16), 2 ** 40, -(2 ** 40)])
+def test_zigzag_round_trip(value):
+    assert _zigzag(value) >= 0
+    assert _unzigzag(_zigzag(value)) == value
+
+
+OPS = [
+    ('stroke', [(10, 20)], COLORS[3], 5),
+    ('stroke', [(0, 0), (1, 1), (-3, 4), (1200, 800), (1199, 801)], (12, 34, 56), 1),
+    ('stroke', [(5, 5), (6, 7)], (0, 0, 0, 0), 12),
+    ('stroke', [(5, 5), (6, 7)], (10, 20, 30, 128), 3),
+    ('fill', (3, 4), COLORS[0]),
+    ('fill', (1699, 899), (1, 2, 3)),
+    ('clear',), ('undo',), ('redo',), ('commit',), ('layer_add',), ('layer_remove',),
+    ('layer_select', 2),
+    ('layer_set', 1, False, 128, 'multiply'),
+]
+
+
+def test_ops_round_trip():
+    assert decode_ops(encode_ops(OPS)) == OPS
+
+
+def test_stroke_steps_cost_two_bytes():
+    points = [(500, 400)] + [(500 + i, 400 - i) for i in range(1, 51)]
+    one = len(encode_ops([('stroke', points[:1], COLORS[1], 5)]))
+    assert len(encode_ops([('stroke', points, COLORS[1], 5)])) == one + 50 * 2
+
+
+@pytest.mark.parametrize('op', OPS[:6] + OPS[-2:])
+def test_truncated_ops(op):
+    data = encode_ops([op])
+    for end in range(1, len(data)):
+        with pytest.raises(ProtocolError):
+            decode_ops(data[:end])
+
+
+def test_message_framing():
+    bodies = [b'', b'x', bytes(126), bytes(127), bytes(300)]
+    stream = b''.join(encode_message(MSG_OPS, body) for body in bodies)
+    offset = 0
+    for body in bodies:
+        kind, found, offset = decode_message(stream, offset)
+        assert (kind, found) == (MSG_OPS, body)
+        assert framed_size(body) == len(encode_message(MSG_OPS, body))
+    assert offset == len(stream)
+    with pytest.raises(ProtocolError):
+        decode_message(stream[:-1], offset - framed_size(bodies[-1]))
+
+
+def test_join_round_trip():
+    kind, body, _ = decode_message(encode_join('salle é', 1))
+    assert decode_join(body) == ('salle é', 1)
+
+
+def test_coalesce_joins_continuing_strokes():
+    red, blue = COLORS[2], COLORS[4]
+    ops = [
+        ('stroke', [(0, 0), (1, 1)], red, 5),
+        ('stroke', [(1, 1), (2, 2)], red, 5),
+        ('stroke', [(2, 2), (3, 3)], red, 3),   # Other radius
+        ('stroke', [(3, 3), (4, 4)], blue, 3),  # Other color
+        ('stroke', [(9, 9), (5, 5)], blue, 3),  # Starts elsewhere
+        ('commit',),
+        ('stroke', [(5, 5), (6, 6)], blue, 3),
+    ]
+    assert coalesce(ops) == [
+        ('stroke', [(0, 0), (1, 1), (2, 2)], red, 5),
+        ('stroke', [(2, 2), (3, 3)], red, 3),
+        ('stroke', [(3, 3), (4, 4)], blue, 3),
+        ('stroke', [(9, 9), (5, 5)], blue, 3),
+        ('commit',),
+        ('stroke', [(5, 5), (6, 6)], blue, 3),
+    ]
@@ -0,0 +1,110 @@
+# tests/test_snapshot.py
+import zlib
+import pygame
+import pytest
+from config.settings import COLORS
+from core.canvas import CanvasManager
+from core.snapshot import _HEADER, _MAGIC, DELTA, KEYFRAME, SnapshotEncoder, decode_snapshot
+
+SIZE = (300, 200)
+
+
+def state(layers, active):
+    return active, [(pygame.image.tostring(layer.surface, 'RGBA'), layer.visible, layer.opacity, layer.blend)
+                    for layer in layers]
+
+
+def canvas_state(canvas):
+    return state(canvas.layers, canvas.active)
+
+
+@pytest.fixture
+def canvas():
+    return CanvasManager(SIZE)
+
+
+def encoder_for(canvas):
+    encoder = SnapshotEncoder(canvas, tile_size=32)
+    encoder.start()
+    return encoder
+
+
+def test_keyframe_holds_the_canvas(canvas):
+    encoder = encoder_for(canvas)
+    canvas.draw_stroke([(10, 10), (250, 180)], COLORS[2], 8)
+    canvas.add_layer()
+    canvas.set_layer(1, opacity=100, blend='add')
+    canvas.flood_fill((5, 190), COLORS[4])
+    snapshot = encoder.capture()
+    assert snapshot.kind == KEYFRAME
+    assert state(*decode_snapshot(snapshot.encode(), None, SIZE)) == canvas_state(canvas)
+
+
+def test_blank_canvas_keyframe_has_no_pixels(canvas):
+    snapshot = encoder_for(canvas).capture()
+    assert snapshot.size == 0
+    assert state(*decode_snapshot(snapshot.encode(), None, SIZE)) == canvas_state(canvas)
+
+
+def test_delta_applies_changes_since_keyframe(canvas):
+    encoder = encoder_for(canvas)
+    for y in range(0, 120, 10):
+        canvas.draw_stroke([(0, y), (299, y)], COLORS[2], 6)
+    canvas.draw_stroke([(280, 180)], COLORS[3], 4)
+    keyframe = encoder.capture().encode()
+    canvas.draw_stroke([(150, 140), (200, 170)], COLORS[5], 4)
+    canvas.draw_stroke([(280, 180)], canvas.eraser_color(), 8)  # Back to a blank tile
+    canvas.set_layer(0, visible=False)
+    delta = encoder.capture()
+    assert delta.kind == DELTA
+    assert state(*decode_snapshot(keyframe, delta.encode(), SIZE)) == canvas_state(canvas)
+
+    # Later joiners get the same keyframe and a delta that keeps growing
+    canvas.draw_stroke([(20, 150), (40, 160)], COLORS[6], 3)
+    delta = encoder.capture()
+    assert delta.kind == DELTA
+    assert state(*decode_snapshot(keyframe, delta.encode(), SIZE)) == canvas_state(canvas)
+
+
+def test_layer_changes_force_a_keyframe(canvas):
+    encoder = encoder_for(canvas)
+    canvas.draw_stroke([(10, 10), (50, 50)], COLORS[2], 5)
+    assert encoder.capture().kind == KEYFRAME
+    canvas.add_layer()
+    snapshot = encoder.capture()
+    assert snapshot.kind == KEYFRAME
+    assert state(*decode_snapshot(snapshot.encode(), None, SIZE)) == canvas_state(canvas)
+    assert encoder.capture(rekey=True).kind == KEYFRAME
+
+
+def test_large_delta_forces_a_keyframe(canvas):
+    encoder = encoder_for(canvas)
+    canvas.draw_stroke([(10, 10), (20, 10)], COLORS[2], 3)
+    encoder.capture()
+    canvas.flood_fill((150, 150), COLORS[4])  # Every tile changes
+    assert encoder.capture().kind == KEYFRAME
+
+
+def test_mismatched_snapshots_are_refused(canvas):
+    encoder = encoder_for(canvas)
+    canvas.draw_stroke([(10, 10), (50, 50)], COLORS[2], 5)
+    old = encoder.capture(rekey=True).encode()
+    keyframe = encoder.capture(rekey=True).encode()
+    delta = encoder.capture().encode()
+    with pytest.raises(ValueError):
+        decode_snapshot(old, delta, SIZE)  # Delta of a newer keyframe
+    with pytest.raises(ValueError):
+        decode_snapshot(keyframe, None, (SIZE[0] + 1, SIZE[1]))
+    with pytest.raises(ValueError):
+        decode_snapshot(delta, None, SIZE)  # Not a keyframe
+    with pytest.raises(ValueError):
+        decode_snapshot(keyframe[:-5], None, SIZE)
+    with pytest.raises(ValueError):
+        decode_snapshot(b'junk' * 10, None, SIZE)
+
+
+def test_oversized_body_is_refused():
+    header = _HEADER.pack(_MAGIC, KEYFRAME, 1, SIZE[0], SIZE[1], 32, 1, 0)
+    bomb = zlib.compress(bytes(1 << 26))  # Far more than one 300x200 layer
+    with pytest.raises(ValueError, match='larger'):
+        decode_snapshot(header + bomb, None, SIZE)
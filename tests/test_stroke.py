@@ -0,0 +1,89 @@
+# tests/test_stroke.py
+import math
+import random
+import pygame
+import pytest
+from core.stroke import draw_stroke, stroke_bounds
+
+SIZE = (200, 200)
+WHITE = (255, 255, 255)
+
+
+def coverage(draw):
+    surface = pygame.Surface(SIZE)
+    surface.fill((0, 0, 0))
+    draw(surface)
+    return pygame.mask.from_threshold(surface, WHITE, (1, 1, 1, 255))
+
+
+def stamped(surface, start, end, radius):
+    """The circle stamping draw_stroke replaced: a disc every radius // 2 pixels"""
+    pygame.draw.circle(surface, WHITE, start, radius)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    steps = max(1, int(max(abs(dx), abs(dy)) / max(1, radius // 2)))
+    for i in range(steps + 1):
+        t = i / steps
+        pygame.draw.circle(surface, WHITE, (int(start[0] + dx * t), int(start[1] + dy * t)), radius)
+
+
+def distance(point, start, end):
+    """From a pixel centre to the segment, in pygame's circle coordinates"""
+    px, py = point[0] + 0.5, point[1] + 0.5
+    ax, ay, bx, by = start[0] + 0.5, start[1] + 0.5, end[0] + 0.5, end[1] + 0.5
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    t = 0 if length == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def segments(count, seed=3):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        radius = rnd.choice([1, 2, 3, 5, 8, 12, 20])
+        start = (rnd.randrange(40, 160), rnd.randrange(40, 160))
+        end = (start[0] + rnd.randrange(-60, 60), start[1] + rnd.randrange(-60, 60))
+        yield start, end, radius
+
+
+def test_dot_is_a_circle():
+    for radius in (1, 4, 15):
+        new = coverage(lambda s: draw_stroke(s, WHITE, [(100, 100)], radius))
+        old = coverage(lambda s: pygame.draw.circle(s, WHITE, (100, 100), radius))
+        assert new.overlap_area(old, (0, 0)) == new.count() == old.count()
+
+
+@pytest.mark.parametrize('start, end, radius', list(segments(30, seed=5)))
+def test_caps_and_joins_are_circles(start, end, radius):
+    points = [start, end, (end[0] + 25, end[1] - 10)]
+    new = coverage(lambda s: draw_stroke(s, WHITE, points, radius))
+    for point in points:
+        disc = coverage(lambda s: pygame.draw.circle(s, WHITE, point, radius))
+        assert new.overlap_area(disc, (0, 0)) == disc.count()
+
+
+def test_coverage_against_stamping():
+    """Pins how far segments may stray from the old stamping: edge pixels only.
+
+    Stamped discs leave notches between them and truncate their centres,
+    so the two differ along the sides, never more than a few pixels in
+    from the edge or two beyond it, and on under 5% of the area overall.
+    """
+    stamped_area = differing = 0
+    for start, end, radius in segments(150):
+        new = coverage(lambda s: draw_stroke(s, WHITE, [start, end], radius))
+        old = coverage(lambda s: stamped(s, start, end, radius))
+        stamped_area += old.count()
+        area = stroke_bounds([start, end], radius).inflate(4, 4).clip((0, 0), SIZE)
+        for x in range(area.left, area.right):
+            for y in range(area.top, area.bottom):
+                if new.get_at((x, y)) != old.get_at((x, y)):
+                    differing += 1
+                    assert -3.5 < distance((x, y), start, end) - radius < 2.0
+    assert differing / stamped_area < 0.05
+
+
+def test_touched_rect_within_bounds():
+    surface = pygame.Surface(SIZE, pygame.SRCALPHA)
+    for start, end, radius in segments(50):
+        points = [start, end]
+        assert stroke_bounds(points, radius).contains(draw_stroke(surface, WHITE, points, radius))
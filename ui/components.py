@@ -1,6 +1,6 @@
+from collections import OrderedDict
 import pygame
 from config.settings import (
-    BG_COLOR,
     BRUSH_SIZES,
     BRUSH_DROPDOWN_BG,
     BRUSH_DROPDOWN_BORDER,
@@ -21,7 +21,34 @@ from config.settings import (
     HOVER_ANIM_DURATION,
     HOVER_FLOAT_OFFSET,
     HOVER_COLOR,
+    BUTTON_FONT,
+    BUTTON_FONT_SIZE,
+    BUTTON_HOVER_BUCKETS,
+    BUTTON_SPRITE_CACHE_SIZE,
 )
+from core.profiler import count
+
+# Shared across all buttons so rebuilding widgets never repeats this work
+_font_cache = {}                # (name, size) -> Font
+_text_cache = {}                # (text, color, name, size) -> rendered Surface
+_sprite_cache = OrderedDict()   # visual key -> (sprite, offset), LRU order
+
+def get_font(name=BUTTON_FONT, size=BUTTON_FONT_SIZE):
+    """Shared Font object; system font lookup happens once per name and size"""
+    key = (name, size)
+    font = _font_cache.get(key)
+    if font is None:
+        font = _font_cache[key] = pygame.font.SysFont(name, size)
+    return font
+
+def render_text(text, color, name=BUTTON_FONT, size=BUTTON_FONT_SIZE):
+    """Cached anti-aliased text surface"""
+    key = (text, tuple(color), name, size)
+    surf = _text_cache.get(key)
+    if surf is None:
+        surf = _text_cache[key] = get_font(name, size).render(text, True, color)
+        count('surfaces')
+    return surf
 
 class Button:
     def __init__(self, rect, **kwargs):
@@ -31,6 +58,9 @@ class Button:
         self.color = kwargs.get('color', TOOL_BUTTON_BG)
         self.text_color = kwargs.get('text_color', (0, 0, 0))
         self.icon = kwargs.get('icon', None)
+        self.icon_path = kwargs.get('icon_path', None)  # File the icon came from; names it in the sprite cache
+        if self.icon is not None and self.icon_path is None:
+            raise ValueError("a button with an icon needs its icon_path")
         self.active = kwargs.get('active', False)
         self.is_tool = kwargs.get('is_tool', False)
         self.is_color = kwargs.get('is_color', False)
@@ -40,7 +70,6 @@ class Button:
         self.dropdown_open = False
         self.dropdown_rects = []
         self.hovered_size = None
-        self.font = pygame.font.SysFont('Arial', 20)
         self.hover_color = kwargs.get('hover_color', HOVER_COLOR)
         self.float_offset = kwargs.get('float_offset', HOVER_FLOAT_OFFSET)
         
@@ -74,26 +103,96 @@ class Button:
                 for i, base in enumerate(base_color)
             ]
 
+    def is_animating(self):
+        """Whether the hover transition has not reached its end yet"""
+        return self.animation_time != (HOVER_ANIM_DURATION if self.is_hovered else 0.0)
+
+    def hover_bucket(self):
+        """Hover progress quantized to the steps sprites are cached at"""
+        return round(self.hover_progress * BUTTON_HOVER_BUCKETS)
+
+    def visual_state(self):
+        """Everything that affects how the button looks"""
+        return (
+            tuple(self.rect), self.active, self.hover_bucket(),
+            self.current_size, self.dropdown_open
+        )
+
+    def bounds(self):
+        """Screen area draw() may paint, including floating icons and dropdown"""
+        area = self._sprite_area()
+        if self.dropdown_open and self.is_brush_size:
+            area.union_ip(self._dropdown_rect())
+        return area
+
+    def _sprite_area(self):
+        area = self.rect.copy()
+        if self.icon:
+            for offset in (0, self.float_offset):
+                area.union_ip(self.icon.get_rect(center=(self.rect.centerx, self.rect.centery + offset)))
+        if self.is_color:
+            # Selection arcs are centred inside the corners but can overhang
+            overhang = max(0, COLOR_INDICATOR_RADIUS - COLOR_INDICATOR_PADDING) + COLOR_INDICATOR_THICKNESS
+            area.union_ip(self.rect.inflate(overhang * 2, overhang * 2))
+        return area
+
     def draw(self, surface):
+        sprite, offset = self._get_sprite()
+        surface.blit(sprite, (self.rect.x - offset[0], self.rect.y - offset[1]))
+        
+        # Draw dropdown if open (it tracks the mouse, so it is never cached)
+        if self.dropdown_open and self.is_brush_size:
+            self._draw_brush_sizes(surface)
+
+    def _get_sprite(self):
+        """Cached pre-rendered button for the current visual state"""
+        area = self._sprite_area()
+        offset = (self.rect.x - area.x, self.rect.y - area.y)
+        progress = self.hover_bucket() / BUTTON_HOVER_BUCKETS
+
         # Determine background color
         if (self.is_tool or self.is_action) and self.active:
             bg_color = TOOL_SELECTED_COLOR
+        elif self.is_tool or self.is_action:
+            bg_color = tuple(
+                round(base + (self.hover_color[i] - base) * progress)
+                for i, base in enumerate(TOOL_BUTTON_BG)
+            )
         else:
-            bg_color = self.current_color
-        
+            bg_color = tuple(self.current_color)
+
+        key = (
+            area.size, offset, bg_color, self.is_color and self.active,
+            self.is_brush_size and (self.active, self.current_size),
+            self.icon_path, self.text, tuple(self.text_color),
+            self.float_offset * progress
+        )
+        entry = _sprite_cache.get(key)
+        if entry is None:
+            sprite = pygame.Surface(area.size, pygame.SRCALPHA)
+            count('surfaces')
+            self._render(sprite, self.rect.move(-area.x, -area.y), bg_color, self.float_offset * progress)
+            entry = _sprite_cache[key] = (sprite, offset)
+            if len(_sprite_cache) > BUTTON_SPRITE_CACHE_SIZE:
+                _sprite_cache.popitem(last=False)
+        else:
+            _sprite_cache.move_to_end(key)
+        return entry
+
+    def _render(self, surface, rect, bg_color, icon_offset):
         # Draw button background
-        pygame.draw.rect(surface, bg_color, self.rect, border_radius=5)
+        pygame.draw.rect(surface, bg_color, rect, border_radius=5)
         
         # Color selection indicator
         if self.is_color and self.active:
             corners = [
-                (self.rect.left + COLOR_INDICATOR_PADDING, self.rect.top + COLOR_INDICATOR_PADDING),
-                (self.rect.right - COLOR_INDICATOR_PADDING, self.rect.top + COLOR_INDICATOR_PADDING),
-                (self.rect.left + COLOR_INDICATOR_PADDING, self.rect.bottom - COLOR_INDICATOR_PADDING),
-                (self.rect.right - COLOR_INDICATOR_PADDING, self.rect.bottom - COLOR_INDICATOR_PADDING)
+                (rect.left + COLOR_INDICATOR_PADDING, rect.top + COLOR_INDICATOR_PADDING),
+                (rect.right - COLOR_INDICATOR_PADDING, rect.top + COLOR_INDICATOR_PADDING),
+                (rect.left + COLOR_INDICATOR_PADDING, rect.bottom - COLOR_INDICATOR_PADDING),
+                (rect.right - COLOR_INDICATOR_PADDING, rect.bottom - COLOR_INDICATOR_PADDING)
             ]
             for i, corner in enumerate(corners):
-                rect = pygame.Rect(
+                arc_rect = pygame.Rect(
                     corner[0] - COLOR_INDICATOR_RADIUS,
                     corner[1] - COLOR_INDICATOR_RADIUS,
                     COLOR_INDICATOR_RADIUS * 2,
@@ -103,7 +202,7 @@ class Button:
                 pygame.draw.arc(
                     surface, 
                     COLOR_INDICATOR_COLOR,
-                    rect,
+                    arc_rect,
                     start_angle * 3.14/180,
                     (start_angle + 90) * 3.14/180,
                     COLOR_INDICATOR_THICKNESS
@@ -111,26 +210,22 @@ class Button:
         
         # Brush size visual indicator
         if self.is_brush_size:
-            self._draw_brush_preview(surface)
-        
-        # Draw dropdown if open
-        if self.dropdown_open and self.is_brush_size:
-            self._draw_brush_sizes(surface)
+            self._draw_brush_preview(surface, rect, icon_offset)
 
         # Draw icon with animation
         if self.icon:
-            center = (self.rect.centerx, self.rect.centery + self.icon_offset)
+            center = (rect.centerx, rect.centery + icon_offset)
             icon_rect = self.icon.get_rect(center=center)
             surface.blit(self.icon, icon_rect)
         elif self.text:
-            self._draw_text(surface)
+            self._draw_text(surface, rect, icon_offset)
 
 
-    def _draw_brush_preview(self, surface):
+    def _draw_brush_preview(self, surface, rect, icon_offset):
         # Animated brush size preview
         center_with_offset = (
-            self.rect.centerx,
-            self.rect.centery + self.icon_offset
+            rect.centerx,
+            rect.centery + icon_offset
         )
         # Draw preview circle
         color = BRUSH_SIZE_SELECTED_COLOR if self.active else (0, 0, 0)
@@ -151,39 +246,32 @@ class Button:
 
         """
         
-    def _draw_icon(self, surface):
-        if self.icon:
-            # Apply offset to all icons except brush size
-            if not self.is_brush_size:
-                icon_center = (self.rect.centerx, self.rect.centery + self.icon_offset)
-            else:
-                icon_center = self.rect.center
-                
-            icon_rect = self.icon.get_rect(center=icon_center)
-            surface.blit(self.icon, icon_rect)
-
-    def _draw_text(self, surface):
+    def _draw_text(self, surface, rect, icon_offset):
         # Apply offset to tool text only
         if self.is_tool:
-            text_center = (self.rect.centerx, self.rect.centery + self.icon_offset)
+            text_center = (rect.centerx, rect.centery + icon_offset)
         else:
-            text_center = self.rect.center
+            text_center = rect.center
             
-        text_surf = self.font.render(self.text, True, self.text_color)
+        text_surf = render_text(self.text, self.text_color)
         text_rect = text_surf.get_rect(center=text_center)
         surface.blit(text_surf, text_rect)
 
-    def _draw_brush_sizes(self, surface):
+    def _dropdown_rect(self):
         max_size = max(BRUSH_SIZES)
         dropdown_width = max_size + BRUSH_PADDING * 2
         dropdown_height = sum(size + BRUSH_ITEM_SPACING for size in BRUSH_SIZES) + BRUSH_PADDING
         
-        dropdown_rect = pygame.Rect(
+        return pygame.Rect(
             self.rect.x - (dropdown_width - self.rect.width) // 2,
             self.rect.y - dropdown_height - 10,
             dropdown_width,
             dropdown_height
         )
+
+    def _draw_brush_sizes(self, surface):
+        max_size = max(BRUSH_SIZES)
+        dropdown_rect = self._dropdown_rect()
         
         # Draw dropdown background
         pygame.draw.rect(surface, BRUSH_DROPDOWN_BG, dropdown_rect, border_radius=BRUSH_DROPDOWN_RADIUS)
@@ -0,0 +1,104 @@
+# ui/hud.py
+import time
+import pygame
+from config.settings import PROFILE_HUD
+from ui.components import get_font
+from core.profiler import count
+
+HUD_POS = (28, 28)
+HUD_PADDING = 6
+HUD_REFRESH = 0.25  # Seconds between text updates
+HUD_FRAMES = 60     # Frames averaged for each figure
+
+# (record key, label, indent); draw's sub-phases are timed inside draw_interface
+HUD_PHASES = [
+    ('animate_ms', 'animate', 0),
+    ('events_ms', 'events', 0),
+    ('sync_ms', 'net/journal', 0),
+    ('draw_ms', 'draw', 0),
+    ('scale_ms', 'canvas scale', 1),
+    ('damage_ms', 'damage', 1),
+    ('background_ms', 'background', 1),
+    ('buttons_ms', 'buttons', 1),
+    ('cursor_ms', 'cursor', 1),
+    ('present_ms', 'present', 0),
+]
+
+
+class PerformanceHUD:
+    """Overlay with frame time, per-phase breakdown and counters.
+
+    The text is rebuilt a few times per second. Because the renderer only
+    repaints damaged regions, the overlay is drawn again whenever a dirty
+    rect touches it, and its area is invalidated when it changes or hides.
+    """
+
+    def __init__(self, profiler, visible=PROFILE_HUD):
+        self.profiler = profiler
+        self.visible = visible
+        self.surface = None
+        self.rect = pygame.Rect(HUD_POS, (0, 0))
+        self.next_update = 0
+
+    def toggle(self, renderer):
+        self.visible = not self.visible
+        renderer.invalidate(self.rect)
+        self.surface = None
+        self.next_update = 0
+
+    def prepare(self, renderer):
+        """Refresh the overlay when due; call before draw_interface"""
+        if not self.visible:
+            return
+        now = time.perf_counter()
+        if now < self.next_update:
+            return
+        self.next_update = now + HUD_REFRESH
+        old = self.rect
+        self.surface = self._render()
+        self.rect = self.surface.get_rect(topleft=HUD_POS)
+        renderer.invalidate(old.union(self.rect))
+
+    def draw(self, screen, dirty):
+        """Paint the overlay over this frame, returning the rects to present"""
+        if not self.visible or self.surface is None:
+            return dirty
+        if any(self.rect.colliderect(rect) for rect in dirty):
+            screen.blit(self.surface, self.rect)
+            dirty = dirty + [self.rect]
+        return dirty
+
+    def _lines(self):
+        stats = self.profiler.summary(HUD_FRAMES)
+        if not stats:
+            return ["collecting..."]
+        lines = [
+            f"frame {stats['total_ms']:5.2f} ms  max {stats['max_total_ms']:5.2f}  {stats.get('fps', 0):3.0f} fps",
+        ]
+        for key, label, indent in HUD_PHASES:
+            if key in stats:
+                lines.append(f"{'  ' * (indent + 1)}{label:<14}{stats[key]:6.2f} ms")
+        lines.append(f"surfaces/frame {stats.get('surfaces', 0):6.1f}")
+        lines.append(f"draw calls/frame {stats.get('draw_calls', 0):4.1f}")
+        lines.append(f"undo history {stats.get('undo_bytes', 0) / 1048576:6.1f} MiB, "
+                     f"{stats.get('undo_edits', 0):.0f} edits")
+        if self.profiler.capture:
+            kind, left, _ = self.profiler.capture
+            lines.append(f"{kind}: {left} frames left")
+        elif self.profiler.reports:
+            lines.append(f"wrote {self.profiler.reports[-1]}")
+        return lines
+
+    def _render(self):
+        font = get_font('monospace', 14)
+        rendered = [font.render(line, True, (255, 255, 255)) for line in self._lines()]
+        width = max(text.get_width() for text in rendered) + HUD_PADDING * 2
+        height = sum(text.get_height() for text in rendered) + HUD_PADDING * 2
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        y = HUD_PADDING
+        for text in rendered:
+            surface.blit(text, (HUD_PADDING, y))
+            y += text.get_height()
+        count('surfaces', len(rendered) + 1)
+        return surface
@@ -1,5 +1,6 @@
 import pygame
 from ui.components import Button
+from ui.widgets import Widget, WidgetCollection
 from config.settings import (
     TOOL_BUTTON_BG,
     TOOL_SELECTED_COLOR,
@@ -8,12 +9,16 @@ from config.settings import (
     TOOL_SPACING, BRUSH_SIZE_BUTTON_SIZE, PALETTE_TOOL_PADDING,
     ACTION_BUTTON_WIDTH, ACTION_BUTTON_HEIGHT, ACTION_BUTTON_SPACING,
     ACTION_RIGHT_MARGIN, CANVAS_MARGIN, HOVER_FLOAT_OFFSET,
-    TOOL_BUTTON_RADIUS, COLORS, BRUSH_SIZES, HOVER_COLOR
+    TOOL_BUTTON_RADIUS, COLORS, BRUSH_SIZES, HOVER_COLOR, ICON_PATHS
 )
 
-def create_tools(window_size, icons):
+ACTIONS = ['undo', 'redo', 'clear']
+TOOLS = ['brush', 'fill', 'eraser']
+
+def layout_rects(window_size):
+    """Button rects for a window size, in the order create_tools adds widgets"""
     win_w, win_h = window_size
-    tools = []
+    rects = []
 
     # Calculate palette dimensions
     palette_width = COLORS_PER_ROW * (COLOR_BUTTON_SIZE + COLOR_BUTTON_SPACING) - COLOR_BUTTON_SPACING
@@ -26,99 +31,90 @@ def create_tools(window_size, icons):
 
     # Color Palette (two rows at bottom)
     palette_y = win_h - (COLOR_ROWS * (COLOR_BUTTON_SIZE + PALETTE_VERTICAL_SPACING)) - PALETTE_BOTTOM_MARGIN
+    for row in range(2):
+        for i in range(COLORS_PER_ROW):
+            rects.append(pygame.Rect(
+                start_x + i*(COLOR_BUTTON_SIZE + COLOR_BUTTON_SPACING),
+                palette_y + row * (COLOR_BUTTON_SIZE + PALETTE_VERTICAL_SPACING),
+                COLOR_BUTTON_SIZE,
+                COLOR_BUTTON_SIZE
+            ))
 
-    # First color row
-    for i in range(COLORS_PER_ROW):
-        tools.append({
-            'type': 'color',
-            'color': COLORS[i],
-            'button': Button(
-                pygame.Rect(
-                    start_x + i*(COLOR_BUTTON_SIZE + COLOR_BUTTON_SPACING),
-                    palette_y,
-                    COLOR_BUTTON_SIZE,
-                    COLOR_BUTTON_SIZE
-                ),
-                color=COLORS[i],
-                is_color=True,
-                border_radius=TOOL_BUTTON_RADIUS
-            )
-        })
+    # Tools Section (right of palette)
+    tools_start_x = start_x + palette_width + PALETTE_TOOL_PADDING
+    tools_y = palette_y + (COLOR_BUTTON_SIZE // 2)
+
+    # Brush Size Selector, then the tools in horizontal layout
+    rects.append(pygame.Rect(tools_start_x, tools_y, BRUSH_SIZE_BUTTON_SIZE, BRUSH_SIZE_BUTTON_SIZE))
+    for i in range(len(TOOLS)):
+        x = tools_start_x + BRUSH_SIZE_BUTTON_SIZE + TOOL_SPACING * (i + 1) + TOOL_BUTTON_SIZE * i
+        rects.append(pygame.Rect(x, tools_y, TOOL_BUTTON_SIZE, TOOL_BUTTON_SIZE))
 
-    # Second color row
-    for i in range(COLORS_PER_ROW):
-        tools.append({
-            'type': 'color',
-            'color': COLORS[i+13],
-            'button': Button(
-                pygame.Rect(
-                    start_x + i*(COLOR_BUTTON_SIZE + COLOR_BUTTON_SPACING),
-                    palette_y + COLOR_BUTTON_SIZE + PALETTE_VERTICAL_SPACING,
-                    COLOR_BUTTON_SIZE,
-                    COLOR_BUTTON_SIZE
-                ),
-                color=COLORS[i+13],
+    # Action Buttons (top right)
+    action_x = win_w - ACTION_BUTTON_WIDTH - ACTION_RIGHT_MARGIN
+    action_y = CANVAS_MARGIN
+    for i in range(len(ACTIONS)):
+        rects.append(pygame.Rect(
+            action_x,
+            action_y + i * (ACTION_BUTTON_HEIGHT + ACTION_BUTTON_SPACING),
+            ACTION_BUTTON_WIDTH,
+            ACTION_BUTTON_HEIGHT
+        ))
+    return rects
+
+def create_tools(window_size, icons):
+    rects = iter(layout_rects(window_size))
+    tools = []
+
+    # Color Palette: two rows of COLORS_PER_ROW
+    for i in range(COLORS_PER_ROW * 2):
+        color = COLORS[i if i < COLORS_PER_ROW else i - COLORS_PER_ROW + 13]
+        tools.append(Widget(
+            'color',
+            color=color,
+            button=Button(
+                next(rects),
+                color=color,
                 is_color=True,
                 border_radius=TOOL_BUTTON_RADIUS
             )
-        })
-
-    # Tools Section (right of palette)
-    tools_start_x = start_x + palette_width + PALETTE_TOOL_PADDING
-    tools_y = palette_y + (COLOR_BUTTON_SIZE // 2)
+        ))
 
     # Brush Size Selector
-    tools.append({
-        'type': 'brush_size',
-        'button': Button(
-            pygame.Rect(tools_start_x, tools_y, BRUSH_SIZE_BUTTON_SIZE, BRUSH_SIZE_BUTTON_SIZE),
+    tools.append(Widget(
+        'brush_size',
+        button=Button(
+            next(rects),
             is_brush_size=True,
             current_size=BRUSH_SIZES[0],
             color=TOOL_BUTTON_BG,
             border_radius=TOOL_BUTTON_RADIUS
         )
-    })
-
-    # Tools in horizontal layout
-    tool_positions = [
-        (tools_start_x + BRUSH_SIZE_BUTTON_SIZE + TOOL_SPACING, 'brush'),
-        (tools_start_x + BRUSH_SIZE_BUTTON_SIZE + TOOL_SPACING*2 + TOOL_BUTTON_SIZE, 'fill'),
-        (tools_start_x + BRUSH_SIZE_BUTTON_SIZE + TOOL_SPACING*3 + TOOL_BUTTON_SIZE*2, 'eraser')
-    ]
+    ))
 
-    for x, name in tool_positions:
-        tools.append({
-            'type': 'tool',
-            'name': name,
-            'button': Button(
-                pygame.Rect(x, tools_y, TOOL_BUTTON_SIZE, TOOL_BUTTON_SIZE),
+    for name in TOOLS:
+        tools.append(Widget(
+            'tool',
+            name=name,
+            button=Button(
+                next(rects),
                 icon=icons[name],
+                icon_path=ICON_PATHS[name],
                 is_tool=True,
                 color=TOOL_BUTTON_BG,  # Base white color
                 # Selection color handled by Button class logic
                 border_radius=TOOL_BUTTON_RADIUS
             )
-        })
-
-    # Action Buttons (top right)
-    action_x = win_w - ACTION_BUTTON_WIDTH - ACTION_RIGHT_MARGIN
-    action_y = CANVAS_MARGIN
+        ))
 
-    actions = ['undo', 'redo', 'clear']
-    for i, action in enumerate(actions):
-        btn_rect = pygame.Rect(
-            action_x,
-            action_y + i * (ACTION_BUTTON_HEIGHT + ACTION_BUTTON_SPACING),
-            ACTION_BUTTON_WIDTH,
-            ACTION_BUTTON_HEIGHT
-        )
-        
-        tools.append({
-            'type': 'action',
-            'name': action,
-            'button': Button(
-                btn_rect,
+    for action in ACTIONS:
+        tools.append(Widget(
+            'action',
+            name=action,
+            button=Button(
+                next(rects),
                 icon=icons[action],
+                icon_path=ICON_PATHS[action],
                 is_tool=True,       # Enables animations
                 is_action=True,     # Special type
                 color=TOOL_BUTTON_BG,
@@ -126,6 +122,18 @@ def create_tools(window_size, icons):
                 float_offset=HOVER_FLOAT_OFFSET,
                 border_radius=5
             )
-        })
+        ))
     
-    return tools
\ No newline at end of file
+    return WidgetCollection(tools)
+
+def reposition_tools(tools, window_size):
+    """Move existing widgets to their places for a new window size.
+
+    Buttons keep their hover, animation and selection state; only their
+    rects change, and the hit-test grid is rebuilt.
+    """
+    for widget, rect in zip(tools, layout_rects(window_size)):
+        widget.button.rect.update(rect)
+        widget.button.original_rect.update(rect)
+    tools.rebuild()
+    return tools
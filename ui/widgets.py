@@ -0,0 +1,101 @@
+# ui/widgets.py
+from config.settings import HIT_GRID_CELL
+
+INTERACTIVE_TYPES = ('tool', 'brush_size', 'action')
+
+
+class Widget:
+    """A toolbar entry: what it does plus the Button that draws it"""
+    __slots__ = ('type', 'name', 'color', 'button', 'index')
+
+    def __init__(self, type, button, name=None, color=None):
+        self.type = type
+        self.button = button
+        self.name = name
+        self.color = color
+        self.index = 0
+
+
+class WidgetCollection:
+    """Ordered widgets with a uniform-grid index for point queries.
+
+    Each grid cell lists the widgets whose rects overlap it, so hit tests and
+    hover updates only look at the few widgets near the mouse. Widgets whose
+    hover state changed are scheduled in `animating` until their transition
+    finishes; animate() ticks only those.
+    """
+    __slots__ = ('widgets', 'cell_size', 'grid', 'hover_grid', 'hovered', 'dropdowns', 'animating')
+
+    def __init__(self, widgets, cell_size=HIT_GRID_CELL):
+        self.widgets = list(widgets)
+        self.cell_size = cell_size
+        self.hovered = set()
+        self.animating = set()
+        self.rebuild()
+
+    def __iter__(self):
+        return iter(self.widgets)
+
+    def __len__(self):
+        return len(self.widgets)
+
+    def __getitem__(self, index):
+        return self.widgets[index]
+
+    def rebuild(self):
+        """Re-index after widgets were added or moved"""
+        self.grid = {}
+        self.hover_grid = {}
+        self.dropdowns = []
+        for index, widget in enumerate(self.widgets):
+            widget.index = index
+            self._insert(self.grid, widget, widget.button.rect)
+            if widget.type in INTERACTIVE_TYPES:
+                self._insert(self.hover_grid, widget, widget.button.original_rect)
+            if widget.type == 'brush_size':
+                self.dropdowns.append(widget)
+
+    def hit(self, pos):
+        """First widget (in draw order) whose button contains pos"""
+        best = None
+        for widget in self.grid.get(self._cell(pos), ()):
+            if widget.button.rect.collidepoint(pos) and (best is None or widget.index < best.index):
+                best = widget
+        return best
+
+    def open_dropdown(self):
+        """Widget whose dropdown is currently open, if any"""
+        for widget in self.dropdowns:
+            if widget.button.dropdown_open:
+                return widget
+        return None
+
+    def update_hover(self, pos):
+        """Set is_hovered on interactive buttons, touching only nearby ones"""
+        hovered = {
+            widget for widget in self.hover_grid.get(self._cell(pos), ())
+            if widget.button.original_rect.collidepoint(pos)
+        }
+        for widget in self.hovered - hovered:
+            widget.button.is_hovered = False
+        for widget in hovered - self.hovered:
+            widget.button.is_hovered = True
+        self.animating |= self.hovered ^ hovered
+        self.hovered = hovered
+
+    def animate(self, dt):
+        """Advance hover transitions in progress, returning whether any remain"""
+        for widget in list(self.animating):
+            widget.button.update(dt)
+            if not widget.button.is_animating():
+                self.animating.discard(widget)
+        return bool(self.animating)
+
+    def _cell(self, pos):
+        return (pos[0] // self.cell_size, pos[1] // self.cell_size)
+
+    def _insert(self, grid, widget, rect):
+        size = self.cell_size
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                grid.setdefault((cx, cy), []).append(widget)
@@ -0,0 +1,95 @@
+# utils/assets.py
+import hashlib
+import io
+import logging
+import os
+import pygame
+from config.settings import ICON_PATHS, TOOL_ICON_SIZE, ASSET_CACHE_DIR, BACKGROUND_PATH
+from utils.images import decode_raw, encode_raw, put_tile
+
+ICON_FALLBACK_COLOR = (200, 200, 200)  # Stands in for a missing icon file
+
+log = logging.getLogger(__name__)
+
+
+def load_icons(cache_dir=ASSET_CACHE_DIR):
+    """Tool icons scaled to TOOL_ICON_SIZE, by name.
+
+    The scaled icons are baked side by side into one atlas, cached on disk
+    under a hash of the icon files and size. Later starts read that single
+    file instead of decoding and scaling every PNG; the icons returned are
+    subsurfaces of the atlas.
+    """
+    sources, key = _icon_sources()
+    width, height = TOOL_ICON_SIZE
+    path = os.path.join(cache_dir, f"icons-{key}.bin")
+    try:
+        with open(path, 'rb') as f:
+            atlas = decode_raw(f.read())
+        if atlas.get_size() != (width * len(sources), height):
+            raise ValueError("atlas has the wrong size")
+    except (OSError, ValueError):
+        atlas = _bake_atlas(sources)
+        _save_atlas(atlas, path)
+
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert_alpha()
+    return {
+        name: atlas.subsurface((index * width, 0, width, height))
+        for index, name in enumerate(sources)
+    }
+
+
+def _icon_sources():
+    """Contents of each icon file by name (None if missing), and their hash"""
+    digest = hashlib.sha1(repr(TOOL_ICON_SIZE).encode())
+    sources = {}
+    for name, path in ICON_PATHS.items():
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        sources[name] = data
+        digest.update(f"{name}:{-1 if data is None else len(data)}:".encode())
+        digest.update(data or b'')
+    return sources, digest.hexdigest()[:16]
+
+
+def _bake_atlas(sources):
+    width, height = TOOL_ICON_SIZE
+    atlas = pygame.Surface((width * len(sources), height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    for index, (name, data) in enumerate(sources.items()):
+        if data is None:
+            icon = pygame.Surface(TOOL_ICON_SIZE)
+            icon.fill(ICON_FALLBACK_COLOR)
+        else:
+            icon = pygame.image.load(io.BytesIO(data), ICON_PATHS[name])
+            icon = pygame.transform.scale(icon.convert_alpha(), TOOL_ICON_SIZE)
+        put_tile(atlas, icon, (index * width, 0))
+    return atlas
+
+
+def _save_atlas(atlas, path):
+    """Write the atlas and remove ones baked from other sources; failures only cost speed"""
+    directory, name = os.path.split(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(encode_raw(pygame.image.tostring(atlas, 'RGBA'), atlas.get_size()))
+        os.replace(path + '.tmp', path)
+        for old in os.listdir(directory):
+            if old.startswith('icons-') and old != name:
+                os.remove(os.path.join(directory, old))
+    except OSError as e:
+        log.warning(f"Couldn't cache icons: {e}")
+
+
+def load_background(path=BACKGROUND_PATH):
+    """Background image converted for the display, or None to use a solid fill"""
+    try:
+        return pygame.image.load(path).convert()
+    except (OSError, pygame.error) as e:
+        log.warning(f"Couldn't load background image: {e}")
+        return None
@@ -1,11 +1,18 @@
+from collections import OrderedDict
 import pygame
-from config.settings import ASPECT_RATIO, INITIAL_WIDTH, INITIAL_HEIGHT, TOOL_ICON_SIZE, ICON_PATHS
+from config.settings import (
+    ASPECT_RATIO, INITIAL_WIDTH, INITIAL_HEIGHT, BG_COLOR,
+    BACKGROUND_CACHE_SIZES
+)
+from core.profiler import count
 from ui.layout import *
 
+_background_cache = OrderedDict()  # (id(image), size) -> (image, smooth-scaled background), LRU order
+
 def handle_resize(new_width, new_height, tools, icons):
     """Update UI elements positions after resize"""
-    # Recreate tools with new positions
-    new_tools = create_tools((new_width, new_height), icons)
+    # Move the existing tools so they keep their hover and selection state
+    new_tools = reposition_tools(tools, (new_width, new_height))
     
     # Update canvas area (maintain 20px margins)
     canvas_area = pygame.Rect(
@@ -17,13 +24,42 @@ def handle_resize(new_width, new_height, tools, icons):
     
     return new_tools, canvas_area
 
-def load_icons():
-    icons = {}
-    for tool_type, path in ICON_PATHS.items():
-        try:
-            icon = pygame.image.load(path).convert_alpha()
-            icons[tool_type] = pygame.transform.scale(icon, TOOL_ICON_SIZE)
-        except FileNotFoundError:
-            icons[tool_type] = pygame.Surface(TOOL_ICON_SIZE)
-            icons[tool_type].fill((200, 200, 200))  # Fallback gray
-    return icons
\ No newline at end of file
+def scale_background(image, size, smooth=True):
+    """Background for a window size: image scaled to fill it and centre-cropped.
+
+    Smooth results are kept for the last few sizes (LRU), so returning to a
+    recent window size costs nothing. smooth=False gives a quick preview.
+    """
+    size = (max(1, size[0]), max(1, size[1]))
+    # Entries hold on to their image, so its id cannot be reused while cached
+    key = (id(image), size)
+    cached = _background_cache.get(key)
+    if cached is not None and cached[0] is image:
+        _background_cache.move_to_end(key)
+        return cached[1]
+
+    if image is None:
+        background = pygame.Surface(size)
+        background.fill(BG_COLOR)
+    else:
+        # Calculate aspect-preserving scale to fill screen
+        img_w, img_h = image.get_size()
+        scale = max(size[0] / img_w, size[1] / img_h)
+        scaled_size = (max(size[0], round(img_w * scale)), max(size[1], round(img_h * scale)))
+        transform = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        scaled = transform(image, scaled_size)
+
+        # Crop to center
+        background = scaled.subsurface(
+            (scaled_size[0] - size[0]) // 2,
+            (scaled_size[1] - size[1]) // 2,
+            size[0],
+            size[1]
+        )
+    count('surfaces')
+
+    if smooth or image is None:
+        _background_cache[key] = (image, background)
+        if len(_background_cache) > BACKGROUND_CACHE_SIZES:
+            _background_cache.popitem(last=False)
+    return background
@@ -0,0 +1,32 @@
+# utils/images.py
+import struct
+import zlib
+import pygame
+from config.settings import EXPORT_COMPRESS_LEVEL
+
+RAW_HEADER = struct.Struct('<4sHH')
+RAW_MAGIC = b'SCKP'
+
+
+def put_tile(surface, tile, pos):
+    """Copy tile pixels onto surface exactly (no alpha blending)"""
+    rect = tile.get_rect(topleft=pos)
+    surface.fill((0, 0, 0, 0), rect)
+    surface.blit(tile, rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+
+def encode_raw(pixels, size, level=EXPORT_COMPRESS_LEVEL):
+    """Size header plus zlib-compressed RGBA pixels"""
+    return RAW_HEADER.pack(RAW_MAGIC, *size) + zlib.compress(pixels, level)
+
+
+def decode_raw(data):
+    """Surface from encode_raw output; raises ValueError if data is not valid"""
+    try:
+        magic, width, height = RAW_HEADER.unpack_from(data)
+        pixels = zlib.decompress(data[RAW_HEADER.size:])
+    except (struct.error, zlib.error) as e:
+        raise ValueError(f"not a raw canvas image: {e}")
+    if magic != RAW_MAGIC or len(pixels) != width * height * 4:
+        raise ValueError("not a raw canvas image")
+    return pygame.image.fromstring(pixels, (width, height), 'RGBA')